@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+常驻的趋势分析工作进程池
+工作进程启动时导入一次分析代码（pandas、两个分析模块，需要图表时还有matplotlib），
+之后通过进程池的任务队列接收分析任务。Web服务不必为每次上传启动新的解释器，
+异步接口可以 await 分析结果而不阻塞事件循环。
+"""
+
+import io
+import os
+import sys
+import asyncio
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# 确保工作进程可以导入同目录下的模块
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from result_cache import DEFAULT_CACHE_DIR  # noqa: E402
+from series_store import DEFAULT_STORE_DIR  # noqa: E402
+
+
+# 默认工作进程数，分析任务以CPU计算为主
+DEFAULT_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+
+class AnalysisError(Exception):
+    """分析失败，消息为分析过程的输出"""
+
+
+def _init_worker(charts):
+    """工作进程初始化：导入分析代码，需要图表时同时初始化matplotlib"""
+    import main  # noqa: F401
+    if charts:
+        from plotting import pyplot
+        pyplot()
+
+
+def _ping():
+    """空任务，用于等待工作进程完成初始化"""
+    return os.getpid()
+
+
+def _run_job(input_path, output_dir, use_cache, cache_dir, charts,
+             store_dir=None, symbol=None):
+    """
+    在工作进程中运行 main.run_analysis，指定 symbol 时同时保存序列到序列存储
+
+    返回:
+    (输出目录, 分析过程的标准输出)
+    """
+    from main import run_analysis
+    from series_store import SeriesStore
+
+    series_store = SeriesStore(store_dir) if symbol is not None else None
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        result = run_analysis(input_path, output_dir, use_cache=use_cache,
+                              cache_dir=cache_dir, charts=charts,
+                              series_store=series_store, symbol=symbol)
+    if result is None:
+        raise AnalysisError(output.getvalue())
+    return result, output.getvalue()
+
+
+class AnalysisPool:
+    """
+    趋势分析工作进程池
+
+    使用方法:
+    pool = AnalysisPool(workers=2)
+    pool.start()                                   # 预先启动并初始化工作进程
+    output_dir, log = await pool.run(path, output_dir)
+    pool.shutdown()
+
+    工作进程异常退出时进程池会被重建，正在执行的任务以 AnalysisError 失败。
+    """
+
+    def __init__(self, workers=None, charts=True, use_cache=True,
+                 cache_dir=DEFAULT_CACHE_DIR, store_dir=DEFAULT_STORE_DIR):
+        """
+        参数:
+        workers: 工作进程数，默认为 DEFAULT_WORKERS
+        charts: 是否生成趋势图表，为True时工作进程预先导入matplotlib
+        use_cache: 是否使用结果缓存
+        cache_dir: 结果缓存目录
+        store_dir: 序列存储目录，任务指定 symbol 时使用
+        """
+        self.workers = workers or DEFAULT_WORKERS
+        self.charts = charts
+        self.use_cache = use_cache
+        self.cache_dir = cache_dir
+        self.store_dir = store_dir
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker,
+                initargs=(self.charts,))
+        return self._executor
+
+    def start(self):
+        """
+        启动全部工作进程并等待初始化完成
+
+        返回:
+        工作进程的PID列表
+        """
+        executor = self._get_executor()
+        futures = [executor.submit(_ping) for _ in range(self.workers)]
+        return sorted({future.result() for future in futures})
+
+    def submit(self, input_path, output_dir, symbol=None):
+        """
+        提交分析任务，指定 symbol 时同时把清理后的序列保存到序列存储
+
+        返回:
+        concurrent.futures.Future，结果为 (输出目录, 分析过程的标准输出)
+        """
+        return self._submit(
+            self._get_executor(), input_path, output_dir, symbol)
+
+    def _submit(self, executor, input_path, output_dir, symbol=None):
+        return executor.submit(
+            _run_job, input_path, output_dir, self.use_cache, self.cache_dir,
+            self.charts, self.store_dir, symbol)
+
+    async def run(self, input_path, output_dir, symbol=None):
+        """
+        在工作进程中运行分析，等待期间不阻塞事件循环
+
+        返回:
+        (输出目录, 分析过程的标准输出)
+        """
+        executor = self._get_executor()
+        try:
+            return await asyncio.wrap_future(
+                self._submit(executor, input_path, output_dir, symbol))
+        except BrokenProcessPool as e:
+            # 工作进程异常退出后旧的进程池不可再用，下次提交时重新创建
+            if self._executor is executor:
+                self._executor = None
+                executor.shutdown(wait=False, cancel_futures=True)
+            raise AnalysisError(f"分析进程异常退出: {e}") from e
+
+    def shutdown(self, wait=True):
+        """停止全部工作进程"""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+多序列批量趋势分析
+将大量序列分发到进程池中并行分析，每个工作进程只导入一次pandas/scipy等依赖
+"""
+
+import os
+import re
+import sys
+import hashlib
+import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+# 确保工作进程可以导入同目录下的模块
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from main import analyze_dual, clean_data  # noqa: E402
+from series_store import DEFAULT_STORE_DIR, SeriesStore  # noqa: E402
+
+# 文件名中可以直接使用的代码，与 SeriesStore 的代码规则相同
+_SYMBOL_PATTERN = re.compile(r'^[\w.\-]+$')
+_UNSAFE_CHARS = re.compile(r'[^\w.\-]')
+
+
+def symbol_filename(symbol):
+    """
+    代码在输出文件名中的形式
+
+    只含字母、数字、下划线、点和短横线且不以点开头的代码原样使用；
+    其他代码（如 EUR/USD、^GSPC）把不安全的字符替换为下划线，
+    并附加原代码哈希的前8位，避免不同代码替换后同名
+    """
+    if _SYMBOL_PATTERN.match(symbol) and not symbol.startswith('.'):
+        return symbol
+    digest = hashlib.sha1(symbol.encode('utf-8')).hexdigest()[:8]
+    safe = _UNSAFE_CHARS.sub('_', symbol).lstrip('.')
+    return f"{safe}-{digest}" if safe else digest
+
+
+def _prepare_frame(df):
+    """
+    将原始数据框整理为分析所需格式：第一列为日期索引，其余列为数值
+
+    返回:
+    清理后的DataFrame，无效时返回None
+    """
+    if len(df.columns) < 2:
+        return None
+    df = df.set_index(df.columns[0])
+    return clean_data(df)
+
+
+def load_tasks(source, symbol_col='symbol'):
+    """
+    根据输入来源生成分析任务列表
+
+    参数:
+    source: 以下三种之一
+            - 目录：目录下每个CSV文件是一个序列，文件名即代码
+            - 清单文件：包含 symbol 和 path 两列的CSV
+            - 长格式文件：包含 symbol_col 列的CSV，每个代码一组数据
+    symbol_col: 长格式文件中的代码列名
+
+    返回:
+    任务列表，每个任务为 (symbol, path或DataFrame)
+    """
+    if os.path.isdir(source):
+        return [
+            (os.path.splitext(name)[0], os.path.join(source, name))
+            for name in sorted(os.listdir(source))
+            if name.lower().endswith('.csv')
+        ]
+
+    df = pd.read_csv(source)
+    if 'path' in df.columns and symbol_col in df.columns:
+        base_dir = os.path.dirname(os.path.abspath(source))
+        return [
+            (str(symbol), os.path.join(base_dir, path))
+            for symbol, path in zip(df[symbol_col], df['path'])
+        ]
+
+    if symbol_col in df.columns:
+        return [
+            (str(symbol), group.drop(columns=symbol_col))
+            for symbol, group in df.groupby(symbol_col, sort=True)
+        ]
+
+    raise ValueError(
+        f"无法识别输入: {source}，需要目录、包含 {symbol_col}/path 列的清单，"
+        f"或包含 {symbol_col} 列的长格式文件")
+
+
+def store_tasks(store, symbols=None):
+    """
+    序列存储中已保存序列的分析任务
+
+    参数:
+    store: SeriesStore
+    symbols: 代码列表，为空时使用存储中的全部序列
+
+    返回:
+    任务列表，每个任务为 (symbol, store)；工作进程自行以内存映射读取序列
+    """
+    return [(symbol, store) for symbol in (symbols or store.symbols())]
+
+
+def _summarize(symbol, version, trends):
+    """汇总单个序列单个版本的趋势统计"""
+    counts = trends['trend_type'].value_counts() if len(trends) else {}
+    return {
+        'symbol': symbol,
+        'version': version,
+        'status': 'ok',
+        'segments': len(trends),
+        'up': int(counts.get('up', 0)),
+        'down': int(counts.get('down', 0)),
+        'consolidation': int(counts.get('consolidation', 0)),
+        'avg_duration': trends['duration'].mean() if len(trends) else None,
+        'start_date': trends['start_date'].iloc[0] if len(trends) else None,
+        'end_date': trends['end_date'].iloc[-1] if len(trends) else None,
+        'error': '',
+    }
+
+
+def analyze_series(task, output_dir, atr_period=14, swing_threshold=0.618):
+    """
+    分析单个序列并写出敏感版和不敏感版趋势表
+
+    参数:
+    task: (symbol, path、DataFrame或SeriesStore)；为SeriesStore时直接读取
+          已清理的序列，不再清理
+    output_dir: 输出目录
+
+    返回:
+    汇总行列表
+    """
+    symbol, data = task
+    try:
+        # 批量模式下屏蔽分析器的逐步输出
+        with open(os.devnull, 'w') as devnull, \
+                contextlib.redirect_stdout(devnull):
+            if isinstance(data, SeriesStore):
+                df = data.load(symbol)
+            else:
+                df = pd.read_csv(data) if isinstance(data, str) else data
+                df = _prepare_frame(df)
+            if df is None:
+                raise ValueError("数据为空或格式无效")
+
+            price_col = 'close'
+            if price_col not in df.columns:
+                price_col = df.columns[0]
+
+            sensitive_trends, insensitive_trends = analyze_dual(
+                df, price_col=price_col, atr_period=atr_period,
+                swing_threshold=swing_threshold)
+
+            rows = []
+            for version, trends in (('sensitive', sensitive_trends),
+                                    ('insensitive', insensitive_trends)):
+                trends.to_csv(
+                    os.path.join(
+                        output_dir,
+                        f"{symbol_filename(symbol)}-{version}-trend_analysis.csv"),
+                    index=False, float_format='%.4f')
+                rows.append(_summarize(symbol, version, trends))
+        return rows
+    except Exception as e:
+        return [{'symbol': symbol, 'version': '', 'status': 'error',
+                 'error': str(e)}]
+
+
+def _analyze_chunk(args):
+    """进程池入口，参数打包为元组以便map使用"""
+    task, output_dir, atr_period, swing_threshold = args
+    return analyze_series(task, output_dir, atr_period, swing_threshold)
+
+
+def run_batch(source, output_dir, workers=None, chunksize=8,
+              symbol_col='symbol', atr_period=14, swing_threshold=0.618,
+              store_dir=None):
+    """
+    批量分析多个序列
+
+    参数:
+    source: 输入目录、清单文件或长格式文件，见 load_tasks；
+            指定 store_dir 时为代码列表，为空时分析存储中的全部序列
+    output_dir: 输出目录，每个代码写出两个趋势表，并写出 batch_summary.csv
+    workers: 工作进程数，默认为CPU核数
+    chunksize: 每次分发给工作进程的任务数
+    symbol_col: 代码列名
+    store_dir: 可选，序列存储目录；指定时从存储读取已清理的序列
+
+    返回:
+    汇总DataFrame
+    """
+    if store_dir is not None:
+        tasks = store_tasks(SeriesStore(store_dir), source)
+    else:
+        tasks = load_tasks(source, symbol_col)
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"共 {len(tasks)} 个序列，工作进程数: {workers or os.cpu_count()}")
+
+    args = [(task, output_dir, atr_period, swing_threshold) for task in tasks]
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for i, result in enumerate(
+                executor.map(_analyze_chunk, args,
+                             chunksize=max(1, chunksize)), 1):
+            rows.extend(result)
+            if result and result[0]['status'] == 'error':
+                print(f"[{i}/{len(tasks)}] {result[0]['symbol']} 失败: "
+                      f"{result[0]['error']}")
+
+    summary = pd.DataFrame(rows)
+    # 失败的序列没有统计值，计数列使用可空整数类型避免输出为浮点数
+    for col in ('segments', 'up', 'down', 'consolidation'):
+        if col in summary.columns:
+            summary[col] = summary[col].astype('Int64')
+    summary_path = os.path.join(output_dir, 'batch_summary.csv')
+    summary.to_csv(summary_path, index=False, float_format='%.4f')
+
+    failed = int((summary['status'] == 'error').sum()) if len(summary) else 0
+    print(f"批量分析完成! 成功 {len(tasks) - failed} 个，失败 {failed} 个")
+    print(f"汇总文件: {summary_path}")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="批量运行敏感版和不敏感版趋势分析")
+    parser.add_argument(
+        "source", nargs="?",
+        help="输入目录、清单文件（symbol,path）或带代码列的长格式CSV")
+    parser.add_argument(
+        "--output-dir",
+        default="crewai-agent/src/tech_analysis_crew/trendanalysis/results/batch",
+        help="输出目录")
+    parser.add_argument(
+        "--workers", type=int, default=None, help="工作进程数，默认为CPU核数")
+    parser.add_argument(
+        "--chunksize", type=int, default=8, help="每次分发给工作进程的任务数")
+    parser.add_argument(
+        "--symbol-col", default="symbol", help="长格式文件中的代码列名")
+    parser.add_argument(
+        "--from-store", nargs="*", metavar="SYMBOL",
+        help="分析序列存储中已保存的这些代码（不指定时为全部序列），"
+             "不读取和清理原始文件")
+    parser.add_argument(
+        "--store-dir", default=DEFAULT_STORE_DIR, help="序列存储目录")
+
+    args = parser.parse_args()
+    if (args.source is None) == (args.from_store is None):
+        parser.error("需要指定 source 或 --from-store 之一")
+
+    if args.from_store is not None:
+        run_batch(args.from_store, args.output_dir, args.workers,
+                  args.chunksize, store_dir=args.store_dir)
+    else:
+        run_batch(args.source, args.output_dir, args.workers, args.chunksize,
+                  args.symbol_col)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+供前端交互绘图的图表数据
+将价格曲线按多个缩放级别用LTTB降采样，与两种分析的趋势区间一起保存为
+一个 .npz 文件。前端先取得最粗级别和全部区间绘制概览，缩放或平移时
+再按时间范围和像素宽度请求对应级别的数据，服务器不需要生成图片。
+"""
+
+import json
+
+import numpy as np
+
+from plotting import lttb
+from segments import to_ns
+
+
+CHART_DATA_VERSION = 1
+
+# 最粗级别的点数，之后每级点数乘以 LEVEL_FACTOR，不超过 MAX_LEVEL_POINTS；
+# 最后一级总是原始数据
+LEVEL_BASE_POINTS = 1024
+LEVEL_FACTOR = 4
+MAX_LEVEL_POINTS = 65536
+
+# 区间请求默认返回的点数，约等于图表的像素宽度
+DEFAULT_WINDOW_POINTS = 1200
+
+# 前端显示的价格精度，与结果CSV的 float_format 一致
+VALUE_DECIMALS = 4
+
+TREND_TYPES = ('up', 'down', 'consolidation')
+
+NS_PER_MS = 1_000_000
+
+
+def _level_sizes(length):
+    """各降采样级别的点数，由粗到细，不含原始数据级别"""
+    sizes = []
+    points = LEVEL_BASE_POINTS
+    while points < length and points <= MAX_LEVEL_POINTS:
+        sizes.append(points)
+        points *= LEVEL_FACTOR
+    return sizes
+
+
+def build_levels(times, values):
+    """
+    计算各缩放级别的降采样序列
+
+    参数:
+    times: 升序的int64毫秒时间戳
+    values: 对应的价格，不含NaN
+
+    返回:
+    [(时间戳数组, 价格数组), ...]，由粗到细，最后一级为原始数据
+    """
+    levels = []
+    for points in _level_sizes(len(values)):
+        picked = lttb(times, values, points)
+        levels.append((times[picked], values[picked]))
+    levels.append((times, values))
+    return levels
+
+
+def _band_arrays(trends):
+    """趋势区间表转换为列数组，区间类型用 TREND_TYPES 中的序号表示"""
+    codes = {name: i for i, name in enumerate(TREND_TYPES)}
+    return {
+        'start': to_ns(trends['start_date']) // NS_PER_MS,
+        'end': to_ns(trends['end_date']) // NS_PER_MS,
+        'low': trends['low_price'].to_numpy(dtype=float),
+        'high': trends['high_price'].to_numpy(dtype=float),
+        'type': np.array([codes[t] for t in trends['trend_type']],
+                         dtype=np.int8),
+    }
+
+
+def write_chart_data(path, df, trends_by_version, price_col='close'):
+    """
+    保存图表数据
+
+    参数:
+    path: 输出路径（.npz）
+    df: 以日期为索引的数据框（clean_data 之后）
+    trends_by_version: {版本名: 趋势数据框}，如 {'sensitive': ..., 'insensitive': ...}
+    price_col: 价格列名
+    """
+    values = df[price_col].to_numpy(dtype=float)
+    valid = ~np.isnan(values)
+    times = to_ns(df.index)[valid] // NS_PER_MS
+    values = values[valid]
+
+    arrays = {
+        'meta': np.array(json.dumps({
+            'version': CHART_DATA_VERSION,
+            'price_col': str(price_col),
+            'versions': list(trends_by_version),
+        })),
+    }
+    for level, (level_times, level_values) in enumerate(
+            build_levels(times, values)):
+        arrays[f'level{level}_t'] = level_times
+        arrays[f'level{level}_v'] = level_values
+    for version, trends in trends_by_version.items():
+        for name, column in _band_arrays(trends).items():
+            arrays[f'band_{version}_{name}'] = column
+
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+
+
+def _series_json(times, values):
+    return {
+        't': times.tolist(),
+        'v': np.round(values, VALUE_DECIMALS).tolist(),
+    }
+
+
+class ChartData:
+    """
+    读取 write_chart_data 保存的图表数据
+
+    使用方法:
+    chart = ChartData(path)
+    chart.overview()                          # 最粗级别和全部区间
+    chart.window(start_ms, end_ms, points)    # 时间范围内的数据
+    """
+
+    def __init__(self, path):
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in data.files}
+        self.meta = json.loads(str(arrays['meta']))
+        self.levels = []
+        level = 0
+        while f'level{level}_t' in arrays:
+            self.levels.append((arrays[f'level{level}_t'],
+                                arrays[f'level{level}_v']))
+            level += 1
+        self.bands = {
+            version: {
+                name: arrays[f'band_{version}_{name}']
+                for name in ('start', 'end', 'low', 'high', 'type')
+            }
+            for version in self.meta['versions']
+        }
+
+    @property
+    def length(self):
+        """原始数据的点数"""
+        return len(self.levels[-1][0])
+
+    def overview(self):
+        """
+        概览数据：最粗级别的价格序列和全部趋势区间
+
+        返回:
+        可直接序列化为JSON的字典
+        """
+        times, values = self.levels[0]
+        full_times = self.levels[-1][0]
+        return {
+            'version': self.meta['version'],
+            'price_col': self.meta['price_col'],
+            'length': self.length,
+            'start': int(full_times[0]) if len(full_times) else None,
+            'end': int(full_times[-1]) if len(full_times) else None,
+            'trend_types': list(TREND_TYPES),
+            'series': _series_json(times, values),
+            'bands': {
+                version: {
+                    'start': band['start'].tolist(),
+                    'end': band['end'].tolist(),
+                    'low': np.round(band['low'], VALUE_DECIMALS).tolist(),
+                    'high': np.round(band['high'], VALUE_DECIMALS).tolist(),
+                    'type': band['type'].tolist(),
+                }
+                for version, band in self.bands.items()
+            },
+        }
+
+    def window(self, start=None, end=None, points=DEFAULT_WINDOW_POINTS):
+        """
+        时间范围 [start, end] 内的价格序列
+
+        选择范围内点数不少于 points 的最粗级别，再用LTTB降采样到 points 点；
+        范围两侧各多取一个点，平移时曲线可以连到视图边缘。
+
+        参数:
+        start, end: 毫秒时间戳，None 表示不限
+        points: 最多返回的点数
+
+        返回:
+        可直接序列化为JSON的字典
+        """
+        points = max(3, int(points))
+        for level, (times, values) in enumerate(self.levels):
+            lo = 0 if start is None else np.searchsorted(times, start, 'left')
+            hi = (len(times) if end is None
+                  else np.searchsorted(times, end, 'right'))
+            lo, hi = max(lo - 1, 0), min(hi + 1, len(times))
+            if hi - lo >= points or level == len(self.levels) - 1:
+                break
+
+        times, values = times[lo:hi], values[lo:hi]
+        picked = lttb(times, values, points)
+        return {
+            'start': start,
+            'end': end,
+            'level': level,
+            'series': _series_json(times[picked], values[picked]),
+        }
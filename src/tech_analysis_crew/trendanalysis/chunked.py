@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+超大文件的分块趋势分析
+按块读取CSV，通过 StreamingTrendAnalyzer 逐块追加K线，并随时写出已确定的区间。
+每块处理后只保留尾部 order 根K线的重叠区（swing点检测）、ATR周期根TR以及
+检查点之后尚未确定的区间，内存占用与文件大小无关，ATR、swing点和趋势区间
+与整体计算完全一致。
+"""
+
+import os
+import argparse
+import datetime
+import pathlib
+
+import pandas as pd
+
+from streaming import StreamingTrendAnalyzer
+
+
+def _read_last_date(path, block_size=65536):
+    """
+    读取文件最后一行的日期，用于在不读取整个文件的情况下计算时间跨度
+
+    返回:
+    Timestamp，无法解析时返回 None
+    """
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        tail = b''
+        while pos > 0:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            tail = f.read(step) + tail
+            lines = [line for line in tail.splitlines() if line.strip()]
+            if len(lines) > 1 or (pos == 0 and lines):
+                break
+    if not lines:
+        return None
+    field = lines[-1].decode('utf-8', errors='ignore').split(',')[0]
+    last = pd.to_datetime(field.strip().strip('"'), errors='coerce')
+    return None if pd.isna(last) else last
+
+
+def _clean_chunk(chunk):
+    """
+    清理单块数据，规则与 main.clean_data 相同：第一列为日期索引，
+    删除无效日期和第一列数值无效的行，按日期排序
+    """
+    chunk = chunk.set_index(chunk.columns[0])
+    chunk.index = pd.to_datetime(chunk.index, errors='coerce')
+    chunk = chunk[~chunk.index.isna()]
+    numeric_col = chunk.columns[0]
+    chunk[numeric_col] = pd.to_numeric(chunk[numeric_col], errors='coerce')
+    chunk = chunk[chunk[numeric_col].notna()]
+    return chunk.sort_index()
+
+
+def _file_data_info(analyzer, first_chunk, last_date):
+    """
+    由第一块数据估计频率，由首尾日期计算整个文件的时间跨度
+
+    参数自适应只依赖频率和时间跨度，因此与整体读取时的结果一致
+    """
+    data_info = analyzer._detect_data_frequency(first_chunk)
+    if last_date is not None:
+        first_date = first_chunk.index[0]
+        if getattr(first_date, 'tz', None) is not None and last_date.tz is None:
+            last_date = last_date.tz_localize(first_date.tz)
+        data_info['timespan_years'] = (last_date - first_date).days / 365
+    # 总行数需要完整读取文件才能得到，分块模式下不统计
+    data_info['data_points'] = None
+    return data_info
+
+
+def iter_chunked_trends(input_path, analyzers, chunksize=1_000_000,
+                        price_col='close', refine_window=5):
+    """
+    分块读取CSV并逐步产出已确定的趋势区间
+
+    参数:
+    input_path: CSV文件路径，第一列为日期，需按时间升序排列
+    analyzers: TrendAnalyzer实例列表，所有分析器共用一次文件读取
+    chunksize: 每块读取的行数
+    price_col: 价格列名
+    refine_window: 尾部重新优化的区间数量，见 StreamingTrendAnalyzer
+
+    生成:
+    每块处理后产出一个列表，第 i 项为第 i 个分析器新确定的趋势数据框；
+    读取结束后产出剩余的全部区间
+    """
+    streams = [
+        StreamingTrendAnalyzer(analyzer, price_col, refine_window)
+        for analyzer in analyzers
+    ]
+    last_date = _read_last_date(input_path)
+
+    pending = None
+    for chunk in pd.read_csv(input_path, chunksize=chunksize):
+        if len(chunk.columns) < 2:
+            raise ValueError("CSV文件必须至少包含两列：日期列和数值列")
+        chunk = _clean_chunk(chunk)
+        if len(chunk) == 0:
+            continue
+
+        if not streams[0]._fitted:
+            # 频率检测至少需要几根K线，过小的首块与下一块合并
+            pending = chunk if pending is None else pd.concat([pending, chunk])
+            if len(pending) < 3:
+                continue
+            for stream in streams:
+                stream.fit(pending, _file_data_info(
+                    stream.analyzer, pending, last_date))
+            pending = None
+        else:
+            for stream in streams:
+                stream.update(chunk)
+
+        yield [stream.pop_finalized() for stream in streams]
+
+    if pending is not None:
+        for stream in streams:
+            stream.fit(pending)
+    yield [stream.trends for stream in streams]
+
+
+def run_chunked_analysis(input_path, output_dir='crewai-agent/src/tech_analysis_crew/trendanalysis/results',
+                         chunksize=1_000_000, refine_window=5):
+    """
+    分块运行敏感版和不敏感版分析，区间确定后立即追加写入CSV
+
+    输出文件名与 run_analysis 相同；图表、区间价格分析和报告需要完整数据，
+    分块模式下不生成。
+
+    参数:
+    input_path: CSV文件路径
+    output_dir: 输出目录
+    chunksize: 每块读取的行数
+    refine_window: 尾部重新优化的区间数量
+
+    返回:
+    (敏感版CSV路径, 不敏感版CSV路径)
+    """
+    from main import InsensitiveTrendAnalyzer, SensitiveTrendAnalyzer
+
+    os.makedirs(output_dir, exist_ok=True)
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    input_filename = pathlib.Path(input_path).stem
+    paths = [
+        os.path.join(
+            output_dir,
+            f"{timestamp}_{input_filename}-{version}-trend_analysis.csv")
+        for version in ('sensitive', 'insensitive')
+    ]
+
+    analyzers = [SensitiveTrendAnalyzer(), InsensitiveTrendAnalyzer()]
+    written = [0, 0]
+    for i, frames in enumerate(iter_chunked_trends(
+            input_path, analyzers, chunksize, refine_window=refine_window)):
+        for v, trends in enumerate(frames):
+            if len(trends) == 0:
+                continue
+            trends.to_csv(paths[v], mode='a', header=written[v] == 0,
+                          index=False, float_format='%.4f')
+            written[v] += len(trends)
+        print(f"已处理 {i + 1} 块，已写出区间: 敏感版 {written[0]}，"
+              f"不敏感版 {written[1]}")
+
+    print(f"\n分块分析完成! 结果保存到 {output_dir} 文件夹")
+    print(f"敏感版CSV文件: {os.path.basename(paths[0])}")
+    print(f"不敏感版CSV文件: {os.path.basename(paths[1])}")
+    return tuple(paths)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="分块运行敏感版和不敏感版趋势分析")
+    parser.add_argument("input_path", help="输入CSV文件的路径，需按时间升序排列")
+    parser.add_argument(
+        "--output-dir", default="crewai-agent/src/tech_analysis_crew/trendanalysis/results",
+        help="输出目录，默认为results")
+    parser.add_argument(
+        "--chunksize", type=int, default=1_000_000, help="每块读取的行数")
+    parser.add_argument(
+        "--refine-window", type=int, default=5, help="尾部重新优化的区间数量")
+
+    args = parser.parse_args()
+
+    run_chunked_analysis(args.input_path, args.output_dir, args.chunksize,
+                         args.refine_window)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+列式文件（Parquet / Feather / Arrow IPC）的读取
+列式文件可以只读取需要的列，且不需要文本解析。读取依赖 pyarrow，
+只在实际读取列式文件时才导入。
+"""
+
+import pathlib
+
+import pandas as pd
+
+
+# 文件扩展名对应的列式格式
+COLUMNAR_FORMATS = {
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.feather': 'arrow',
+    '.arrow': 'arrow',
+    '.ipc': 'arrow',
+}
+
+
+def columnar_format(path):
+    """
+    根据扩展名判断文件是否为列式格式
+
+    返回:
+    'parquet' 或 'arrow'，其他文件返回 None
+    """
+    return COLUMNAR_FORMATS.get(pathlib.Path(path).suffix.lower())
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as e:
+        raise ImportError(
+            "读取Parquet/Feather/Arrow文件需要安装pyarrow: pip install pyarrow"
+        ) from e
+    return pyarrow
+
+
+def _open_arrow(pa, path):
+    """打开Arrow IPC文件（Feather v2 即IPC文件格式），不是文件格式时按流格式读取"""
+    source = pa.memory_map(str(path), 'r')
+    try:
+        return pa.ipc.open_file(source)
+    except pa.ArrowInvalid:
+        source.seek(0)
+        return pa.ipc.open_stream(source)
+
+
+def _schema(pa, path):
+    if columnar_format(path) == 'parquet':
+        return pa.parquet.read_schema(str(path))
+    return _open_arrow(pa, path).schema
+
+
+def read_column_names(path):
+    """
+    读取列式文件的列名，不读取数据
+
+    以pandas索引保存的列（如 to_parquet 写入的日期索引）排在最前面，
+    与 read_columnar 返回的列顺序一致
+    """
+    pa = _import_pyarrow()
+    schema = _schema(pa, path)
+    metadata = schema.pandas_metadata or {}
+    index_cols = [
+        col for col in metadata.get('index_columns', [])
+        if isinstance(col, str)
+    ]
+    return index_cols + [name for name in schema.names
+                         if name not in index_cols]
+
+
+def read_columnar(path, columns=None):
+    """
+    读取列式文件
+
+    参数:
+    path: 文件路径
+    columns: 需要读取的列名列表，或接收全部列名、返回所需列名的函数；
+             None 时读取全部列
+
+    返回:
+    DataFrame，以pandas索引保存的列恢复为普通列并排在最前面
+    """
+    pa = _import_pyarrow()
+    if callable(columns):
+        columns = columns(read_column_names(path))
+
+    if columnar_format(path) == 'parquet':
+        table = pa.parquet.read_table(str(path), columns=columns)
+    else:
+        # 内存映射读取后再选择列，未选择的列不会被读入内存
+        table = _open_arrow(pa, path).read_all()
+        if columns is not None:
+            table = table.select(columns)
+
+    df = table.to_pandas()
+    if not isinstance(df.index, pd.RangeIndex):
+        df = df.reset_index()
+    return df
+
+
+def read_columnar_head(path, rows=100):
+    """
+    读取列式文件的前若干行，用于识别列类型
+
+    Parquet文件只解码第一批数据，Arrow文件通过内存映射读取
+    """
+    pa = _import_pyarrow()
+    if columnar_format(path) == 'parquet':
+        parquet_file = pa.parquet.ParquetFile(str(path))
+        batch = next(parquet_file.iter_batches(batch_size=rows), None)
+        if batch is None:
+            table = parquet_file.schema_arrow.empty_table()
+        else:
+            table = pa.Table.from_batches([batch])
+    else:
+        table = _open_arrow(pa, path).read_all()
+
+    df = table.slice(0, rows).to_pandas()
+    if not isinstance(df.index, pd.RangeIndex):
+        df = df.reset_index()
+    return df
+
+
+def read_table(path, columns=None):
+    """
+    读取CSV或列式文件
+
+    参数:
+    path: 文件路径，按扩展名识别列式格式，其他文件按CSV读取
+    columns: 列式文件需要读取的列，见 read_columnar；CSV文件总是读取全部列
+
+    返回:
+    DataFrame
+    """
+    if columnar_format(path) is not None:
+        return read_columnar(path, columns)
+    return pd.read_csv(path)
+
+
+def analysis_columns(names, price_col='close'):
+    """
+    趋势分析需要的列：日期列（第一列）、第一个数值列（clean_data 据此清理）、
+    价格列以及计算ATR使用的 high/low 列，保持文件中的顺序
+    """
+    wanted = set(names[:2]) | {price_col, 'high', 'low'}
+    return [name for name in names if name in wanted]
@@ -2,82 +2,86 @@
 # -*- coding: utf-8 -*-
 
 import os
+import io
+import csv
 import pandas as pd
 import argparse
 import numpy as np
 import re
 from pathlib import Path
 import datetime
+import warnings
 
+from pandas.tseries.api import guess_datetime_format
 
-def standardize_csv(input_path):
+from columnar import columnar_format, read_columnar, read_columnar_head
+
+
+# 识别分隔符和列类型时读取的文件开头字节数
+SNIFF_BYTES = 64 * 1024
+# 候选分隔符，按尝试顺序排列
+CANDIDATE_SEPARATORS = [',', '\t', ';', '|']
+
+
+def standardize_csv(input_path, engine='c', parquet_sidecar=False):
     """
     将CSV文件标准化为date和value两列格式
     
+    只用文件开头的一小部分识别分隔符、日期列和值列，然后用C或pyarrow解析器
+    只读取这两列。输入也可以是Parquet/Feather/Arrow文件，此时只读取这两列。
+    
     参数:
     input_path: 输入CSV文件路径
+    engine: 完整读取文件时使用的解析器，'c' 或 'pyarrow'
+    parquet_sidecar: 是否在输入文件旁保存标准化结果的Parquet副本
+                     （<文件名>_std.parquet）。副本比输入文件新时直接读取副本，
+                     不再解析原文件
     
     返回:
     标准化后的DataFrame
     """
     print(f"正在处理文件: {input_path}")
     
-    # 尝试读取CSV文件
+    sidecar = sidecar_path(input_path)
+    if parquet_sidecar and _sidecar_is_fresh(input_path, sidecar):
+        try:
+            new_df = pd.read_parquet(sidecar)
+            print(f"读取标准化副本: {sidecar}")
+            return new_df
+        except Exception as e:
+            print(f"警告: 无法读取标准化副本，重新处理原文件: {e}")
+    
+    columnar = columnar_format(input_path) is not None
+    
+    # 在文件开头识别分隔符和列
     try:
-        # 首先尝试自动检测分隔符
-        df = pd.read_csv(input_path, sep=None, engine='python')
-        
-        # 如果只有一列，可能是其他分隔符
-        if df.shape[1] == 1:
-            # 尝试其他常见分隔符
-            for sep in ['\t', ';', '|']:
-                try:
-                    df = pd.read_csv(input_path, sep=sep)
-                    if df.shape[1] > 1:
-                        break
-                except:
-                    continue
+        if columnar:
+            sep, skipinitialspace = None, False
+            sample_df = read_columnar_head(input_path).astype(str)
+        else:
+            sep, skipinitialspace, sample_df = _sniff_csv(input_path)
     except Exception as e:
         print(f"读取文件失败: {e}")
         return None
     
-    print(f"原始数据形状: {df.shape}")
-    print(f"原始列名: {df.columns.tolist()}")
+    print(f"原始列名: {sample_df.columns.tolist()}")
     
     # 如果列数小于2，可能是格式问题
-    if df.shape[1] < 2:
+    if sample_df.shape[1] < 2:
         print("错误: 输入CSV文件必须至少包含两列（日期和值）")
         return None
     
     # 找出日期列和值列
-    date_col = None
-    value_col = None
-    
-    # 尝试识别日期列
-    for col in df.columns:
-        # 将列转换为字符串类型以便处理
-        df[col] = df[col].astype(str)
-        
-        # 检查列中的值是否像日期
-        date_count = 0
-        for val in df[col].iloc[:20]:  # 检查前20个值
-            # 尝试多种常见日期格式
-            if re.match(r'\d{4}[-/\.]\d{1,2}[-/\.]\d{1,2}', val) or \
-               re.match(r'\d{1,2}[-/\.]\d{1,2}[-/\.]\d{4}', val) or \
-               re.match(r'\d{4}\d{2}\d{2}', val) or \
-               re.match(r'\d{2}[-/\.]\d{2}[-/\.]\d{2}', val):
-                date_count += 1
-        
-        if date_count > 5:  # 如果超过5个值像日期，就认为这是日期列
-            date_col = col
-            break
+    detected_col = _detect_date_column(sample_df)
+    date_col = detected_col
     
     # 如果没找到日期列，使用第一列
     if date_col is None:
-        date_col = df.columns[0]
+        date_col = sample_df.columns[0]
     
     # 值列就是非日期列
-    for col in df.columns:
+    value_col = None
+    for col in sample_df.columns:
         if col != date_col:
             value_col = col
             break
@@ -85,14 +89,43 @@ def standardize_csv(input_path):
     print(f"识别到的日期列: {date_col}")
     print(f"识别到的值列: {value_col}")
     
+    # 只读取日期列和值列，日期列按原始文本读取
+    read_kwargs = {
+        'sep': sep,
+        'usecols': [date_col, value_col],
+        'dtype': {date_col: str},
+    }
+    if engine != 'pyarrow':
+        # pyarrow解析器不支持该参数
+        read_kwargs['skipinitialspace'] = skipinitialspace
+    try:
+        if columnar:
+            df = read_columnar(input_path, [date_col, value_col])
+        else:
+            df = pd.read_csv(input_path, engine=engine, **read_kwargs)
+    except Exception as e:
+        print(f"读取文件失败: {e}")
+        return None
+    
+    print(f"原始数据形状: ({len(df)}, {sample_df.shape[1]})")
+    
+    # 识别日期列时，日期列之前的列（未识别到日期列时为所有列）按字符串处理，
+    # 其中的整数清理后会变为浮点数；日期列之后的列保持读取时的类型
+    values = df[value_col]
+    columns = sample_df.columns.tolist()
+    if values.dtype.kind != 'f' and (
+            detected_col is None
+            or columns.index(value_col) < columns.index(date_col)):
+        values = values.astype(str)
+    
     # 创建新的DataFrame，只包含日期列和值列
     new_df = pd.DataFrame({
         'date': df[date_col],
-        'value': df[value_col]
+        'value': values
     })
     
     # 处理值列
-    new_df['value'] = new_df['value'].apply(clean_value)
+    new_df['value'] = clean_values(new_df['value'])
     
     # 将值列转换为数值
     new_df['value'] = pd.to_numeric(new_df['value'], errors='coerce')
@@ -107,76 +140,275 @@ def standardize_csv(input_path):
     
     print(f"标准化后数据形状: {new_df.shape}")
     
+    if parquet_sidecar:
+        try:
+            new_df.to_parquet(sidecar, index=False)
+            print(f"标准化副本已保存: {sidecar}")
+        except Exception as e:
+            print(f"警告: 无法保存标准化副本: {e}")
+    
     return new_df
 
 
+def sidecar_path(input_path):
+    """标准化结果的Parquet副本路径，与输入文件位于同一目录"""
+    return f"{os.path.splitext(input_path)[0]}_std.parquet"
+
+
+def _sidecar_is_fresh(input_path, sidecar):
+    """副本存在且不早于输入文件时可以直接使用"""
+    try:
+        return os.path.getmtime(sidecar) >= os.path.getmtime(input_path)
+    except OSError:
+        return False
+
+
+def _sniff_csv(input_path, sample_bytes=SNIFF_BYTES, sniff_lines=20):
+    """
+    读取文件开头识别分隔符
+
+    返回:
+    (分隔符, 是否跳过分隔符后的空格, 按该分隔符解析的样本DataFrame)
+    """
+    with open(input_path, 'rb') as f:
+        head = f.read(sample_bytes)
+        complete = f.read(1) == b''
+    text = head.decode('utf-8-sig', errors='replace')
+    if not complete and '\n' in text:
+        # 去掉被截断的最后一行
+        text = text[:text.rfind('\n') + 1]
+
+    try:
+        lines = text.splitlines(keepends=True)
+        dialect = csv.Sniffer().sniff(
+            ''.join(lines[:sniff_lines]),
+            delimiters=''.join(CANDIDATE_SEPARATORS))
+        sep, skipinitialspace = dialect.delimiter, dialect.skipinitialspace
+    except csv.Error:
+        sep, skipinitialspace = CANDIDATE_SEPARATORS[0], False
+
+    sample_df = pd.read_csv(io.StringIO(text), sep=sep, dtype=str,
+                            skipinitialspace=skipinitialspace)
+
+    # 如果只有一列，可能是其他分隔符
+    if sample_df.shape[1] == 1:
+        for other in CANDIDATE_SEPARATORS:
+            if other == sep:
+                continue
+            try:
+                other_df = pd.read_csv(io.StringIO(text), sep=other, dtype=str)
+            except:
+                continue
+            if other_df.shape[1] > 1:
+                return other, False, other_df
+
+    return sep, skipinitialspace, sample_df
+
+
+def _detect_date_column(sample_df, check_rows=20, min_matches=5):
+    """
+    在样本中找出第一个看起来像日期的列
+
+    返回:
+    列名，没有找到时返回 None
+    """
+    for col in sample_df.columns:
+        # 检查列中的值是否像日期
+        date_count = 0
+        for val in sample_df[col].iloc[:check_rows]:  # 检查前20个值
+            if pd.isna(val):
+                continue
+            # 尝试多种常见日期格式
+            if re.match(r'\d{4}[-/\.]\d{1,2}[-/\.]\d{1,2}', val) or \
+               re.match(r'\d{1,2}[-/\.]\d{1,2}[-/\.]\d{4}', val) or \
+               re.match(r'\d{4}\d{2}\d{2}', val) or \
+               re.match(r'\d{2}[-/\.]\d{2}[-/\.]\d{2}', val):
+                date_count += 1
+
+        if date_count > min_matches:  # 如果超过5个值像日期，就认为这是日期列
+            return col
+    return None
+
+
 def process_dates_row_by_row(date_series):
     """
-    逐行处理日期，对每行尝试不同的日期格式
+    将日期统一转换为 YYYY-MM-DD 字符串，结果与逐行尝试各种格式相同
+
+    先在样本上推断日期格式，用一次向量化 to_datetime 解析全部唯一值；
+    只有解析失败或格式有歧义的值才逐个尝试不同格式。相同的字符串只解析一次。
+    无法识别的日期保留原值。
     """
+    if pd.api.types.is_datetime64_any_dtype(date_series):
+        # 已经是日期类型（如列式文件中的日期列）
+        return date_series.dt.strftime('%Y-%m-%d')
+
     # 复制一个新的Series以避免修改原始数据
     processed_dates = date_series.copy()
-    
-    # 常用的日期格式列表
-    date_formats = common_date_formats()
-    
-    # 对每一行单独处理
-    for i, date_str in enumerate(date_series):
-        if pd.isna(date_str) or str(date_str).strip() == '':
+
+    text = date_series.astype(str).str.strip()
+    valid = (date_series.notna() & (text != '')).to_numpy()
+    if not valid.any():
+        return processed_dates
+
+    # 相同的日期字符串只解析一次
+    codes, uniques = pd.factorize(text[valid])
+    uniques = np.asarray(uniques, dtype=object)
+    parsed = _parse_unique_dates(uniques, common_date_formats())
+
+    converted = parsed[codes]
+    changed = np.flatnonzero(valid)[pd.notna(converted)]
+    if len(changed):
+        processed_dates.iloc[changed] = converted[pd.notna(converted)]
+    return processed_dates
+
+
+def _parse_unique_dates(uniques, date_formats, sample_size=200):
+    """
+    解析一组互不相同的日期字符串
+
+    返回:
+    与 uniques 等长的对象数组，元素为 YYYY-MM-DD 字符串，无法解析时为 None
+    """
+    result = np.full(len(uniques), None, dtype=object)
+
+    # 在样本上推断格式，并用逐个解析的结果验证
+    sample = uniques[:sample_size]
+    exact = [_parse_date_string(s, date_formats) for s in sample]
+    result[:len(sample)] = exact
+    date_format = _infer_date_format(sample, exact)
+
+    rest = np.arange(len(sample), len(uniques))
+    if date_format is not None and len(rest):
+        fast, ok = _parse_with_format(uniques[rest], date_format)
+        result[rest[ok]] = fast[ok]
+        rest = rest[~ok]
+
+    # 剩余的值逐个尝试各种格式
+    for i in rest:
+        result[i] = _parse_date_string(uniques[i], date_formats)
+    return result
+
+
+def _infer_date_format(sample, exact):
+    """
+    推断样本的日期格式
+
+    只有按该格式向量化解析的结果与逐个解析完全一致时才采用，否则返回 None
+    """
+    guesses = {}
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        for s in sample[:20]:
+            fmt = guess_datetime_format(s)
+            if fmt is not None:
+                guesses[fmt] = guesses.get(fmt, 0) + 1
+    if not guesses:
+        return None
+    date_format = max(guesses, key=guesses.get)
+
+    fast, ok = _parse_with_format(sample, date_format)
+    if ok.sum() * 2 < len(sample):
+        return None
+    if any(fast[i] != exact[i] for i in np.flatnonzero(ok)):
+        return None
+    return date_format
+
+
+def _parse_with_format(values, date_format):
+    """
+    按指定格式向量化解析日期
+
+    返回:
+    (YYYY-MM-DD 字符串数组, 解析成功且无歧义的布尔数组)
+    """
+    none_parsed = (np.full(len(values), None, dtype=object),
+                   np.zeros(len(values), dtype=bool))
+    try:
+        parsed = pd.to_datetime(
+            pd.Series(values, dtype=object), format=date_format,
+            errors='coerce')
+    except (ValueError, TypeError, OverflowError):
+        return none_parsed
+    if not pd.api.types.is_datetime64_any_dtype(parsed):
+        # 混合时区等无法统一解析的情况
+        return none_parsed
+    if parsed.dt.tz is not None:
+        # 与逐个解析一致，取原时区下的日期
+        parsed = parsed.dt.tz_localize(None)
+
+    # 四位年份之外的日期交给逐个解析处理
+    ok = (parsed.notna() & parsed.dt.year.between(1000, 9999)).to_numpy()
+
+    # 日在月之前的格式（如 %d/%m/%Y）对日、月都不超过12的值有歧义，
+    # 逐个解析时会按月在前理解，这些值交给逐个解析处理
+    if '%d' in date_format and '%m' in date_format and \
+            date_format.index('%d') < date_format.index('%m'):
+        swapped = date_format.replace('%d', '\0').replace(
+            '%m', '%d').replace('\0', '%m')
+        try:
+            ambiguous = pd.to_datetime(
+                pd.Series(values, dtype=object), format=swapped,
+                errors='coerce').notna().to_numpy()
+        except (ValueError, TypeError, OverflowError):
+            ambiguous = np.ones(len(values), dtype=bool)
+        ok = ok & ~ambiguous
+
+    dates = np.full(len(values), None, dtype=object)
+    dates[ok] = parsed[ok].to_numpy().astype('datetime64[D]').astype(str)
+    return dates, ok
+
+
+def _parse_date_string(date_str, date_formats):
+    """
+    逐个尝试不同的日期格式解析单个日期字符串
+
+    返回:
+    YYYY-MM-DD 字符串，无法解析时返回 None
+    """
+    # 1. 尝试直接转换
+    try:
+        date_obj = pd.to_datetime(date_str)
+        return date_obj.strftime('%Y-%m-%d')
+    except:
+        pass
+
+    # 2. 尝试各种格式
+    for fmt in date_formats:
+        try:
+            date_obj = datetime.datetime.strptime(date_str, fmt)
+            return date_obj.strftime('%Y-%m-%d')
+        except:
             continue
-        
-        date_str = str(date_str).strip()
-        converted = False
-        
-        # 1. 尝试直接转换
+
+    # 3. 特殊情况处理
+    # 3.1 处理中文日期
+    if '年' in date_str and '月' in date_str:
         try:
+            date_str = date_str.replace('年', '-').replace('月', '-').replace('日', '')
             date_obj = pd.to_datetime(date_str)
-            processed_dates.iloc[i] = date_obj.strftime('%Y-%m-%d')
-            converted = True
+            return date_obj.strftime('%Y-%m-%d')
         except:
-            # 2. 尝试各种格式
-            for fmt in date_formats:
-                try:
-                    date_obj = datetime.datetime.strptime(date_str, fmt)
-                    processed_dates.iloc[i] = date_obj.strftime('%Y-%m-%d')
-                    converted = True
-                    break
-                except:
-                    continue
-        
-        # 3. 特殊情况处理
-        if not converted:
-            # 3.1 处理中文日期
-            if '年' in date_str and '月' in date_str:
-                try:
-                    date_str = date_str.replace('年', '-').replace('月', '-').replace('日', '')
-                    date_obj = pd.to_datetime(date_str)
-                    processed_dates.iloc[i] = date_obj.strftime('%Y-%m-%d')
-                    converted = True
-                except:
-                    pass
-            
-            # 3.2 处理仅有数字的情况
-            if not converted and re.match(r'^\d+$', date_str):
-                # 尝试 YYYYMMDD
-                if len(date_str) == 8:
-                    try:
-                        date_obj = datetime.datetime.strptime(date_str, '%Y%m%d')
-                        processed_dates.iloc[i] = date_obj.strftime('%Y-%m-%d')
-                        converted = True
-                    except:
-                        pass
-                
-                # 尝试 YYMMDD
-                elif len(date_str) == 6:
-                    try:
-                        date_obj = datetime.datetime.strptime(date_str, '%y%m%d')
-                        processed_dates.iloc[i] = date_obj.strftime('%Y-%m-%d')
-                        converted = True
-                    except:
-                        pass
-    
-    return processed_dates
+            pass
+
+    # 3.2 处理仅有数字的情况
+    if re.match(r'^\d+$', date_str):
+        # 尝试 YYYYMMDD
+        if len(date_str) == 8:
+            try:
+                date_obj = datetime.datetime.strptime(date_str, '%Y%m%d')
+                return date_obj.strftime('%Y-%m-%d')
+            except:
+                pass
+
+        # 尝试 YYMMDD
+        elif len(date_str) == 6:
+            try:
+                date_obj = datetime.datetime.strptime(date_str, '%y%m%d')
+                return date_obj.strftime('%Y-%m-%d')
+            except:
+                pass
+
+    return None
 
 
 def detect_and_convert_dates(df):
@@ -336,13 +568,128 @@ def clean_value(val):
         return np.nan
 
 
-def main(input_path, output_dir='crewai-agent/src/tech_analysis_crew/trendanalysis/results'):
+# clean_value 使用的规则，clean_values 中按列执行
+NULL_TOKENS = ('', 'nan', 'null', 'none', '-', 'n/a')
+CURRENCY_SYMBOLS = '$¥€£₽₹'
+THOUSANDS_PATTERN = re.compile(r'^-?[\d,]+\.?\d*%?$')
+
+
+def clean_values(values):
+    """
+    向量化的 clean_value，对整列执行相同的清理规则，结果与逐个调用 clean_value 相同
+
+    相同的字符串只清理一次；去空白、去货币符号、去百分号等用numpy字符串函数
+    对整列处理，只有含逗号的值需要逐个匹配千位分隔符格式。非字符串元素保持原值。
+
+    参数:
+    values: 值列Series
+
+    返回:
+    清理后的Series
+    """
+    if values.dtype.kind in 'biufcmM':
+        return values.copy()
+
+    raw = values.to_numpy(dtype=object)
+    if pd.api.types.is_string_dtype(values.dtype) and values.dtype != object:
+        is_text = values.notna().to_numpy()
+    else:
+        is_text = np.fromiter(
+            (isinstance(v, str) for v in raw), dtype=bool, count=len(raw))
+
+    strings = raw[is_text]
+    if '\x00' in ''.join(strings):
+        # pandas的哈希表和numpy字符串都会忽略末尾的空字符，这种少见的数据逐个处理
+        numbers = np.array([clean_value(s) for s in strings], dtype=float)
+    else:
+        # 相同的字符串只清理一次
+        codes, uniques = pd.factorize(strings)
+        numbers = _clean_unique_strings(
+            np.asarray(uniques, dtype=object))[codes]
+
+    others = ~is_text & pd.notna(raw)
+    if others.any():
+        # 混有非字符串的值时保持原值，与 clean_value 一致
+        cleaned = raw.copy()
+        cleaned[is_text] = numbers
+        cleaned[~is_text & ~others] = np.nan
+        return pd.Series(cleaned, index=values.index, name=values.name)
+
+    cleaned = np.full(len(raw), np.nan)
+    cleaned[is_text] = numbers
+    return pd.Series(cleaned, index=values.index, name=values.name)
+
+
+def _clean_unique_strings(strings):
+    """对互不相同的字符串执行 clean_value 的规则，返回浮点数组"""
+    if len(strings) == 0:
+        return np.empty(0)
+
+    text = np.asarray(strings, dtype=str)
+    # 全部是普通数字时（最常见的情况）直接转换：float 能解析的字符串
+    # 不含货币符号、逗号和百分号，清理规则不会改变它们
+    with np.errstate(over='ignore'):
+        try:
+            return text.astype(float)
+        except ValueError:
+            pass
+
+    text = np.char.strip(text)
+    null = np.isin(np.char.lower(text), NULL_TOKENS)
+
+    # 移除货币符号
+    for symbol in CURRENCY_SYMBOLS:
+        if (np.char.find(text, symbol) >= 0).any():
+            text = np.char.replace(text, symbol, '')
+
+    # 移除千位分隔符（仅处理数字中的逗号）
+    comma = np.flatnonzero(np.char.find(text, ',') >= 0)
+    separated = comma[
+        [bool(THOUSANDS_PATTERN.match(s)) for s in text[comma].tolist()]]
+    if len(separated):
+        text[separated] = np.char.replace(text[separated], ',', '')
+
+    # 处理百分比
+    percent = np.char.find(text, '%') >= 0
+    if percent.any():
+        text[percent] = np.char.replace(text[percent], '%', '')
+
+    numbers = _strings_to_float(text)
+    numbers[percent] = numbers[percent] / 100
+    numbers[null] = np.nan
+    return numbers
+
+
+def _strings_to_float(text):
+    """
+    将字符串数组转换为浮点数组，无法转换的为NaN，结果与逐个调用 float 相同
+    """
+    # numpy的字符串转换与 float 的解析和舍入相同
+    with np.errstate(over='ignore'):
+        try:
+            return text.astype(float)
+        except ValueError:
+            pass
+
+    numbers = np.full(len(text), np.nan)
+    for i, s in enumerate(text.tolist()):
+        try:
+            numbers[i] = float(s)
+        except ValueError:
+            pass
+    return numbers
+
+
+def main(input_path, output_dir='crewai-agent/src/tech_analysis_crew/trendanalysis/results', engine='c',
+         parquet_sidecar=False):
     """
     主函数，处理输入文件并生成标准化后的CSV
     
     参数:
     input_path: 输入CSV文件路径
     output_dir: 输出目录，默认与输入文件相同
+    engine: CSV解析器，'c' 或 'pyarrow'
+    parquet_sidecar: 是否保存并复用标准化结果的Parquet副本
     """
     # 获取文件路径信息
     input_path = os.path.abspath(input_path)
@@ -357,12 +704,15 @@ def main(input_path, output_dir='crewai-agent/src/tech_analysis_crew/trendanalys
         # 确保输出目录存在
         os.makedirs(output_dir, exist_ok=True)
     
-    # 标准化后的文件名
+    # 标准化后的文件名，列式输入的结果同样保存为CSV
+    if columnar_format(input_path) is not None:
+        ext = '.csv'
     std_filename = f"{name}_std{ext}"
     output_path = os.path.join(output_dir, std_filename)
     
     # 标准化CSV
-    std_df = standardize_csv(input_path)
+    std_df = standardize_csv(
+        input_path, engine=engine, parquet_sidecar=parquet_sidecar)
     
     if std_df is not None:
         # 保存标准化后的CSV
@@ -376,9 +726,13 @@ def main(input_path, output_dir='crewai-agent/src/tech_analysis_crew/trendanalys
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="CSV数据标准化工具")
-    parser.add_argument("input_path", help="输入CSV文件的路径")
+    parser.add_argument("input_path", help="输入CSV文件的路径，也支持Parquet/Feather/Arrow文件")
     parser.add_argument("--output-dir", help="输出目录，默认与输入文件相同")
+    parser.add_argument("--engine", choices=['c', 'pyarrow'], default='c',
+                        help="CSV解析器，默认为c")
+    parser.add_argument("--parquet-sidecar", action="store_true",
+                        help="保存标准化结果的Parquet副本，下次直接读取副本")
     
     args = parser.parse_args()
     
-    main(args.input_path, args.output_dir)
+    main(args.input_path, args.output_dir, args.engine, args.parquet_sidecar)
@@ -1,10 +1,14 @@
+import numpy as np
 import pandas as pd
 import os
 import argparse
 import sys
-import csv
+import re
 import logging
 
+from columnar import columnar_format, read_table
+from range_index import RangeExtremumIndex
+
 
 # 配置日志系统
 def setup_logger(log_level=logging.INFO):
@@ -31,14 +35,303 @@ def setup_logger(log_level=logging.INFO):
 logger = setup_logger()
 
 
+def _to_float_values(series):
+    """
+    将价格列转换为浮点数组，字符串中的逗号会被移除
+
+    返回:
+    (数值数组, 无法转换的元素掩码)
+    """
+    if series.dtype.kind in 'biuf':
+        return series.to_numpy(dtype=float), np.zeros(len(series), dtype=bool)
+
+    # 非字符串元素的 str() 结果可以无损地转换回浮点数
+    text = series.astype(str).str.replace(',', '', regex=False)
+    values = np.array(pd.to_numeric(text, errors='coerce'), dtype=float)
+    invalid = np.zeros(len(series), dtype=bool)
+    # pandas无法解析的少数元素按 float() 的规则逐个转换
+    for i in np.flatnonzero(np.isnan(values)):
+        try:
+            values[i] = float(text.iloc[i])
+        except (TypeError, ValueError):
+            invalid[i] = True
+    return values, invalid
+
+
+def _interval_extreme_dates(original_df, price_col, start_dates, end_dates,
+                            range_index=None):
+    """
+    计算每个趋势区间内最高价格和最低价格对应的日期
+
+    区间 [start_date, end_date] 与 original_df.loc[start_date:end_date] 一致，
+    所有区间边界通过 searchsorted 一次定位，最值位置由区间最值索引批量查询。
+
+    参数:
+    range_index: 可选，基于 original_df[price_col] 建立的 RangeExtremumIndex
+                 （skipna=True），提供时直接复用
+
+    返回:
+    (最高价格日期数组, 最低价格日期数组)，格式为yyyy-mm-dd，
+    区间内没有有效数据时为 None
+    """
+    result_high = np.full(len(start_dates), None, dtype=object)
+    result_low = np.full(len(start_dates), None, dtype=object)
+    if not isinstance(original_df.index, pd.DatetimeIndex):
+        logger.warning("原始数据的日期列无法转换为日期类型，无法定位区间")
+        return result_high, result_low
+
+    has_date = ~original_df.index.isna()
+    index = original_df.index[has_date]
+    if range_index is not None and (
+            not has_date.all() or len(range_index) != len(index)
+            or not range_index.skipna and range_index.has_nan):
+        range_index = None
+    if range_index is None:
+        values, invalid = _to_float_values(original_df[price_col][has_date])
+        range_index = RangeExtremumIndex(values, skipna=True)
+    else:
+        invalid = np.zeros(len(index), dtype=bool)
+
+    starts = pd.to_datetime(pd.Series(start_dates), errors='coerce')
+    ends = pd.to_datetime(pd.Series(end_dates), errors='coerce')
+    bounded = (starts.notna() & ends.notna()).to_numpy()
+    left = index.searchsorted(starts[bounded].to_numpy(), side='left')
+    right = index.searchsorted(ends[bounded].to_numpy(), side='right')
+
+    # 与逐区间转换一致：区间内存在无法转换的价格时整个区间不计算
+    invalid_count = np.concatenate(([0], np.cumsum(invalid)))
+    usable = (left < right) & (invalid_count[right] == invalid_count[left])
+
+    rows = np.flatnonzero(bounded)[usable]
+    if len(rows):
+        high_pos = range_index.argmax(left[usable], right[usable] - 1)
+        low_pos = range_index.argmin(left[usable], right[usable] - 1)
+        # 区间内全部为NaN时没有最值
+        has_value = ~np.isnan(range_index.values[high_pos])
+        rows = rows[has_value]
+        result_high[rows] = index[high_pos[has_value]].strftime('%Y-%m-%d')
+        result_low[rows] = index[low_pos[has_value]].strftime('%Y-%m-%d')
+    return result_high, result_low
+
+
+def _find_price_col(df):
+    """
+    按常见列名确定价格列，找不到时使用第一列，没有列时返回None
+
+    参数:
+    df: 数据框或列名列表
+    """
+    columns = list(getattr(df, 'columns', df))
+    price_col = 'close'
+    if price_col in columns:
+        return price_col
+    # 尝试其他可能的价格列名
+    possible_price_cols = ['value', 'price', 'Close', 'Price', 'Value']
+    for col in possible_price_cols:
+        if col in columns:
+            return col
+    # 如果没有找到价格列，使用第一列
+    if len(columns) > 0:
+        logger.warning(f"未找到价格列，使用 '{columns[0]}' 列作为价格数据")
+        return columns[0]
+    return None
+
+
+def _find_date_col(columns):
+    """按常见列名确定原始数据的日期列，找不到时使用第一列"""
+    # 尝试其他可能的日期列名
+    possible_date_cols = [
+        'date', 'time', 'timestamp', 'Date', 'Time', 'Timestamp'
+    ]
+    for col in possible_date_cols:
+        if col in columns:
+            return col
+    # 如果没有找到日期列，使用第一列作为索引
+    logger.warning(f"未找到日期列，使用 '{columns[0]}' 列作为日期")
+    return columns[0]
+
+
+def _original_data_columns(names):
+    """列式原始数据文件只读取日期列和价格列"""
+    date_col = _find_date_col(names)
+    price_col = _find_price_col([name for name in names if name != date_col])
+    return [name for name in names if name in (date_col, price_col)]
+
+
+def _format_trend_dates(trends_df):
+    """尝试将起止日期列转换为日期类型，并格式化为yyyy-mm-dd"""
+    for date_col in ['start_date', 'end_date']:
+        if date_col in trends_df.columns:
+            try:
+                # 转换为日期类型
+                trends_df[date_col] = pd.to_datetime(trends_df[date_col])
+                # 格式化为yyyy-mm-dd
+                trends_df[date_col] = trends_df[date_col].dt.strftime(
+                    '%Y-%m-%d')
+            except Exception as e:
+                logger.warning(f"无法将 {date_col} 列转换为日期类型: {e}")
+    return trends_df
+
+
+def enrich_trend_intervals(trends_df, price_df, price_col=None,
+                           output_path=None, range_index=None):
+    """
+    在内存中分析趋势区间，添加最高点日期和最低点日期
+    
+    参数:
+    trends_df: 趋势数据框，如 TrendAnalyzer.analyze 的结果
+    price_df: 以日期为索引的价格数据框，如 clean_data 的结果
+    price_col: 价格列名，为None时按列名自动识别
+    output_path: 可选，提供时将结果写入该CSV文件
+    range_index: 可选，基于 price_df[price_col] 建立的 RangeExtremumIndex，
+                 对同一价格数据多次调用时可以复用，如 SharedStages.range_index
+    
+    返回:
+    添加了 high_price_date 和 low_price_date 列的新数据框，出错时返回None
+    """
+    try:
+        if 'start_date' not in trends_df or 'end_date' not in trends_df:
+            logger.error("趋势数据缺少 start_date/end_date 列")
+            return None
+        
+        trends_df = _format_trend_dates(trends_df.copy())
+        
+        if price_col is None:
+            price_col = _find_price_col(price_df)
+            if price_col is None:
+                logger.error("价格数据没有列")
+                return trends_df
+        
+        logger.info(f"使用 '{price_col}' 列作为价格数据")
+        
+        # 初始化新列
+        trends_df['high_price_date'] = None
+        trends_df['low_price_date'] = None
+        
+        # 所有区间一次性定位并计算最高/最低价格日期
+        try:
+            high_dates, low_dates = _interval_extreme_dates(
+                price_df, price_col,
+                trends_df['start_date'], trends_df['end_date'], range_index)
+            trends_df['high_price_date'] = pd.Series(
+                high_dates, index=trends_df.index, dtype=object)
+            trends_df['low_price_date'] = pd.Series(
+                low_dates, index=trends_df.index, dtype=object)
+        except Exception as e:
+            logger.warning(f"无法计算区间的最高/最低价格日期: {e}")
+        
+        missing = int(trends_df['high_price_date'].isna().sum())
+        logger.info(f"已分析 {len(trends_df)} 个区间")
+        if missing:
+            logger.warning(f"{missing} 个区间在原始数据中没有对应的有效数据点")
+        
+        if output_path is not None:
+            _write_enhanced_csv(trends_df, output_path)
+            logger.info(f"分析完成! 结果已保存到 {output_path}")
+        
+        return trends_df
+    except Exception as e:
+        logger.error(f"错误: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+
+# 增强分析结果中按日期和数值格式输出的列
+DATE_COLUMNS = ['start_date', 'end_date', 'high_price_date', 'low_price_date']
+NUMERIC_COLUMNS = [
+    'start_price', 'end_price', 'low_price', 'high_price', 'pct_change'
+]
+
+# 不使用引号时需要用反斜杠转义的字符，与 csv.writer(QUOTE_NONE, escapechar='\\') 一致
+_CSV_SPECIAL = re.compile(r'([,"\\\r\n])')
+_DATE_TEXT = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+def _escape_fields(fields):
+    """转义包含分隔符、引号、反斜杠或换行的字段"""
+    return [
+        _CSV_SPECIAL.sub(r'\\\1', f) if _CSV_SPECIAL.search(f) else f
+        for f in fields
+    ]
+
+
+def _format_date_column(series):
+    """将日期列格式化为yyyy-mm-dd，无法转换的值原样输出，空值输出为空字符串"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.dt.strftime('%Y-%m-%d').fillna('').tolist()
+
+    values = series.tolist()
+    missing = series.isna().to_numpy()
+    # 已经是yyyy-mm-dd格式的字符串转换前后不变，只逐个处理其余的不同取值
+    cache = {}
+    out = []
+    for value, is_missing in zip(values, missing):
+        if is_missing:
+            out.append('')
+        elif isinstance(value, str) and _DATE_TEXT.fullmatch(value):
+            out.append(value)
+        else:
+            if value not in cache:
+                try:
+                    cache[value] = pd.to_datetime(value).strftime('%Y-%m-%d')
+                except Exception:
+                    cache[value] = str(value)
+            out.append(cache[value])
+    return out
+
+
+def _format_numeric_column(series):
+    """将数值列格式化为4位小数，字符串中的逗号会被移除，无法转换的值原样输出"""
+    missing = series.isna().to_numpy()
+    if series.dtype.kind in 'biuf':
+        values = series.to_numpy(dtype=float)
+        unconverted = np.zeros(len(series), dtype=bool)
+    else:
+        values, unconverted = _to_float_values(series)
+    out = np.char.mod('%.4f', values).astype(object)
+    out[unconverted] = series[unconverted].astype(str).to_numpy()
+    out[missing] = ''
+    return out.tolist()
+
+
+def _write_enhanced_csv(trends_df, output_path):
+    """
+    按固定格式写出增强分析结果：不使用引号，日期为yyyy-mm-dd，价格保留4位小数
+
+    各列整体格式化后一次性写出，输出与逐行使用
+    csv.writer(quoting=csv.QUOTE_NONE, escapechar='\\') 写出的内容完全一致
+    """
+    columns = []
+    for col in trends_df.columns:
+        series = trends_df[col]
+        if col in DATE_COLUMNS:
+            fields = _format_date_column(series)
+        elif col in NUMERIC_COLUMNS:
+            fields = _format_numeric_column(series)
+        else:
+            missing = series.isna().to_numpy()
+            fields = [
+                '' if is_missing else str(value)
+                for value, is_missing in zip(series.tolist(), missing)
+            ]
+        columns.append(_escape_fields(fields))
+
+    header = ','.join(_escape_fields([str(col) for col in trends_df.columns]))
+    lines = [header] + [','.join(row) for row in zip(*columns)]
+    with open(output_path, 'w', newline='', encoding='utf-8') as f:
+        f.write('\r\n'.join(lines) + '\r\n')
+
+
 def analyze_trend_intervals(trend_csv_path, original_data_path, output_path=None):
     """
     分析趋势区间的详细信息，添加最高点日期和最低点日期
     
     参数:
-    trend_csv_path: 趋势分析CSV文件路径
-    original_data_path: 原始数据CSV文件路径
-    output_path: 输出文件路径，如果为None则覆盖原文件
+    trend_csv_path: 趋势分析CSV文件路径（也可以是Parquet/Feather/Arrow文件）
+    original_data_path: 原始数据CSV文件路径，Parquet/Feather/Arrow文件
+                        只读取日期列和价格列
+    output_path: 输出文件路径，如果为None则覆盖原文件（列式文件时写入同名CSV）
     
     返回:
     更新后的趋势数据框
@@ -57,41 +350,20 @@ def analyze_trend_intervals(trend_csv_path, original_data_path, output_path=None
             return None
         
         # 读取趋势分析CSV文件
-        trends_df = pd.read_csv(trend_csv_path)
+        trends_df = read_table(trend_csv_path)
         logger.info(f"读取趋势分析文件成功，包含 {len(trends_df)} 个区间")
         
-        # 尝试将日期列转换为日期类型，并格式化为yyyy-mm-dd
-        for date_col in ['start_date', 'end_date']:
-            if date_col in trends_df.columns:
-                try:
-                    # 转换为日期类型
-                    trends_df[date_col] = pd.to_datetime(trends_df[date_col])
-                    # 格式化为yyyy-mm-dd
-                    trends_df[date_col] = trends_df[date_col].dt.strftime(
-                        '%Y-%m-%d')
-                except Exception as e:
-                    logger.warning(f"无法将 {date_col} 列转换为日期类型: {e}")
+        # 将日期列格式化为yyyy-mm-dd
+        trends_df = _format_trend_dates(trends_df)
         
         # 读取原始数据CSV文件
         try:
-            original_df = pd.read_csv(original_data_path)
+            original_df = read_table(
+                original_data_path, columns=_original_data_columns)
             logger.info(f"读取原始数据文件成功，包含 {len(original_df)} 行数据")
             
             # 尝试找到日期列
-            date_col = 'date'
-            if date_col not in original_df.columns:
-                # 尝试其他可能的日期列名
-                possible_date_cols = [
-                    'time', 'timestamp', 'Date', 'Time', 'Timestamp'
-                ]
-                for col in possible_date_cols:
-                    if col in original_df.columns:
-                        date_col = col
-                        break
-                else:
-                    # 如果没有找到日期列，使用第一列作为索引
-                    date_col = original_df.columns[0]
-                    logger.warning(f"未找到日期列，使用 '{date_col}' 列作为日期")
+            date_col = _find_date_col(original_df.columns)
             
             # 将日期列转换为日期类型并设置为索引
             try:
@@ -107,158 +379,20 @@ def analyze_trend_intervals(trend_csv_path, original_data_path, output_path=None
             return trends_df
         
         # 确定价格列
-        price_col = 'close'
-        if price_col not in original_df.columns:
-            # 尝试其他可能的价格列名
-            possible_price_cols = ['value', 'price', 'Close', 'Price', 'Value']
-            for col in possible_price_cols:
-                if col in original_df.columns:
-                    price_col = col
-                    break
-            else:
-                # 如果没有找到价格列，使用第一列
-                if len(original_df.columns) > 0:
-                    price_col = original_df.columns[0]
-                    logger.warning(
-                        f"未找到价格列，使用 '{price_col}' 列作为价格数据")
-                else:
-                    logger.error("原始数据文件没有列")
-                    return trends_df
-        
-        logger.info(f"使用 '{price_col}' 列作为价格数据")
-        
-        # 初始化新列
-        trends_df['high_price_date'] = None
-        trends_df['low_price_date'] = None
-        
-        # 对每个趋势区间进行分析
-        for i, row in trends_df.iterrows():
-            try:
-                start_date = pd.to_datetime(row['start_date'])
-                end_date = pd.to_datetime(row['end_date'])
-                
-                logger.info(
-                    f"分析区间 {i+1}/{len(trends_df)}: {start_date} 到 {end_date}")
-                
-                # 获取区间内的数据
-                try:
-                    interval_data = original_df.loc[start_date:end_date]
-                except Exception:
-                    # 如果日期索引失败，尝试使用字符串比较
-                    interval_data = original_df[
-                        (original_df.index >= start_date) & 
-                        (original_df.index <= end_date)
-                    ]
-                
-                if not interval_data.empty:
-                    logger.info(f"  区间内有 {len(interval_data)} 个数据点")
-                    
-                    # 找到最高价格和最低价格对应的日期
-                    try:
-                        # 确保价格列是数值类型
-                        if interval_data[price_col].dtype == 'object':
-                            # 如果是字符串类型，尝试转换为数值
-                            # 先移除逗号等非数字字符
-                            interval_data[price_col] = interval_data[
-                                price_col].apply(
-                                    lambda x: float(str(x).replace(',', '')) 
-                                    if isinstance(x, str) else float(x)
-                                )
-                        
-                        high_price_date = interval_data[price_col].idxmax()
-                        low_price_date = interval_data[price_col].idxmin()
-                        
-                        high_price = interval_data.loc[
-                            high_price_date, price_col]
-                        low_price = interval_data.loc[
-                            low_price_date, price_col]
-                        
-                        logger.info(
-                            f"  最高价格: {high_price} 于 {high_price_date}")
-                        logger.info(
-                            f"  最低价格: {low_price} 于 {low_price_date}")
-                        
-                        # 将日期转换为yyyy-mm-dd格式
-                        high_price_date_fmt = pd.to_datetime(
-                            high_price_date).strftime('%Y-%m-%d')
-                        low_price_date_fmt = pd.to_datetime(
-                            low_price_date).strftime('%Y-%m-%d')
-                        
-                        # 更新趋势数据框
-                        trends_df.at[i, 'high_price_date'] = high_price_date_fmt
-                        trends_df.at[i, 'low_price_date'] = low_price_date_fmt
-                    except Exception as e:
-                        logger.warning(f"  无法找到区间的最高/最低价格日期: {e}")
-                else:
-                    logger.warning("  区间在原始数据中没有对应的数据点")
-            except Exception as e:
-                logger.warning(f"  处理区间时出错: {e}")
+        price_col = _find_price_col(original_df)
+        if price_col is None:
+            logger.error("原始数据文件没有列")
+            return trends_df
         
         # 保存更新后的文件
         if output_path is None:
             output_path = trend_csv_path
+            if columnar_format(trend_csv_path) is not None:
+                # 结果总是CSV格式，不覆盖列式文件
+                output_path = os.path.splitext(trend_csv_path)[0] + '.csv'
         
-        # 使用自定义方式保存CSV，确保数值格式正确
-        with open(output_path, 'w', newline='', encoding='utf-8') as f:
-            # 创建CSV写入器，禁用引号
-            writer = csv.writer(f, quoting=csv.QUOTE_NONE, escapechar='\\')
-            
-            # 写入表头
-            writer.writerow(trends_df.columns)
-            
-            # 写入数据行
-            for _, row in trends_df.iterrows():
-                # 处理每一行数据
-                row_data = []
-                for col in trends_df.columns:
-                    value = row[col]
-                    
-                    # 处理日期列
-                    if col in ['start_date', 'end_date', 
-                               'high_price_date', 'low_price_date']:
-                        if pd.notna(value):
-                            # 确保日期格式为yyyy-mm-dd
-                            try:
-                                date_value = pd.to_datetime(value).strftime(
-                                    '%Y-%m-%d')
-                                row_data.append(date_value)
-                            except Exception:
-                                row_data.append(value)
-                        else:
-                            row_data.append('')
-                    
-                    # 处理数值列
-                    elif col in ['start_price', 'end_price', 'low_price', 
-                                'high_price', 'pct_change']:
-                        if pd.notna(value):
-                            # 处理可能带有逗号的数值字符串
-                            try:
-                                if isinstance(value, str):
-                                    # 移除逗号等非数字字符
-                                    clean_value = value.replace(',', '')
-                                    numeric_value = float(clean_value)
-                                else:
-                                    numeric_value = float(value)
-                                # 格式化为数字，不使用千位分隔符
-                                row_data.append(f"{numeric_value:.4f}")
-                            except Exception:
-                                # 如果转换失败，保留原值
-                                row_data.append(value)
-                        else:
-                            row_data.append('')
-                    
-                    # 处理其他列
-                    else:
-                        if pd.isna(value):
-                            row_data.append('')
-                        else:
-                            row_data.append(value)
-                
-                writer.writerow(row_data)
-        
-        logger.info(f"分析完成! 结果已保存到 {output_path}")
-        
-        return trends_df
+        return enrich_trend_intervals(
+            trends_df, original_df, price_col, output_path)
     except Exception as e:
         logger.error(f"错误: {e}")
         import traceback
@@ -275,7 +409,8 @@ def main():
     parser.add_argument(
         '--trend', type=str, required=True, help='趋势分析CSV文件路径')
     parser.add_argument(
-        '--data', type=str, required=True, help='原始数据CSV文件路径')
+        '--data', type=str, required=True,
+        help='原始数据文件路径，支持CSV和Parquet/Feather/Arrow')
     parser.add_argument(
         '--output', type=str, help='输出文件路径，默认覆盖原文件')
     
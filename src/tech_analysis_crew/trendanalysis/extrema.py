@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+局部极值点检测
+使用O(n)的滑动窗口最大/最小值算法代替 argrelextrema 的 O(n·order) 比较
+"""
+
+import numpy as np
+
+
+# 支持的极值检测方式
+SWING_METHODS = ('sliding', 'argrelextrema')
+
+
+def sliding_max(values, window):
+    """
+    计算每个长度为window的滑动窗口内的最大值
+
+    使用van Herk/Gil-Werman分块算法：在每个块内计算前缀最大值和后缀最大值，
+    任意窗口的最大值等于两者之一的组合，总复杂度O(n)且与窗口大小无关。
+    NaN会像 np.maximum 一样向所在窗口传播。
+
+    参数:
+    values: 一维数组
+    window: 窗口长度
+
+    返回:
+    长度为 len(values) - window + 1 的数组，第j个元素为 values[j:j+window] 的最大值
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    window = int(window)
+    if window <= 0:
+        raise ValueError(f"窗口长度必须为正数: {window}")
+    if n < window:
+        return np.empty(0)
+    if window == 1:
+        return values.copy()
+
+    # 补齐到window的整数倍，按块计算前缀/后缀最大值
+    n_blocks = -(-n // window)
+    padded = np.full(n_blocks * window, -np.inf)
+    padded[:n] = values
+    blocks = padded.reshape(n_blocks, window)
+    prefix = np.maximum.accumulate(blocks, axis=1).ravel()
+    suffix = np.maximum.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+
+    count = n - window + 1
+    return np.maximum(suffix[:count], prefix[window - 1:window - 1 + count])
+
+
+def sliding_min(values, window):
+    """计算每个长度为window的滑动窗口内的最小值，参数同 sliding_max"""
+    return -sliding_max(-np.asarray(values, dtype=float), window)
+
+
+def _neighbour_max(values, order):
+    """
+    计算每个点左右两侧order个邻居（不含自身）的最大值，超出边界的部分忽略
+
+    返回:
+    (left, right) 两个与values等长的数组
+    """
+    n = len(values)
+    pad = np.full(order, -np.inf)
+    left = sliding_max(np.concatenate((pad, values)), order)[:n]
+    right = sliding_max(np.concatenate((values, pad)), order)[1:n + 1]
+    return left, right
+
+
+def _local_max_mask(values, order, strict):
+    """标记局部极大值点，语义与 argrelextrema(mode='clip') 一致"""
+    n = len(values)
+    mask = np.zeros(n, dtype=bool)
+    if n < 3:
+        return mask
+
+    left, right = _neighbour_max(values, order)
+    if strict:
+        mask = (values > left) & (values > right)
+    else:
+        mask = (values >= left) & (values >= right)
+        # 平台区域只保留最左侧的一个点
+        same_as_prev = np.zeros(n, dtype=bool)
+        same_as_prev[1:] = mask[:-1] & (values[1:] == values[:-1])
+        mask &= ~same_as_prev
+
+    # 首尾点在clip模式下会与自身比较，永远不是极值点
+    mask[0] = False
+    mask[-1] = False
+    return mask
+
+
+def find_local_extrema(prices, order=5, method='sliding', strict=True):
+    """
+    寻找价格序列中的局部极大值和极小值点
+
+    参数:
+    prices: 价格数组
+    order: 每侧比较的邻居数量
+    method: 'sliding' 使用O(n)滑动窗口算法，'argrelextrema' 使用scipy实现
+    strict: True时要求严格大于/小于所有邻居（与argrelextrema一致）；
+            False时允许与邻居相等，连续相等的平台只取最左侧一个点
+            （仅'sliding'方式支持）
+
+    返回:
+    (max_idx, min_idx) 两个升序的索引数组
+    """
+    if method not in SWING_METHODS:
+        raise ValueError(
+            f"不支持的极值检测方式: {method}，可选: {SWING_METHODS}")
+    order = int(order)
+    if order < 1:
+        raise ValueError(f"order必须大于等于1: {order}")
+
+    prices = np.asarray(prices, dtype=float)
+
+    if method == 'argrelextrema':
+        if not strict:
+            raise ValueError("argrelextrema方式只支持严格极值，平台检测请使用'sliding'")
+        # scipy.signal 导入耗时较长，只在选择该方式时导入
+        from scipy.signal import argrelextrema
+        return (argrelextrema(prices, np.greater, order=order)[0],
+                argrelextrema(prices, np.less, order=order)[0])
+
+    max_idx = np.flatnonzero(_local_max_mask(prices, order, strict))
+    min_idx = np.flatnonzero(_local_max_mask(-prices, order, strict))
+    return max_idx, min_idx
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+技术指标计算内核
+提供向量化的真实波幅(TR)和ATR计算，供敏感版和不敏感版趋势分析共用
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# 支持的ATR平滑方式
+ATR_METHODS = ('sma', 'wilder', 'ema')
+
+
+def true_range(high, low, close):
+    """
+    向量化计算真实波幅(True Range)
+
+    参数:
+    high: 最高价数组
+    low: 最低价数组
+    close: 收盘价数组
+
+    返回:
+    与输入等长的TR数组，第一个元素为 high[0] - low[0]
+    """
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    close = np.asarray(close, dtype=float)
+
+    tr = np.empty(len(high))
+    if len(high) == 0:
+        return tr
+
+    tr[0] = high[0] - low[0]
+    prev_close = close[:-1]
+    tr[1:] = np.maximum(
+        high[1:] - low[1:],
+        np.maximum(np.abs(high[1:] - prev_close), np.abs(low[1:] - prev_close))
+    )
+    return tr
+
+
+def smooth_atr(tr, period, method='sma'):
+    """
+    对TR序列做平滑得到ATR
+
+    参数:
+    tr: 真实波幅数组
+    period: ATR周期
+    method: 平滑方式，'sma'为简单移动平均（与原实现一致），
+            'wilder'为Wilder平滑，'ema'为指数移动平均
+
+    返回:
+    ATR数组，预热期内的值使用第一个有效值向后填充
+    """
+    if method not in ATR_METHODS:
+        raise ValueError(f"不支持的ATR平滑方式: {method}，可选: {ATR_METHODS}")
+
+    period = int(period)
+    series = pd.Series(tr, dtype=float)
+
+    if method == 'sma':
+        atr = series.rolling(period).mean()
+    else:
+        # Wilder和EMA均以首个周期的简单平均作为种子
+        alpha = 1.0 / period if method == 'wilder' else 2.0 / (period + 1)
+        seeded = series.copy()
+        if len(seeded) >= period:
+            seeded.iloc[:period - 1] = np.nan
+            seeded.iloc[period - 1] = series.iloc[:period].mean()
+        else:
+            seeded.iloc[:] = np.nan
+        atr = seeded.ewm(alpha=alpha, adjust=False).mean()
+
+    return atr.bfill().values
+
+
+def calculate_atr(high, low, close, period=14, method='sma'):
+    """
+    计算ATR
+
+    参数:
+    high: 最高价数组
+    low: 最低价数组
+    close: 收盘价数组
+    period: ATR周期
+    method: 平滑方式，见 smooth_atr
+
+    返回:
+    ATR数组
+    """
+    return smooth_atr(true_range(high, low, close), period, method)
+
+
+def frame_atr(df, price_col='close', period=14, method='sma'):
+    """
+    从DataFrame计算ATR，没有high/low列时使用价格列代替
+
+    参数:
+    df: 数据框
+    price_col: 价格列名
+    period: ATR周期
+    method: 平滑方式，见 smooth_atr
+
+    返回:
+    ATR数组
+    """
+    close = df[price_col].values
+    if 'high' in df.columns and 'low' in df.columns:
+        high = df['high'].values
+        low = df['low'].values
+    else:
+        high = close
+        low = close
+    return calculate_atr(high, low, close, period, method)
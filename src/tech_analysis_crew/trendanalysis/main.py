@@ -7,51 +7,34 @@ import pandas as pd
 import argparse
 import datetime
 import pathlib
-import matplotlib.pyplot as plt
 import numpy as np
 import warnings
 
-# 设置matplotlib字体
-plt.rcParams['font.family'] = 'sans-serif'
-plt.rcParams['font.sans-serif'] = ['Arial', 'DejaVu Sans', 'Helvetica', 'Lucida Grande', 'Verdana']
-plt.rcParams['axes.unicode_minus'] = False
-
-# 导入两个分析模块
-# 注意：Python导入模块时不能包含短横线，需要进行特殊处理
-import importlib.util
-
 # 获取当前目录路径
 current_dir = os.path.dirname(os.path.abspath(__file__))
 # 将当前目录添加到模块搜索路径
 sys.path.append(current_dir)
 
-# 动态导入带短横线的模块
-sensitive_path = os.path.join(current_dir, "trend-sensitive.py")
-insensitive_path = os.path.join(current_dir, "trend-insensitive.py")
-
-# 动态加载带短横线的模块
-spec_sensitive = importlib.util.spec_from_file_location(
-    "trend_sensitive", sensitive_path)
-trend_sensitive = importlib.util.module_from_spec(spec_sensitive)
-spec_sensitive.loader.exec_module(trend_sensitive)
-
-spec_insensitive = importlib.util.spec_from_file_location(
-    "trend_insensitive", insensitive_path)
-trend_insensitive = importlib.util.module_from_spec(spec_insensitive)
-spec_insensitive.loader.exec_module(trend_insensitive)
-
-# 从模块获取所需的类和函数
-SensitiveTrendAnalyzer = trend_sensitive.TrendAnalyzer
-sensitive_plot_trends = trend_sensitive.plot_trends
-InsensitiveTrendAnalyzer = trend_insensitive.TrendAnalyzer
-insensitive_plot_trends = trend_insensitive.plot_trends
+# 导入两个分析模块；matplotlib 和 scipy 只在绘图或使用对应算法时才导入
+from trend_sensitive import TrendAnalyzer as SensitiveTrendAnalyzer  # noqa: E402
+from trend_sensitive import plot_trends as sensitive_plot_trends  # noqa: E402
+from trend_insensitive import TrendAnalyzer as InsensitiveTrendAnalyzer  # noqa: E402
+from trend_insensitive import plot_trends as insensitive_plot_trends  # noqa: E402
 
 # 导入区间价格分析模块
-from duration_price_analysis import analyze_trend_intervals  # noqa: E402
+from duration_price_analysis import enrich_trend_intervals  # noqa: E402
+from shared_stages import SharedStages  # noqa: E402
+from columnar import analysis_columns, read_table  # noqa: E402
+from chart_data import write_chart_data  # noqa: E402
+from series_store import DEFAULT_STORE_DIR, SeriesStore  # noqa: E402
+from plotting import (  # noqa: E402
+    CHART_PRESETS, DEFAULT_PRESET, render_in_background, when_all_done)
+from result_cache import (  # noqa: E402
+    ARTIFACT_SUFFIXES, DEFAULT_CACHE_DIR, ResultCache, file_key, output_params,
+    series_key)
 
 # 禁止图表相关警告
 warnings.filterwarnings("ignore", category=UserWarning)
-plt.ioff()  # 关闭交互模式，防止图表显示
 
 
 def clean_data(df):
@@ -101,34 +84,98 @@ def clean_data(df):
     return df
 
 
-def run_analysis(input_path, output_dir='crewai-agent/src/tech_analysis_crew/trendanalysis/results'):
+def analyze_dual(df, price_col='close', atr_period=14, swing_threshold=0.618,
+                 shared=None):
     """
-    运行两种趋势分析方法并比较结果
+    同时运行敏感版和不敏感版分析
+    
+    排序、频率检测、ATR和swing点检测只计算一次，两种分析只在
+    震荡合并和区间优化阶段分开执行
     
     参数:
-    input_path: CSV文件路径
-    output_dir: 输出目录
+    df: 以日期为索引的数据框
+    price_col: 价格列名
+    atr_period: 基础ATR周期
+    swing_threshold: 趋势判定阈值（ATR倍数）
+    shared: 可选，已建立的 SharedStages，调用方可以继续复用其中的结果；
+            此时df必须是 shared.df
+    
+    返回:
+    (敏感版趋势数据框, 不敏感版趋势数据框)
     """
-    # 读取数据，不指定列名，让pandas自动使用数字索引作为列名
-    try:
-        df = pd.read_csv(input_path)
-    except Exception as e:
-        print(f"错误: 无法读取CSV文件: {e}")
-        return None
+    if shared is None:
+        shared = SharedStages(df)
+    elif df is not shared.df:
+        raise ValueError("指定 shared 时 df 必须是 shared.df")
     
-    # 检查是否至少有两列
-    if len(df.columns) < 2:
-        print("错误: CSV文件必须至少包含两列：日期列和数值列")
-        return None
+    sensitive_analyzer = SensitiveTrendAnalyzer(
+        atr_period=atr_period, swing_threshold=swing_threshold)
+    sensitive_trends = sensitive_analyzer.analyze(
+        shared.df, price_col=price_col, shared=shared)
     
-    # 将第一列设置为索引，不管其列名是什么
-    df.set_index(df.columns[0], inplace=True)
+    insensitive_analyzer = InsensitiveTrendAnalyzer(
+        atr_period=atr_period, swing_threshold=swing_threshold)
+    insensitive_trends = insensitive_analyzer.analyze(
+        shared.df, price_col=price_col, shared=shared)
     
-    # 清理数据
-    df = clean_data(df)
-    if df is None:
-        print("错误: 数据清理失败，请检查输入文件格式")
-        return None
+    return sensitive_trends, insensitive_trends
+
+
+def run_analysis(input_path, output_dir='crewai-agent/src/tech_analysis_crew/trendanalysis/results',
+                 use_cache=True, cache_dir=DEFAULT_CACHE_DIR, charts=True,
+                 chart_preset=DEFAULT_PRESET, on_charts=None,
+                 series_store=None, symbol=None, from_store=False):
+    """
+    运行两种趋势分析方法并比较结果
+    
+    参数:
+    input_path: CSV文件路径，也可以是Parquet/Feather/Arrow文件（只读取分析所需的列）；
+                from_store 为True时不使用
+    output_dir: 输出目录
+    use_cache: 是否使用结果缓存。清理后数据、参数和代码均相同时，
+               直接复制上次的结果文件（报告内容保持上次生成时的样子）
+    cache_dir: 结果缓存目录
+    charts: 是否生成趋势图表。为False时不导入matplotlib，只输出CSV、报告和
+            供前端交互绘图的图表数据（chart_data.npz）
+    chart_preset: 图表尺寸和分辨率预设（'thumbnail'/'screen'/'print'），
+                  价格曲线降采样到图像宽度；为None时按原方式以800dpi绘制全部数据点
+    on_charts: 可选，图表完成时的回调 on_charts(图表路径字典, 异常或None)。
+               图表始终在后台进程中与区间分析、报告同时绘制；不指定时返回前
+               等待图表完成，指定时趋势表和报告写出后立即返回，图表完成后
+               （在后台线程中）调用回调并保存结果缓存
+    series_store: 可选，SeriesStore；与 symbol 同时指定时把清理后的序列
+                  保存为该代码（同时生成价格金字塔），供Web界面缩放浏览
+    symbol: 序列存储中的代码
+    from_store: 为True时直接从 series_store 读取 symbol 的序列（已清理、排序，
+                内存映射不复制），不读取和清理 input_path；输出文件名使用代码
+    """
+    if from_store:
+        try:
+            df = series_store.load(symbol)
+        except KeyError as e:
+            print(f"错误: {e.args[0]}")
+            return None
+    else:
+        # 读取数据，不指定列名，让pandas自动使用数字索引作为列名
+        try:
+            df = read_table(input_path, columns=analysis_columns)
+        except Exception as e:
+            print(f"错误: 无法读取数据文件: {e}")
+            return None
+        
+        # 检查是否至少有两列
+        if len(df.columns) < 2:
+            print("错误: CSV文件必须至少包含两列：日期列和数值列")
+            return None
+        
+        # 将第一列设置为索引，不管其列名是什么
+        df.set_index(df.columns[0], inplace=True)
+        
+        # 清理数据
+        df = clean_data(df)
+        if df is None:
+            print("错误: 数据清理失败，请检查输入文件格式")
+            return None
     
     # 创建输出目录
     os.makedirs(output_dir, exist_ok=True)
@@ -136,18 +183,59 @@ def run_analysis(input_path, output_dir='crewai-agent/src/tech_analysis_crew/tre
     # 生成时间戳
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
     
-    # 获取输入文件名（不含扩展名）
-    input_filename = pathlib.Path(input_path).stem
+    # 获取输入文件名（不含扩展名），从序列存储读取时使用代码
+    input_filename = (symbol if from_store
+                      else pathlib.Path(input_path).stem)
     
     # 使用与analyze相同的价格列
     price_col = 'close'
     if price_col not in df.columns and len(df.columns) > 0:
         price_col = df.columns[0]
     
-    # 运行敏感版分析
-    print("正在运行敏感版分析...")
-    sensitive_analyzer = SensitiveTrendAnalyzer(atr_period=14, swing_threshold=0.618)
-    sensitive_trends = sensitive_analyzer.analyze(df, price_col=price_col)
+    # 查找结果缓存
+    params = {'atr_period': 14, 'swing_threshold': 0.618}
+    # 原始文件键与结果键使用相同的参数；价格列由文件内容决定，只用于结果键
+    key_params = output_params(params, charts, chart_preset)
+    cache = cache_key = source_key = None
+    if use_cache:
+        cache = ResultCache(cache_dir)
+        # 从序列存储读取时没有原始文件，只使用结果键
+        if not from_store:
+            source_key = file_key(input_path, key_params)
+        cache_key = series_key(df, dict(key_params, price_col=price_col))
+        restored = cache.restore(
+            cache_key, output_dir, f"{timestamp}_{input_filename}")
+        if restored is not None:
+            if source_key is not None:
+                cache.link(source_key, cache_key)
+            # 序列通常已由之前的分析保存，只在缺少时补存，不重建价格金字塔
+            if (series_store is not None and symbol is not None
+                    and symbol not in series_store):
+                series_store.write(symbol, df, price_col)
+            print(f"\n命中结果缓存 {cache_key[:12]}，结果保存到 {output_dir} 文件夹")
+            for path in restored.values():
+                print(f"缓存结果文件: {os.path.basename(path)}")
+            return output_dir
+    
+    # 保存清理后的序列，内容未变时 write 不会重写
+    if series_store is not None and symbol is not None and not from_store:
+        series_store.write(symbol, df, price_col)
+    
+    chart_futures = {}
+    
+    # 运行敏感版和不敏感版分析，共享ATR和swing点计算
+    print("正在运行敏感版和不敏感版分析...")
+    shared = SharedStages(df)
+    sensitive_trends, insensitive_trends = analyze_dual(
+        shared.df, price_col=price_col, atr_period=14, swing_threshold=0.618,
+        shared=shared)
+    
+    # 保存供前端交互绘图的图表数据（降采样价格序列和趋势区间），不需要matplotlib
+    chart_data_filename = f"{timestamp}_{input_filename}-chart_data.npz"
+    write_chart_data(
+        os.path.join(output_dir, chart_data_filename), df,
+        {'sensitive': sensitive_trends, 'insensitive': insensitive_trends},
+        price_col=price_col)
     
     # 保存敏感版CSV结果
     sensitive_csv_filename = (
@@ -160,23 +248,12 @@ def run_analysis(input_path, output_dir='crewai-agent/src/tech_analysis_crew/tre
         f"{timestamp}_{input_filename}-sensitive-trend_visualization.png")
     sensitive_plot_path = os.path.join(output_dir, sensitive_png_filename)
     
-    # 使用禁止verbose输出的方式调用绘图函数
-    plt.figure(figsize=(12, 8))
-    with open(os.devnull, 'w') as f:
-        original_stdout = sys.stdout
-        sys.stdout = f  # 重定向标准输出到null
-        sensitive_plot_trends(
-            df, sensitive_trends, sensitive_plot_path, 
-            price_col=price_col, dpi=800
-        )
-        sys.stdout = original_stdout  # 恢复标准输出
-    plt.close()
-    
-    # 运行不敏感版分析
-    print("正在运行不敏感版分析...")
-    insensitive_analyzer = InsensitiveTrendAnalyzer(
-        atr_period=14, swing_threshold=0.618)
-    insensitive_trends = insensitive_analyzer.analyze(df, price_col=price_col)
+    if charts:
+        # 在后台绘图进程中生成，趋势表复制一份，之后的报告生成不影响绘图
+        chart_futures['sensitive'] = render_in_background(
+            sensitive_plot_trends, df, sensitive_trends.copy(),
+            sensitive_plot_path, price_col=price_col, dpi=800,
+            preset=chart_preset)
     
     # 保存不敏感版CSV结果
     insensitive_csv_filename = (
@@ -190,19 +267,14 @@ def run_analysis(input_path, output_dir='crewai-agent/src/tech_analysis_crew/tre
         f"{timestamp}_{input_filename}-insensitive-trend_visualization.png")
     insensitive_plot_path = os.path.join(output_dir, insensitive_png_filename)
     
-    # 使用禁止verbose输出的方式调用绘图函数
-    plt.figure(figsize=(12, 8))
-    with open(os.devnull, 'w') as f:
-        original_stdout = sys.stdout
-        sys.stdout = f  # 重定向标准输出到null
-        insensitive_plot_trends(
-            df, insensitive_trends, insensitive_plot_path, 
-            price_col=price_col, dpi=800
-        )
-        sys.stdout = original_stdout  # 恢复标准输出
-    plt.close()
+    if charts:
+        # 在后台绘图进程中生成，趋势表复制一份，之后的报告生成不影响绘图
+        chart_futures['insensitive'] = render_in_background(
+            insensitive_plot_trends, df, insensitive_trends.copy(),
+            insensitive_plot_path, price_col=price_col, dpi=800,
+            preset=chart_preset)
     
-    # 调用区间价格分析模块处理敏感版和不敏感版的CSV文件
+    # 直接使用内存中的趋势表和清理后的数据进行区间价格分析
     print("正在进行区间价格分析...")
     
     # 处理敏感版CSV
@@ -210,10 +282,12 @@ def run_analysis(input_path, output_dir='crewai-agent/src/tech_analysis_crew/tre
         f"{timestamp}_{input_filename}-sensitive-enhanced_analysis.csv")
     sensitive_enhanced_csv_path = os.path.join(
         output_dir, sensitive_enhanced_csv_filename)
-    sensitive_enhanced_trends = analyze_trend_intervals(
-        sensitive_csv_path, 
-        input_path, 
-        sensitive_enhanced_csv_path
+    sensitive_enhanced_trends = enrich_trend_intervals(
+        sensitive_trends, 
+        shared.df, 
+        price_col, 
+        sensitive_enhanced_csv_path,
+        range_index=shared.range_index(price_col)
     )
     
     # 处理不敏感版CSV
@@ -221,10 +295,12 @@ def run_analysis(input_path, output_dir='crewai-agent/src/tech_analysis_crew/tre
         f"{timestamp}_{input_filename}-insensitive-enhanced_analysis.csv")
     insensitive_enhanced_csv_path = os.path.join(
         output_dir, insensitive_enhanced_csv_filename)
-    insensitive_enhanced_trends = analyze_trend_intervals(
-        insensitive_csv_path, 
-        input_path, 
-        insensitive_enhanced_csv_path
+    insensitive_enhanced_trends = enrich_trend_intervals(
+        insensitive_trends, 
+        shared.df, 
+        price_col, 
+        insensitive_enhanced_csv_path,
+        range_index=shared.range_index(price_col)
     )
     
     # 生成合并报告
@@ -241,13 +317,47 @@ def run_analysis(input_path, output_dir='crewai-agent/src/tech_analysis_crew/tre
         input_filename
     )
     
+    def finish_charts(futures):
+        """图表完成后保存结果缓存，图表失败时不缓存不完整的结果"""
+        chart_paths = {'sensitive': sensitive_plot_path,
+                       'insensitive': insensitive_plot_path}
+        error = next((f.exception() for f in futures
+                      if f.exception() is not None), None)
+        if error is not None:
+            print(f"警告: 生成图表失败: {error}")
+        elif cache is not None:
+            prefix = os.path.join(output_dir, f"{timestamp}_{input_filename}")
+            try:
+                cache.put(
+                    cache_key,
+                    {suffix: f"{prefix}-{suffix}"
+                     for suffix in ARTIFACT_SUFFIXES},
+                    source_key=source_key)
+            except OSError as e:
+                print(f"警告: 保存结果缓存失败: {e}")
+        if on_charts is not None:
+            on_charts(chart_paths if charts else {}, error)
+    
+    # 等待图表完成并保存结果缓存；指定回调时在后台完成
+    if on_charts is not None:
+        when_all_done(chart_futures.values(), finish_charts)
+    else:
+        for future in chart_futures.values():
+            future.exception()
+        finish_charts(list(chart_futures.values()))
+    
     print(f"\n分析完成! 结果保存到 {output_dir} 文件夹")
     print(f"敏感版CSV文件: {sensitive_csv_filename}")
     print(f"敏感版增强分析CSV文件: {sensitive_enhanced_csv_filename}")
-    print(f"敏感版图表文件: {sensitive_png_filename}")
+    if charts and on_charts is not None:
+        print("图表正在后台生成")
+    if charts:
+        print(f"敏感版图表文件: {sensitive_png_filename}")
     print(f"不敏感版CSV文件: {insensitive_csv_filename}")
     print(f"不敏感版增强分析CSV文件: {insensitive_enhanced_csv_filename}")
-    print(f"不敏感版图表文件: {insensitive_png_filename}")
+    if charts:
+        print(f"不敏感版图表文件: {insensitive_png_filename}")
+    print(f"图表数据文件: {chart_data_filename}")
     
     return output_dir
 
@@ -468,10 +578,41 @@ def generate_markdown_report(df, sensitive_trends, insensitive_trends, compariso
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="运行敏感和不敏感版本的趋势分析并生成比较报告")
-    parser.add_argument("input_path", help="输入CSV文件的路径")
+    parser.add_argument(
+        "input_path", nargs="?",
+        help="输入CSV文件的路径，也支持Parquet/Feather/Arrow文件")
     parser.add_argument(
         "--output-dir", default="crewai-agent/src/tech_analysis_crew/trendanalysis/results", help="输出目录，默认为results")
+    parser.add_argument(
+        "--no-cache", action="store_true", help="不使用结果缓存，总是重新分析")
+    parser.add_argument(
+        "--cache-dir", default=DEFAULT_CACHE_DIR, help="结果缓存目录")
+    parser.add_argument(
+        "--no-charts", action="store_true",
+        help="不生成趋势图表（不导入matplotlib），只输出CSV和报告")
+    parser.add_argument(
+        "--chart-preset", default=DEFAULT_PRESET,
+        choices=list(CHART_PRESETS) + ['original'],
+        help="图表尺寸和分辨率预设，original 为按800dpi绘制全部数据点的原方式")
+    parser.add_argument(
+        "--symbol", help="同时把清理后的序列保存到序列存储中的该代码")
+    parser.add_argument(
+        "--store-dir", default=DEFAULT_STORE_DIR, help="序列存储目录")
+    parser.add_argument(
+        "--from-store", metavar="SYMBOL",
+        help="直接分析序列存储中已保存的该代码，不读取和清理原始文件")
     
     args = parser.parse_args()
-    
-    run_analysis(args.input_path, args.output_dir)
+    if (args.input_path is None) == (args.from_store is None):
+        parser.error("需要指定 input_path 或 --from-store 之一")
+    if args.from_store and args.symbol:
+        parser.error("--from-store 不能与 --symbol 同时使用")
+    symbol = args.from_store or args.symbol
+    
+    run_analysis(args.input_path, args.output_dir,
+                 use_cache=not args.no_cache, cache_dir=args.cache_dir,
+                 charts=not args.no_charts,
+                 chart_preset=(None if args.chart_preset == 'original'
+                               else args.chart_preset),
+                 series_store=SeriesStore(args.store_dir) if symbol else None,
+                 symbol=symbol, from_store=args.from_store is not None)
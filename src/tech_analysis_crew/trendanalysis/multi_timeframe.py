@@ -0,0 +1,338 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+多时间周期趋势分析
+从分钟或小时数据一次生成多个时间周期（如 1h、1d、1w）的OHLC K线，并分别运行
+敏感版和不敏感版分析。K线逐级合并：较长周期由能整除它的已生成周期的K线合并得到
+（1d 由 1h 合并，1w 由 1d 合并），原始数据只读取和扫描一次。各周期的频率检测、
+swing窗口和ATR周期仍由分析器按该周期的K线自动调整。
+"""
+
+import os
+import re
+import sys
+import argparse
+import datetime
+import pathlib
+
+import numpy as np
+import pandas as pd
+
+# 确保可以导入同目录下的模块
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+from main import analyze_dual, clean_data  # noqa: E402
+from columnar import read_table  # noqa: E402
+from segments import to_ns  # noqa: E402
+
+
+DEFAULT_TIMEFRAMES = ('1h', '1d', '1w')
+
+# 少于该数量K线的周期不做分析，swing点和ATR都没有意义
+MIN_BARS = 30
+
+OHLC_COLUMNS = ('open', 'high', 'low', 'close')
+
+_UNIT_NS = {
+    'min': 60 * 10**9,
+    'h': 3600 * 10**9,
+    'd': 86400 * 10**9,
+    'w': 7 * 86400 * 10**9,
+}
+
+# 周线从周一开始，1970-01-05 是第一个周一
+_WEEK_OFFSET_NS = 4 * 86400 * 10**9
+
+_TIMEFRAME_PATTERN = re.compile(r'^(\d+)(min|h|d|w)$')
+
+
+class Timeframe:
+    """
+    时间周期，第k根K线覆盖 [offset + k*width, offset + (k+1)*width)
+
+    时间按数据本身的时区（墙上时间）计算，日线和周线按当地日期划分
+    """
+
+    __slots__ = ('name', 'width', 'offset')
+
+    def __init__(self, name):
+        match = _TIMEFRAME_PATTERN.match(name)
+        if match is None or int(match.group(1)) == 0:
+            raise ValueError(
+                f"无效的时间周期: {name!r}，应为数字加 min/h/d/w，如 15min、1h、1d、1w")
+        count, unit = int(match.group(1)), match.group(2)
+        self.name = name
+        self.width = count * _UNIT_NS[unit]
+        self.offset = _WEEK_OFFSET_NS if unit == 'w' else 0
+
+    def __repr__(self):
+        return f"Timeframe({self.name!r})"
+
+    def contains(self, other):
+        """other 的每根K线是否都完整地落在本周期的一根K线内"""
+        return (self.width % other.width == 0
+                and (self.offset - other.offset) % other.width == 0)
+
+    def bucket(self, times):
+        """墙上时间（int64纳秒）所在K线的序号"""
+        return (times - self.offset) // self.width
+
+
+def ohlc_columns(names, price_col='close'):
+    """多周期分析需要的列：日期列、第一个数值列、价格列以及OHLC和成交量列"""
+    wanted = set(names[:2]) | {price_col, 'volume', *OHLC_COLUMNS}
+    return [name for name in names if name in wanted]
+
+
+def _wall_times(index):
+    """日期索引的墙上时间（int64纳秒），带时区时按当地时间计算"""
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return to_ns(index)
+
+
+def base_bars(df, price_col='close'):
+    """
+    把清理后的数据整理为OHLC数组，缺少的列用价格列代替
+
+    返回:
+    {'time': 墙上时间, 'open', 'high', 'low', 'close', 可能还有 'volume'}
+    """
+    prices = df[price_col].to_numpy(dtype=float)
+    bars = {'time': _wall_times(df.index), 'close': prices}
+    for name in ('open', 'high', 'low'):
+        bars[name] = (df[name].to_numpy(dtype=float) if name in df.columns
+                      else prices)
+    if 'volume' in df.columns:
+        bars['volume'] = df['volume'].to_numpy(dtype=float)
+    return bars
+
+
+def resample_bars(bars, timeframe):
+    """
+    把K线数组合并为更长周期的K线
+
+    参数:
+    bars: base_bars 或 resample_bars 的结果，时间升序；每根K线须完整地落在
+          timeframe 的一根K线内
+    timeframe: Timeframe
+
+    返回:
+    同样格式的字典，时间为每根K线的起始时间
+    """
+    keys = timeframe.bucket(bars['time'])
+    n = len(keys)
+    if n == 0:
+        return {name: values[:0] for name, values in bars.items()}
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], n] - 1
+
+    result = {
+        'time': keys[starts] * timeframe.width + timeframe.offset,
+        'open': bars['open'][starts],
+        # NaN不参与比较，与价格列代替的high/low一致
+        'high': np.fmax.reduceat(bars['high'], starts),
+        'low': np.fmin.reduceat(bars['low'], starts),
+        'close': bars['close'][ends],
+    }
+    if 'volume' in bars:
+        result['volume'] = np.add.reduceat(bars['volume'], starts)
+    return result
+
+
+def bars_frame(bars, tz=None):
+    """K线数组转换为以起始时间为索引的数据框，tz 为原始数据的时区"""
+    index = pd.DatetimeIndex(bars['time'].view('datetime64[ns]'), name='date')
+    if tz is not None:
+        index = index.tz_localize(tz, ambiguous=True, nonexistent='shift_forward')
+    return pd.DataFrame(
+        {name: values for name, values in bars.items() if name != 'time'},
+        index=index)
+
+
+def resample_timeframes(df, timeframes=DEFAULT_TIMEFRAMES, price_col='close'):
+    """
+    从原始数据逐级生成多个周期的K线
+
+    周期按长度排序，每个周期从能整除它的最长的已生成周期合并，
+    没有时从原始数据合并；短于原始数据间隔的周期被跳过
+
+    参数:
+    df: 以日期为索引的数据框（clean_data 之后）
+    timeframes: 周期名称列表
+    price_col: 价格列名，没有open/high/low列时用它代替
+
+    返回:
+    {周期名称: OHLC数据框}，按周期从短到长排列
+    """
+    frames = sorted((Timeframe(name) for name in timeframes),
+                    key=lambda tf: tf.width)
+    bars = base_bars(df, price_col)
+    base_interval = np.median(np.diff(bars['time'])) if len(df) > 1 else 0
+    tz = pd.DatetimeIndex(df.index).tz
+
+    generated = []
+    result = {}
+    for timeframe in frames:
+        if timeframe.width < base_interval:
+            print(f"时间周期 {timeframe.name} 短于原始数据间隔，跳过")
+            continue
+        source = bars
+        for done, done_bars in reversed(generated):
+            if timeframe.contains(done):
+                source = done_bars
+                break
+        resampled = resample_bars(source, timeframe)
+        generated.append((timeframe, resampled))
+        result[timeframe.name] = bars_frame(resampled, tz)
+    return result
+
+
+def analyze_timeframes(df, timeframes=DEFAULT_TIMEFRAMES, price_col='close',
+                       atr_period=14, swing_threshold=0.618,
+                       min_bars=MIN_BARS):
+    """
+    对多个时间周期分别运行敏感版和不敏感版分析
+
+    参数:
+    df: 以日期为索引的数据框（clean_data 之后）
+    timeframes: 周期名称列表，如 ('1h', '1d', '1w')
+    price_col: 价格列名
+    atr_period: 基础ATR周期，各周期按自身数据特征调整
+    swing_threshold: 趋势判定阈值（ATR倍数）
+    min_bars: 少于该数量K线的周期不做分析
+
+    返回:
+    {周期名称: {'bars': OHLC数据框, 'sensitive': 趋势数据框,
+               'insensitive': 趋势数据框}}，K线不足的周期没有趋势数据框
+    """
+    results = {}
+    for name, bars in resample_timeframes(df, timeframes, price_col).items():
+        results[name] = {'bars': bars}
+        if len(bars) < min_bars:
+            print(f"时间周期 {name} 只有 {len(bars)} 根K线，少于 {min_bars}，不做分析")
+            continue
+        print(f"正在分析时间周期 {name}（{len(bars)} 根K线）...")
+        sensitive, insensitive = analyze_dual(
+            bars, price_col='close', atr_period=atr_period,
+            swing_threshold=swing_threshold)
+        results[name]['sensitive'] = sensitive
+        results[name]['insensitive'] = insensitive
+    return results
+
+
+def summarize_timeframes(results):
+    """
+    各周期、各版本的区间统计和最新趋势
+
+    返回:
+    DataFrame，每行一个周期和版本
+    """
+    rows = []
+    for name, result in results.items():
+        for version in ('sensitive', 'insensitive'):
+            trends = result.get(version)
+            if trends is None:
+                continue
+            counts = trends['trend_type'].value_counts()
+            last = trends.iloc[-1] if len(trends) else None
+            rows.append({
+                'timeframe': name,
+                'version': version,
+                'bars': len(result['bars']),
+                'segments': len(trends),
+                'up': int(counts.get('up', 0)),
+                'down': int(counts.get('down', 0)),
+                'consolidation': int(counts.get('consolidation', 0)),
+                'last_trend': None if last is None else last['trend_type'],
+                'last_start': None if last is None else last['start_date'],
+                'last_end': None if last is None else last['end_date'],
+                'last_pct_change': None if last is None else last['pct_change'],
+            })
+    return pd.DataFrame(rows)
+
+
+def run_multi_timeframe(input_path, output_dir='crewai-agent/src/tech_analysis_crew/trendanalysis/results',
+                        timeframes=DEFAULT_TIMEFRAMES, atr_period=14,
+                        swing_threshold=0.618):
+    """
+    读取数据文件，输出各周期的趋势表和汇总表
+
+    文件名为 "<时间戳>_<文件名>-<周期>-sensitive-trend_analysis.csv" 等，
+    汇总表为 "<时间戳>_<文件名>-timeframe_summary.csv"
+
+    返回:
+    {周期名称: {版本: CSV路径}}，失败时返回 None
+    """
+    try:
+        df = read_table(input_path, columns=ohlc_columns)
+    except Exception as e:
+        print(f"错误: 无法读取数据文件: {e}")
+        return None
+    if len(df.columns) < 2:
+        print("错误: 数据文件必须至少包含两列：日期列和数值列")
+        return None
+    df = clean_data(df.set_index(df.columns[0]))
+    if df is None:
+        return None
+
+    price_col = 'close' if 'close' in df.columns else df.columns[0]
+    results = analyze_timeframes(df, timeframes, price_col, atr_period,
+                                 swing_threshold)
+
+    os.makedirs(output_dir, exist_ok=True)
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    prefix = os.path.join(
+        output_dir, f"{timestamp}_{pathlib.Path(input_path).stem}")
+
+    paths = {}
+    for name, result in results.items():
+        for version in ('sensitive', 'insensitive'):
+            if version not in result:
+                continue
+            path = f"{prefix}-{name}-{version}-trend_analysis.csv"
+            result[version].to_csv(path, index=False, float_format='%.4f')
+            paths.setdefault(name, {})[version] = path
+
+    summary_path = f"{prefix}-timeframe_summary.csv"
+    summarize_timeframes(results).to_csv(
+        summary_path, index=False, float_format='%.4f')
+
+    print(f"\n多周期分析完成! 结果保存到 {output_dir} 文件夹")
+    for name, version_paths in paths.items():
+        for path in version_paths.values():
+            print(f"{name} 趋势CSV文件: {os.path.basename(path)}")
+    print(f"汇总文件: {os.path.basename(summary_path)}")
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="多时间周期的敏感版和不敏感版趋势分析")
+    parser.add_argument(
+        "input_path", help="输入CSV文件的路径，也支持Parquet/Feather/Arrow文件")
+    parser.add_argument(
+        "--output-dir", default="crewai-agent/src/tech_analysis_crew/trendanalysis/results",
+        help="输出目录，默认为results")
+    parser.add_argument(
+        "--timeframes", nargs="+", default=list(DEFAULT_TIMEFRAMES),
+        help="时间周期，如 15min 1h 4h 1d 1w")
+    parser.add_argument(
+        "--atr-period", type=int, default=14, help="基础ATR周期")
+    parser.add_argument(
+        "--swing-threshold", type=float, default=0.618, help="趋势判定阈值（ATR倍数）")
+
+    args = parser.parse_args()
+    for timeframe_name in args.timeframes:
+        try:
+            Timeframe(timeframe_name)
+        except ValueError as e:
+            parser.error(str(e))
+
+    timeframe_paths = run_multi_timeframe(
+        args.input_path, args.output_dir, args.timeframes,
+        args.atr_period, args.swing_threshold)
+    if timeframe_paths is None:
+        raise SystemExit(1)
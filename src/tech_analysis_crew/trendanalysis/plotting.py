@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+趋势图表的绘制
+matplotlib 导入较慢，分析模块只在实际生成图表时通过 pyplot() 导入，
+只需要CSV结果时（如Web服务的分析进程、批量分析）不再为绘图付出启动时间。
+
+render_trends 是快速绘图方式：价格曲线用LTTB算法降采样到约等于图像的像素宽度，
+全部趋势区间作为一个 PolyCollection 绘制，图像尺寸和分辨率使用预设。
+render_in_background 在单独的进程池中绘图，分析流程不必等待图表完成。
+"""
+
+import os
+import time
+import threading
+import contextlib
+import multiprocessing.util
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from segments import to_ns
+
+
+# 图表尺寸（英寸）和分辨率预设
+CHART_PRESETS = {
+    'thumbnail': {'figsize': (8, 5), 'dpi': 80},
+    'screen': {'figsize': (16, 10), 'dpi': 100},
+    'print': {'figsize': (16, 10), 'dpi': 300},
+}
+
+DEFAULT_PRESET = 'screen'
+
+# 后台绘图进程数，一次分析有敏感版和不敏感版两张图
+CHART_WORKERS = 2
+
+# 趋势区间的填充颜色和图例
+TREND_COLORS = {'up': 'red', 'down': 'green', 'consolidation': 'lightgrey'}
+TREND_LABELS = {'up': 'Uptrend', 'down': 'Downtrend',
+                'consolidation': 'Consolidation'}
+
+_configured = False
+_plt = None
+_render_executor = None
+_render_lock = threading.Lock()
+
+
+def _configure():
+    """设置matplotlib字体，只执行一次"""
+    global _configured
+    if not _configured:
+        import warnings
+        import matplotlib
+
+        # 设置matplotlib字体
+        matplotlib.rcParams['font.family'] = 'sans-serif'
+        matplotlib.rcParams['font.sans-serif'] = ['Arial', 'DejaVu Sans', 'Helvetica', 'Lucida Grande', 'Verdana']
+        matplotlib.rcParams['axes.unicode_minus'] = False
+
+        # 禁止图表相关警告
+        warnings.filterwarnings("ignore", category=UserWarning)
+        _configured = True
+
+
+def pyplot():
+    """
+    导入并配置 matplotlib.pyplot，只在第一次调用时执行
+
+    返回:
+    matplotlib.pyplot 模块
+    """
+    global _plt
+    if _plt is None:
+        _configure()
+        import matplotlib.pyplot as plt
+
+        plt.ioff()  # 关闭交互模式，防止图表显示
+        _plt = plt
+    return _plt
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets 降采样
+
+    保留首尾两点，其余点平均分入 threshold-2 个桶，每个桶选出与上一个选中点
+    和下一个桶的平均点构成的三角形面积最大的点，曲线的峰谷形状得以保留。
+
+    参数:
+    x: 升序的横坐标数组（日期可先转换为整数时间戳）
+    y: 纵坐标数组
+    threshold: 输出点数
+
+    返回:
+    选中点的位置数组（升序）；点数不超过 threshold 时返回全部位置
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    threshold = int(threshold)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # 第i个桶为 [edges[i], edges[i+1])，首尾两点单独成桶
+    every = (n - 2) / (threshold - 2)
+    edges = (np.arange(threshold - 1) * every).astype(np.int64) + 1
+    # 每个桶的平均点，用于前一个桶的面积计算
+    sum_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sum_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    avg_x = np.append(sum_x / counts, x[-1])
+    avg_y = np.append(sum_y / counts, y[-1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    prev = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_x, next_y = avg_x[i + 1], avg_y[i + 1]
+        # 三角形面积的两倍，只比较大小不需要取半
+        area = np.abs(
+            (x[prev] - next_x) * (y[start:end] - y[prev])
+            - (x[prev] - x[start:end]) * (next_y - y[prev]))
+        prev = start + int(np.argmax(area))
+        selected[i + 1] = prev
+    return selected
+
+
+def _downsample(df, price_col, max_points):
+    """按LTTB选出价格曲线需要绘制的点，NaN不参与降采样"""
+    prices = df[price_col].to_numpy(dtype=float)
+    valid = np.flatnonzero(~np.isnan(prices))
+    picked = lttb(to_ns(df.index)[valid], prices[valid], max_points)
+    positions = valid[picked]
+    return df.index[positions], prices[positions]
+
+
+def _band_vertices(trends, date2num):
+    """每个趋势区间对应的矩形顶点和颜色"""
+    x0 = date2num(pd.to_datetime(trends['start_date']).to_numpy())
+    x1 = date2num(pd.to_datetime(trends['end_date']).to_numpy())
+    y0 = trends['low_price'].to_numpy(dtype=float)
+    y1 = trends['high_price'].to_numpy(dtype=float)
+    verts = np.stack([
+        np.column_stack([x0, y0]), np.column_stack([x0, y1]),
+        np.column_stack([x1, y1]), np.column_stack([x1, y0]),
+    ], axis=1)
+    colors = [TREND_COLORS[t] for t in trends['trend_type']]
+    return verts, colors
+
+
+def render_trends(df, trends, output_path, price_col='close',
+                  preset=DEFAULT_PRESET, max_points=None):
+    """
+    快速绘制趋势分析图表
+
+    不使用pyplot的全局状态，可以在多个线程中同时调用
+
+    参数:
+    df: 以日期为索引的数据框
+    trends: 趋势数据框
+    output_path: 输出路径
+    price_col: 价格列名
+    preset: 尺寸和分辨率预设，见 CHART_PRESETS
+    max_points: 价格曲线最多绘制的点数，默认为图像的像素宽度；
+                为0时不降采样
+    """
+    if preset not in CHART_PRESETS:
+        raise ValueError(
+            f"不支持的图表预设: {preset}，可选: {tuple(CHART_PRESETS)}")
+    figsize = CHART_PRESETS[preset]['figsize']
+    dpi = CHART_PRESETS[preset]['dpi']
+
+    _configure()
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.collections import PolyCollection
+    from matplotlib.dates import date2num
+    from matplotlib.patches import Patch
+
+    if max_points is None:
+        max_points = int(figsize[0] * dpi)
+    if max_points:
+        dates, prices = _downsample(df, price_col, max_points)
+    else:
+        dates, prices = df.index, df[price_col].to_numpy(dtype=float)
+
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+
+    # 绘制价格曲线
+    ax.plot(dates, prices, color='black', linewidth=1.5, label='Price')
+
+    # 全部趋势区域作为一个集合绘制
+    if len(trends):
+        verts, colors = _band_vertices(trends, date2num)
+        ax.add_collection(PolyCollection(
+            verts, facecolors=colors, edgecolors=colors, alpha=0.3))
+        ax.autoscale_view()
+
+    # 添加图例，固定位置：'best' 需要检查每个区间的遮挡，区间多时非常慢
+    legend_elements = [
+        Patch(facecolor=TREND_COLORS[t], alpha=0.3, label=TREND_LABELS[t])
+        for t in ('up', 'down', 'consolidation')
+    ]
+    ax.legend(handles=legend_elements, fontsize=12, loc='upper left')
+
+    ax.set_title('Price Trend Analysis', fontsize=16)
+    ax.set_xlabel('Date', fontsize=14)
+    ax.set_ylabel('Price', fontsize=14)
+    ax.grid(True, linestyle='--', alpha=0.7)
+    fig.tight_layout()
+
+    fig.savefig(output_path, dpi=dpi)
+
+
+def _exit_with_parent(parent_pid):
+    """
+    绘图进程初始化：父进程退出后随之退出
+
+    绘图进程由fork创建，会继承父进程的文件描述符。父进程异常退出后若绘图进程
+    仍然存在，上一级进程池（如 AnalysisPool）将无法察觉父进程已经退出。
+    """
+    def watch():
+        while os.getppid() == parent_pid:
+            time.sleep(1)
+        os._exit(0)
+
+    threading.Thread(target=watch, daemon=True).start()
+
+
+def _quiet_call(plot_func, df, trends, output_path, kwargs):
+    """在绘图进程中调用绘图函数，屏蔽其标准输出"""
+    with open(os.devnull, 'w') as devnull, \
+            contextlib.redirect_stdout(devnull):
+        plot_func(df, trends, output_path, **kwargs)
+    return output_path
+
+
+def render_in_background(plot_func, df, trends, output_path, **kwargs):
+    """
+    在后台绘图进程池中绘制图表，调用方可以继续其他计算
+
+    参数:
+    plot_func: 模块级的绘图函数，如 render_trends 或分析模块的 plot_trends
+    df, trends, output_path: 绘图函数的前三个参数，提交后不应再修改
+    kwargs: 绘图函数的其他参数
+
+    返回:
+    concurrent.futures.Future，结果为输出路径
+    """
+    global _render_executor
+    with _render_lock:
+        if _render_executor is None:
+            _render_executor = ProcessPoolExecutor(
+                max_workers=CHART_WORKERS, initializer=_exit_with_parent,
+                initargs=(os.getpid(),))
+            # 当前进程本身是进程池的工作进程时，退出前会等待全部子进程结束，
+            # 需要先停止绘图进程池，否则空闲的绘图进程永远不会退出。
+            # 优先级须高于任务队列自身的关闭（10），停止信号才能送达绘图进程
+            multiprocessing.util.Finalize(
+                None, shutdown_renderer, exitpriority=100)
+        executor = _render_executor
+    return executor.submit(
+        _quiet_call, plot_func, df, trends, output_path, kwargs)
+
+
+def when_all_done(futures, callback):
+    """
+    全部 Future 完成后调用一次 callback(futures)
+
+    callback 在最后完成的 Future 所在的线程中执行
+    """
+    futures = list(futures)
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def _done(_):
+        with lock:
+            remaining[0] -= 1
+            finished = remaining[0] == 0
+        if finished:
+            callback(futures)
+
+    if not futures:
+        callback(futures)
+    for future in futures:
+        future.add_done_callback(_done)
+
+
+def shutdown_renderer(wait=True):
+    """停止后台绘图进程"""
+    global _render_executor
+    with _render_lock:
+        executor, _render_executor = _render_executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+价格序列的多分辨率金字塔
+第k级（k>=1）把原始序列按 2^k 个点分桶，保存每个桶的最小值和最大值；桶的首末
+价格和时间按步长直接从原始序列取得，不需要另外保存，全部级别合计约为原始序列
+价格列的两倍大小。按时间范围和像素宽度查询时选择桶数不少于像素数的最粗级别，
+除二分查找定位时间外，查询耗时只与像素宽度有关，与序列长度无关。
+"""
+
+import os
+import json
+
+import numpy as np
+
+
+MIN_FILE = 'pyramid_min.f8'
+MAX_FILE = 'pyramid_max.f8'
+PYRAMID_META = 'pyramid.json'
+
+# 查询默认的像素宽度
+DEFAULT_WIDTH = 1200
+
+
+def pyramid_length(directory):
+    """
+    已生成的金字塔对应的序列长度
+
+    返回:
+    序列行数，金字塔不存在时返回 None
+    """
+    try:
+        with open(os.path.join(directory, PYRAMID_META), encoding='utf-8') as f:
+            return json.load(f)['length']
+    except FileNotFoundError:
+        return None
+
+
+def build_pyramid(directory, values):
+    """
+    生成金字塔，已存在时整体替换
+
+    第k级由第k-1级相邻两个桶合并得到，总计算量与序列长度成正比
+
+    参数:
+    directory: 输出目录，通常为 SeriesStore 中序列的目录
+    values: 按时间排序的价格数组
+
+    返回:
+    级数（含原始序列这一级）
+    """
+    values = np.asarray(values, dtype=np.float64)
+    tmp_suffix = f".{os.getpid()}.tmp"
+    paths = [os.path.join(directory, name) for name in (MIN_FILE, MAX_FILE)]
+
+    offsets = []
+    size = 0
+    mins = maxs = values
+    with open(paths[0] + tmp_suffix, 'wb') as min_file, \
+            open(paths[1] + tmp_suffix, 'wb') as max_file:
+        while len(mins) > 1:
+            pairs = np.arange(0, len(mins), 2)
+            # NaN不参与比较，整个桶都是NaN时结果为NaN
+            mins = np.fmin.reduceat(mins, pairs)
+            maxs = np.fmax.reduceat(maxs, pairs)
+            mins.tofile(min_file)
+            maxs.tofile(max_file)
+            offsets.append(size)
+            size += len(mins)
+
+    for path in paths:
+        os.replace(path + tmp_suffix, path)
+    # 最后写入元数据，读取者只会看到完整的金字塔
+    meta_path = os.path.join(directory, PYRAMID_META)
+    with open(meta_path + tmp_suffix, 'w', encoding='utf-8') as f:
+        json.dump({'length': len(values), 'offsets': offsets, 'size': size}, f)
+    os.replace(meta_path + tmp_suffix, meta_path)
+    return len(offsets) + 1
+
+
+class PricePyramid:
+    """
+    以内存映射读取的价格金字塔
+
+    使用方法:
+    pyramid = PricePyramid(directory, timestamps, values)
+    pyramid.select_level(start, end, width)    # 适合该范围和宽度的级别
+    pyramid.query(start, end, width)           # 该级别在范围内的桶
+    """
+
+    def __init__(self, directory, timestamps, values):
+        """
+        参数:
+        directory: build_pyramid 的输出目录
+        timestamps: 升序的时间戳数组，查询的 start/end 使用相同单位
+        values: 生成金字塔时使用的价格数组
+        """
+        with open(os.path.join(directory, PYRAMID_META), encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta['length'] != len(values):
+            raise ValueError(
+                f"金字塔长度 {meta['length']} 与序列长度 {len(values)} 不一致")
+        self.timestamps = timestamps
+        self.values = values
+        self.offsets = meta['offsets']
+        if meta['size']:
+            self._min = np.memmap(os.path.join(directory, MIN_FILE),
+                                  dtype=np.float64, mode='r',
+                                  shape=(meta['size'],))
+            self._max = np.memmap(os.path.join(directory, MAX_FILE),
+                                  dtype=np.float64, mode='r',
+                                  shape=(meta['size'],))
+        else:
+            self._min = self._max = np.empty(0, dtype=np.float64)
+
+    @property
+    def levels(self):
+        """级数，第0级为原始序列"""
+        return len(self.offsets) + 1
+
+    def _positions(self, start, end):
+        """时间范围 [start, end] 在原始序列中的位置，两侧各多取一个点"""
+        n = len(self.timestamps)
+        lo = 0 if start is None else int(
+            np.searchsorted(self.timestamps, start, 'left'))
+        hi = n if end is None else int(
+            np.searchsorted(self.timestamps, end, 'right'))
+        return max(lo - 1, 0), min(hi + 1, n)
+
+    @staticmethod
+    def _bucket_count(lo, hi, level):
+        """位置 [lo, hi) 在第 level 级覆盖的桶数，首末桶按对齐可能只覆盖一部分"""
+        return ((hi - 1) >> level) - (lo >> level) + 1
+
+    def select_level(self, start=None, end=None, width=DEFAULT_WIDTH):
+        """
+        选择桶数不少于 width 的最粗级别
+
+        下一级的每个桶最多合并本级的两个桶，所以选中级别的桶数小于 2*width
+
+        返回:
+        级别，0 表示范围内的点数不超过 width，直接使用原始序列
+        """
+        lo, hi = self._positions(start, end)
+        count = hi - lo
+        width = max(int(width), 1)
+        if count <= width:
+            return 0
+        # 从 floor(log2(count / width)) 级开始调整：首末桶不对齐时更粗的级别
+        # 可能也满足；最粗几级的桶数很少，受级数限制时要退回更细的级别
+        level = min((count // width).bit_length() - 1, self.levels - 1)
+        while (level + 1 < self.levels and
+               self._bucket_count(lo, hi, level + 1) >= width):
+            level += 1
+        while level > 0 and self._bucket_count(lo, hi, level) < width:
+            level -= 1
+        return level
+
+    def query(self, start=None, end=None, width=DEFAULT_WIDTH):
+        """
+        时间范围内的桶，桶数不少于 width 且小于 2*width（原始点数不足时为全部点）
+
+        返回:
+        字典，包含级别 level、每桶点数 bucket_size，以及各桶的
+        start/end（首末时间）、first/last（首末价格）、min/max 数组
+        """
+        lo, hi = self._positions(start, end)
+        level = self.select_level(start, end, width)
+        bucket_size = 1 << level
+        first_bucket = lo >> level
+        last_bucket = max((hi - 1) >> level, first_bucket - 1) + 1
+
+        first_pos = np.arange(first_bucket, last_bucket) * bucket_size
+        last_pos = np.minimum(first_pos + bucket_size - 1,
+                              len(self.values) - 1)
+        if level == 0:
+            mins = maxs = np.asarray(self.values[first_bucket:last_bucket])
+        else:
+            offset = self.offsets[level - 1]
+            mins = np.asarray(self._min[offset + first_bucket:
+                                        offset + last_bucket])
+            maxs = np.asarray(self._max[offset + first_bucket:
+                                        offset + last_bucket])
+        return {
+            'level': level,
+            'bucket_size': bucket_size,
+            'start': np.asarray(self.timestamps[first_pos]),
+            'end': np.asarray(self.timestamps[last_pos]),
+            'first': np.asarray(self.values[first_pos]),
+            'last': np.asarray(self.values[last_pos]),
+            'min': mins,
+            'max': maxs,
+        }
@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+价格序列的区间最值索引（稀疏表）
+对同一序列建立一次索引后，任意闭区间 [start, end] 的最大/最小值及其位置
+都可以在O(1)时间内得到，支持对大量区间的向量化查询。
+"""
+
+import numpy as np
+
+
+# 未建立稀疏表时逐段扫描的累计长度超过序列长度的该倍数，才建立稀疏表；
+# 建立稀疏表的耗时约为扫描整个序列的16倍
+BUILD_FACTOR = 16
+# 逐段扫描时每批区间首尾相接后的最大长度，限制临时数组的内存
+# （约45字节/元素）；超过该长度的单个区间单独成批
+SCAN_BLOCK = 1 << 20
+
+
+class RangeExtremumIndex:
+    """
+    区间最大值/最小值位置的稀疏表
+
+    第k层保存每个位置开始、长度为2^k的窗口内最值的位置；查询时用两个
+    可重叠的2^k窗口覆盖整个区间。建立索引的时间和空间为O(n log n)。
+
+    稀疏表在需要时才建立：按swing点把序列分成相邻区间这类查询的总长度与
+    序列长度相当，直接按段扫描只需O(查询总长度)，不占用额外内存；累计扫描
+    长度超过序列长度的 BUILD_FACTOR 倍后才建立稀疏表，之后的查询都为O(1)。
+
+    相同取值取最左边的位置，与 Series.idxmax/idxmin 一致。
+
+    使用方法:
+    index = RangeExtremumIndex(prices)
+    index.argmax(start_idx, end_idx)        # 单个区间
+    index.max(starts, ends)                 # 多个区间，返回数组
+    """
+
+    def __init__(self, values, skipna=True, has_nan=None):
+        """
+        参数:
+        values: 一维数值序列
+        skipna: True时忽略NaN（与pandas一致，区间内全为NaN时返回NaN的位置）；
+                False时NaN参与比较并使结果为NaN（与 np.max/np.min 一致）
+        has_nan: 可选，values 是否含有NaN，调用者已知时可避免重复检查
+        """
+        self.values = np.asarray(values, dtype=float)
+        self.skipna = skipna
+        self.has_nan = (bool(np.isnan(self.values).any()) if has_nan is None
+                        else bool(has_nan))
+        self._tables = None
+        self._scanned = 0
+
+    def __len__(self):
+        return len(self.values)
+
+    def _build_tables(self):
+        """建立最大值和最小值的稀疏表"""
+        n = len(self.values)
+        pos_dtype = np.int32 if n < 2**31 else np.int64
+
+        # 以取值的排名代替取值比较，NaN按skipna排在最低或最高
+        valid = ~np.isnan(self.values)
+        _, ranks = np.unique(self.values[valid], return_inverse=True)
+        nan_low, nan_high = (-1, n) if self.skipna else (n, -1)
+        max_key = np.full(n, nan_low, dtype=np.int64)
+        max_key[valid] = ranks
+        min_key = np.full(n, nan_high, dtype=np.int64)
+        min_key[valid] = ranks
+
+        self._tables = {
+            'max': (self._build(max_key, pos_dtype, np.greater_equal),
+                    max_key, np.greater_equal),
+            'min': (self._build(min_key, pos_dtype, np.less_equal),
+                    min_key, np.less_equal),
+        }
+
+    @staticmethod
+    def _build(key, pos_dtype, keep_left):
+        """逐层合并相邻窗口，keep_left(左, 右) 为真时保留左侧位置"""
+        level = np.arange(len(key), dtype=pos_dtype)
+        table = [level]
+        width = 1
+        while 2 * width <= len(key):
+            left, right = level[:-width], level[width:]
+            level = np.where(keep_left(key[left], key[right]), left, right)
+            table.append(level)
+            width *= 2
+        return table
+
+    def _query(self, kind, start, end):
+        scalar = np.ndim(start) == 0 and np.ndim(end) == 0
+        if scalar and self._tables is not None:
+            return self._query_one(*self._tables[kind], int(start), int(end))
+
+        start = np.atleast_1d(np.asarray(start, dtype=np.int64))
+        end = np.atleast_1d(np.asarray(end, dtype=np.int64))
+        start, end = np.broadcast_arrays(start, end)
+        if len(start) and (
+                start.min() < 0 or end.max() >= len(self.values)
+                or (start > end).any()):
+            raise ValueError("区间超出范围或起点大于终点")
+
+        if self._tables is None:
+            length = int((end - start + 1).sum())
+            if self._scanned + length <= BUILD_FACTOR * len(self.values):
+                self._scanned += length
+                result = self._scan(kind, start, end)
+                return int(result[0]) if scalar else result
+            self._build_tables()
+        if scalar:
+            return self._query_one(*self._tables[kind], int(start[0]),
+                                   int(end[0]))
+        return self._query_table(*self._tables[kind], start, end)
+
+    def _scan(self, kind, start, end):
+        """不使用稀疏表，按总长度不超过 SCAN_BLOCK 分批扫描区间"""
+        lengths = end - start + 1
+        ends = np.cumsum(lengths)
+        result = np.empty(len(start), dtype=np.int64)
+        i = 0
+        while i < len(start):
+            # 每批至少包含一个区间
+            limit = ends[i] - lengths[i] + SCAN_BLOCK
+            j = max(i + 1, int(np.searchsorted(ends, limit, side='right')))
+            result[i:j] = self._scan_block(kind, start[i:j], end[i:j])
+            i = j
+        return result
+
+    def _scan_block(self, kind, start, end):
+        """把一批区间首尾相接后用 reduceat 逐段求最值的位置"""
+        lengths = end - start + 1
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        total = int(offsets[-1] + lengths[-1])
+        positions = np.arange(total) + np.repeat(start - offsets, lengths)
+        values = self.values[positions]
+
+        if kind == 'max':
+            reduce = np.fmax if self.skipna else np.maximum
+        else:
+            reduce = np.fmin if self.skipna else np.minimum
+        # fmax/fmin忽略NaN，maximum/minimum遇到NaN时结果为NaN
+        best = np.repeat(reduce.reduceat(values, offsets), lengths)
+        hit = (values == best) | (np.isnan(values) & np.isnan(best))
+        first = np.minimum.reduceat(
+            np.where(hit, np.arange(total), total), offsets)
+        return positions[first]
+
+    def _query_table(self, table, key, keep_left, start, end):
+        """使用稀疏表的向量化查询"""
+
+        # 每个区间所用的层 k = floor(log2(长度))
+        level = np.frexp((end - start + 1).astype(float))[1] - 1
+        result = np.empty(len(start), dtype=np.int64)
+        for k in np.unique(level):
+            rows = level == k
+            left = table[k][start[rows]]
+            right = table[k][end[rows] - (1 << int(k)) + 1]
+            result[rows] = np.where(
+                keep_left(key[left], key[right]), left, right)
+        return result
+
+    def _query_one(self, table, key, keep_left, start, end):
+        """单个区间的查询，避免数组操作的开销"""
+        if start < 0 or end >= len(self.values) or start > end:
+            raise ValueError("区间超出范围或起点大于终点")
+        k = (end - start + 1).bit_length() - 1
+        left = int(table[k][start])
+        right = int(table[k][end - (1 << k) + 1])
+        return left if keep_left(key[left], key[right]) else right
+
+    def argmax(self, start, end):
+        """闭区间 [start, end] 内最大值的位置，参数可以是整数或数组"""
+        return self._query('max', start, end)
+
+    def argmin(self, start, end):
+        """闭区间 [start, end] 内最小值的位置，参数可以是整数或数组"""
+        return self._query('min', start, end)
+
+    def max(self, start, end):
+        """闭区间 [start, end] 内的最大值"""
+        return self.values[self.argmax(start, end)]
+
+    def min(self, start, end):
+        """闭区间 [start, end] 内的最小值"""
+        return self.values[self.argmin(start, end)]
@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+趋势分析结果缓存
+以清理后序列内容、分析参数和分析代码版本的哈希作为键，保存趋势表、增强分析表、
+图表和报告。同一份数据再次分析时直接复制缓存文件，不再重新计算。
+
+另外记录原始文件内容哈希到结果键的映射，Web服务可以在不解析CSV的情况下
+直接判断重复上传的文件是否已有结果。
+"""
+
+import os
+import ast
+import json
+import shutil
+import hashlib
+import tempfile
+from functools import lru_cache
+
+import numpy as np
+
+from segments import to_ns
+
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_CACHE_DIR = os.path.join(current_dir, 'cache', 'results')
+
+# 分析入口；它和它直接或间接导入的同目录模块任一改变都会使旧缓存失效
+CODE_ENTRY = 'main.py'
+
+# run_analysis 输出文件名中时间戳和文件名之后的部分
+ARTIFACT_SUFFIXES = (
+    'sensitive-trend_analysis.csv',
+    'sensitive-trend_visualization.png',
+    'sensitive-enhanced_analysis.csv',
+    'insensitive-trend_analysis.csv',
+    'insensitive-trend_visualization.png',
+    'insensitive-enhanced_analysis.csv',
+    'comparison_report.csv',
+    'detailed_report.md',
+    'chart_data.npz',
+)
+
+
+def _local_imports(name):
+    """模块文件 name 导入的同目录模块文件名，包括函数内的延迟导入"""
+    with open(os.path.join(current_dir, name), 'rb') as f:
+        tree = ast.parse(f.read(), filename=name)
+    modules = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            modules.add(node.module.split('.')[0])
+    return [f"{module}.py" for module in modules
+            if os.path.exists(os.path.join(current_dir, f"{module}.py"))]
+
+
+@lru_cache(maxsize=None)
+def code_files(entry=CODE_ENTRY):
+    """
+    分析路径上的代码文件：entry 以及它直接或间接导入的同目录模块
+
+    按源码静态分析导入关系，结果与当前进程已经导入了哪些模块无关，
+    Web服务和工作进程得到相同的代码版本
+
+    返回:
+    按文件名排序的元组
+    """
+    found = set()
+    pending = [entry]
+    while pending:
+        name = pending.pop()
+        if name not in found:
+            found.add(name)
+            pending.extend(_local_imports(name))
+    return tuple(sorted(found))
+
+
+@lru_cache(maxsize=None)
+def code_version():
+    """分析代码的版本哈希"""
+    digest = hashlib.sha256()
+    for name in code_files():
+        path = os.path.join(current_dir, name)
+        digest.update(name.encode('utf-8'))
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def _params_bytes(params):
+    return json.dumps(params or {}, sort_keys=True, default=str).encode('utf-8')
+
+
+def output_params(params, charts=True, chart_preset=None):
+    """
+    影响结果文件的全部参数：分析参数加上图表设置
+
+    结果键和原始文件键都应使用它计算，保证不同图表设置的结果互不覆盖
+
+    参数:
+    params: 分析参数字典
+    charts: 是否生成趋势图表
+    chart_preset: 图表预设，charts 为True时有效
+    """
+    key_params = dict(params)
+    if not charts:
+        # 不含图表的结果单独缓存，避免之后需要图表的请求命中不完整的条目
+        key_params['charts'] = False
+    else:
+        key_params['chart_preset'] = chart_preset
+    return key_params
+
+
+def series_key(df, params=None):
+    """
+    计算清理后序列的缓存键
+
+    参数:
+    df: 以日期为索引的数据框（clean_data 之后）
+    params: 分析参数字典，如价格列、ATR周期、阈值
+
+    返回:
+    十六进制哈希字符串
+    """
+    digest = hashlib.sha256()
+    digest.update(code_version().encode('utf-8'))
+    digest.update(_params_bytes(params))
+    digest.update(np.ascontiguousarray(to_ns(df.index)).tobytes())
+    for col in df.columns:
+        digest.update(str(col).encode('utf-8'))
+        values = df[col]
+        if values.dtype.kind in 'biuf':
+            digest.update(np.ascontiguousarray(
+                values.to_numpy(dtype=float)).tobytes())
+        else:
+            digest.update('\x1f'.join(values.astype(str)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def file_key(source, params=None):
+    """
+    计算原始文件内容的键，用于查找已缓存的结果
+
+    参数:
+    source: 文件路径或文件内容（bytes）
+    params: 分析参数字典
+    """
+    digest = hashlib.sha256()
+    digest.update(code_version().encode('utf-8'))
+    digest.update(_params_bytes(params))
+    if isinstance(source, (bytes, bytearray)):
+        digest.update(source)
+    else:
+        with open(source, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    基于内容哈希的分析结果缓存
+
+    目录结构:
+    cache_dir/<key前两位>/<key>/manifest.json 及各结果文件
+    cache_dir/files/<file_key>.json 记录原始文件对应的结果键
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def _alias_path(self, source_key):
+        return os.path.join(self.cache_dir, 'files', f"{source_key}.json")
+
+    def get(self, key):
+        """
+        查找缓存条目
+
+        返回:
+        {后缀: 缓存文件路径}，不存在或文件不完整时返回 None
+        """
+        entry = self._entry_dir(key)
+        try:
+            with open(os.path.join(entry, 'manifest.json'),
+                      encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        files = {
+            suffix: os.path.join(entry, suffix)
+            for suffix in manifest.get('files', [])
+        }
+        if not files or not all(os.path.exists(p) for p in files.values()):
+            return None
+        return files
+
+    def put(self, key, files, source_key=None):
+        """
+        保存一次分析的结果文件
+
+        参数:
+        key: series_key 计算的键
+        files: {后缀: 结果文件路径}，不存在的文件会被忽略
+        source_key: 可选，file_key 计算的原始文件键
+        """
+        os.makedirs(os.path.dirname(self._entry_dir(key)), exist_ok=True)
+        # 先写入临时目录再整体改名，避免其他进程读到不完整的条目
+        tmp_dir = tempfile.mkdtemp(
+            prefix=f".{key}.", dir=os.path.dirname(self._entry_dir(key)))
+        stored = []
+        try:
+            for suffix, path in files.items():
+                if path and os.path.exists(path):
+                    shutil.copyfile(path, os.path.join(tmp_dir, suffix))
+                    stored.append(suffix)
+            with open(os.path.join(tmp_dir, 'manifest.json'), 'w',
+                      encoding='utf-8') as f:
+                json.dump({'key': key, 'code_version': code_version(),
+                           'files': stored}, f, ensure_ascii=False)
+            entry = self._entry_dir(key)
+            if os.path.exists(entry):
+                shutil.rmtree(entry, ignore_errors=True)
+            os.replace(tmp_dir, entry)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        if source_key is not None:
+            self.link(source_key, key)
+
+    def link(self, source_key, key):
+        """记录原始文件键到结果键的映射"""
+        path = self._alias_path(source_key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'key': key}, f)
+        os.replace(tmp_path, path)
+
+    def resolve(self, source_key):
+        """由原始文件键查找结果键，未记录时返回 None"""
+        try:
+            with open(self._alias_path(source_key), encoding='utf-8') as f:
+                return json.load(f).get('key')
+        except (OSError, ValueError):
+            return None
+
+    def restore(self, key, output_dir, prefix):
+        """
+        将缓存的结果文件复制到输出目录，文件名为 "<prefix>-<后缀>"
+
+        返回:
+        {后缀: 输出文件路径}，未命中时返回 None
+        """
+        files = self.get(key)
+        if files is None:
+            return None
+        os.makedirs(output_dir, exist_ok=True)
+        restored = {}
+        for suffix, path in files.items():
+            dest = os.path.join(output_dir, f"{prefix}-{suffix}")
+            shutil.copyfile(path, dest)
+            restored[suffix] = dest
+        return restored
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+趋势区间的紧凑表示
+合并和优化过程中区间只保存整数位置和价格，日期统一用int64纳秒数组计算，
+只在返回结果时一次性转换为DataFrame
+"""
+
+import numpy as np
+import pandas as pd
+
+
+DAY_NS = 86400 * 10**9
+
+SEGMENT_COLUMNS = [
+    'start_date', 'end_date', 'start_price', 'end_price', 'low_price',
+    'high_price', 'pct_change', 'duration', 'trend_type'
+]
+
+
+def to_ns(dates):
+    """将日期索引转换为int64纳秒数组"""
+    return pd.DatetimeIndex(dates).as_unit('ns').asi8
+
+
+def days_between(times, start_idx, end_idx):
+    """两个位置之间相差的天数，与 Timedelta.days 一致（向下取整）"""
+    return int((times[end_idx] - times[start_idx]) // DAY_NS)
+
+
+def pct_change(start_price, end_price):
+    """区间涨跌幅，保留4位小数"""
+    return round((end_price - start_price) / max(abs(start_price), 1e-10), 4)
+
+
+class Segment:
+    """单个趋势区间，日期以在价格序列中的位置表示"""
+
+    __slots__ = (
+        'start_idx', 'end_idx', 'start_price', 'end_price', 'low_price',
+        'high_price', 'pct_change', 'duration', 'trend_type'
+    )
+
+    def __init__(self, start_idx, end_idx, start_price, end_price, low_price,
+                 high_price, pct_change, duration, trend_type):
+        self.start_idx = start_idx
+        self.end_idx = end_idx
+        self.start_price = start_price
+        self.end_price = end_price
+        self.low_price = low_price
+        self.high_price = high_price
+        self.pct_change = pct_change
+        self.duration = duration
+        self.trend_type = trend_type
+
+    @classmethod
+    def from_positions(cls, prices, times, start_idx, end_idx, trend_type,
+                       low_price=None, high_price=None):
+        """
+        根据价格序列中的起止位置创建区间
+
+        参数:
+        prices: 价格数组
+        times: int64纳秒时间数组
+        start_idx: 起点位置
+        end_idx: 终点位置（包含）
+        trend_type: 趋势类型
+        low_price, high_price: 可选，已知的区间最低/最高价（如由
+                               RangeExtremumIndex 批量查询得到），不提供时对区间切片计算
+        """
+        if low_price is None or high_price is None:
+            segment = prices[start_idx:end_idx + 1]
+            low_price, high_price = np.min(segment), np.max(segment)
+        return cls(
+            int(start_idx), int(end_idx),
+            prices[start_idx], prices[end_idx],
+            low_price, high_price,
+            pct_change(prices[start_idx], prices[end_idx]),
+            days_between(times, start_idx, end_idx),
+            trend_type
+        )
+
+    def copy(self):
+        return Segment(
+            self.start_idx, self.end_idx, self.start_price, self.end_price,
+            self.low_price, self.high_price, self.pct_change, self.duration,
+            self.trend_type
+        )
+
+    def __repr__(self):
+        return (f"Segment({self.start_idx}->{self.end_idx}, "
+                f"{self.trend_type}, {self.pct_change})")
+
+
+def segments_to_frame(segments, dates):
+    """
+    将区间列表按列转换为DataFrame
+
+    参数:
+    segments: Segment列表
+    dates: 日期索引，区间位置在其中取值
+
+    返回:
+    与原先字典列表构造的结果列一致的DataFrame
+    """
+    if not segments:
+        return pd.DataFrame()
+
+    dates = pd.DatetimeIndex(dates)
+    start = np.fromiter((s.start_idx for s in segments), dtype=np.int64,
+                        count=len(segments))
+    end = np.fromiter((s.end_idx for s in segments), dtype=np.int64,
+                      count=len(segments))
+    return pd.DataFrame({
+        'start_date': dates[start],
+        'end_date': dates[end],
+        'start_price': [s.start_price for s in segments],
+        'end_price': [s.end_price for s in segments],
+        'low_price': [s.low_price for s in segments],
+        'high_price': [s.high_price for s in segments],
+        'pct_change': [s.pct_change for s in segments],
+        'duration': [s.duration for s in segments],
+        'trend_type': [s.trend_type for s in segments],
+    }, columns=SEGMENT_COLUMNS)
@@ -0,0 +1,485 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+本地价格序列存储
+按代码保存清理、排序后的时间戳（int64纳秒）和价格（float64）列文件，
+数据包含 high/low 列时一并保存，供ATR使用真实波幅计算。
+读取时通过内存映射直接构造DataFrame，不需要重新解析和清理原始文件。
+同一序列用不同参数反复分析时，数据只在第一次导入时处理一次。
+每个序列同时保存多分辨率金字塔（见 price_pyramid），供Web界面缩放和平移浏览。
+"""
+
+import os
+import re
+import json
+import uuid
+import shutil
+import argparse
+import contextlib
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+import pandas as pd
+
+from segments import to_ns
+from price_pyramid import PricePyramid, build_pyramid, pyramid_length
+
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_STORE_DIR = os.path.join(current_dir, 'cache', 'series')
+
+TIMESTAMP_FILE = 'timestamps.i8'
+VALUE_FILE = 'values.f8'
+META_FILE = 'meta.json'
+# 价格列之外一并保存的列，文件名为 <列名>.f8；只有两列同时存在时才保存
+EXTRA_COLUMNS = ('high', 'low')
+EXTRA_SUFFIX = '.f8'
+# 代码目录下记录当前版本目录名的文件
+CURRENT_FILE = 'current'
+# 写入锁文件所在的子目录
+LOCK_DIR = '.locks'
+# 读取的版本被之后的写入删除时，重新读取 current 的次数
+_READ_ATTEMPTS = 10
+
+_SYMBOL_PATTERN = re.compile(r'^[\w.\-]+$')
+
+
+class SeriesStore:
+    """
+    内存映射的价格序列存储
+
+    每个序列保存一个价格列；数据同时包含 high 和 low 列时一并保存，
+    load 得到的数据框与原始数据一样按 high/low/价格列计算ATR。
+
+    目录结构:
+    store_dir/<symbol>/current                  当前版本的目录名
+    store_dir/<symbol>/<版本>/timestamps.i8     升序的int64纳秒时间戳（UTC）
+    store_dir/<symbol>/<版本>/values.f8         对应的float64价格
+    store_dir/<symbol>/<版本>/high.f8, low.f8   可选，float64最高价和最低价
+    store_dir/<symbol>/<版本>/meta.json         行数、价格列名、时区和额外的列
+    store_dir/<symbol>/<版本>/pyramid_*         价格金字塔，write 时生成，追加后
+                                                在下次访问 pyramid 时重新生成
+
+    write 把序列写入新的版本目录后原子地替换 current，读取者总能看到完整的
+    序列；上一个版本保留到下一次 write，正在读取它的进程不受影响。
+    meta.json 中的行数是有效数据的长度，追加时先写列文件再更新行数，
+    写入中断时多出的字节会在下次追加前截掉。同一代码的 write、append 和
+    delete 通过 store_dir/.locks 下的文件锁依次执行，可以在多个进程中并发调用。
+
+    使用方法:
+    store = SeriesStore()
+    store.write('AAPL', df)               # df 为 clean_data 之后的数据框
+    store.append('AAPL', new_rows)
+    df = store.load('AAPL')               # 零拷贝，可直接传给 analyze
+    store.pyramid('AAPL').query(start, end, width)
+    """
+
+    def __init__(self, store_dir=DEFAULT_STORE_DIR):
+        self.store_dir = store_dir
+
+    def _symbol_dir(self, symbol):
+        # 以点开头的名称保留给 . .. 和锁目录
+        if not _SYMBOL_PATTERN.match(symbol) or symbol.startswith('.'):
+            raise ValueError(f"无效的代码: {symbol!r}")
+        return os.path.join(self.store_dir, symbol)
+
+    @contextlib.contextmanager
+    def _locked(self, symbol):
+        """持有代码的写入锁，同一代码的写入操作依次执行"""
+        lock_dir = os.path.join(self.store_dir, LOCK_DIR)
+        os.makedirs(lock_dir, exist_ok=True)
+        with open(os.path.join(lock_dir, f"{symbol}.lock"), 'a+b') as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        # LK_LOCK 只重试10秒，继续等待
+                        continue
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _current(self, symbol, open_arrays=False):
+        """
+        序列的当前版本
+
+        读取期间该版本被之后的写入删除时，重新读取 current
+
+        返回:
+        (版本目录, meta字典)，open_arrays 为True时再加上时间戳和价格的
+        内存映射数组；序列不存在时抛出 KeyError
+        """
+        symbol_dir = self._symbol_dir(symbol)
+        for _ in range(_READ_ATTEMPTS):
+            try:
+                with open(os.path.join(symbol_dir, CURRENT_FILE),
+                          encoding='utf-8') as f:
+                    data_dir = os.path.join(symbol_dir, f.read())
+            except FileNotFoundError:
+                raise KeyError(f"序列不存在: {symbol}") from None
+            try:
+                with open(os.path.join(data_dir, META_FILE),
+                          encoding='utf-8') as f:
+                    meta = json.load(f)
+                if not open_arrays:
+                    return data_dir, meta
+                return (data_dir, meta) + self._open(data_dir, meta)
+            except FileNotFoundError:
+                continue
+        raise KeyError(f"序列不存在或正在被反复替换: {symbol}")
+
+    @staticmethod
+    def _write_meta(data_dir, meta):
+        path = os.path.join(data_dir, META_FILE)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def symbols(self):
+        """已保存的全部代码"""
+        if not os.path.isdir(self.store_dir):
+            return []
+        return sorted(
+            name for name in os.listdir(self.store_dir)
+            if os.path.exists(os.path.join(self.store_dir, name, CURRENT_FILE)))
+
+    def __contains__(self, symbol):
+        try:
+            return os.path.exists(
+                os.path.join(self._symbol_dir(symbol), CURRENT_FILE))
+        except ValueError:
+            return False
+
+    def length(self, symbol):
+        """序列的行数"""
+        return self._current(symbol)[1]['length']
+
+    @staticmethod
+    def _columns(df, price_col):
+        """
+        取出时间戳、价格和额外列的数组，按时间排序
+
+        返回:
+        (int64纳秒数组, float64价格数组, 价格列名, 时区名, {列名: float64数组})，
+        high/low 不同时存在或价格列本身就是其中之一时额外列为空
+        """
+        if price_col is None:
+            price_col = 'close' if 'close' in df.columns else df.columns[0]
+        df = df.sort_index()
+        index = pd.DatetimeIndex(df.index)
+        tz = None if index.tz is None else str(index.tz)
+        timestamps = np.ascontiguousarray(to_ns(index), dtype=np.int64)
+        values = np.ascontiguousarray(
+            df[price_col].to_numpy(dtype=float), dtype=np.float64)
+        extras = {}
+        if (price_col not in EXTRA_COLUMNS and
+                all(col in df.columns for col in EXTRA_COLUMNS)):
+            extras = {col: np.ascontiguousarray(
+                df[col].to_numpy(dtype=float), dtype=np.float64)
+                for col in EXTRA_COLUMNS}
+        return timestamps, values, price_col, tz, extras
+
+    def write(self, symbol, df, price_col=None):
+        """
+        保存序列，已存在时整体替换；已保存的序列与数据完全相同时不重写
+
+        参数:
+        symbol: 代码，只能包含字母、数字、下划线、点和短横线
+        df: 以日期为索引的数据框，通常为 clean_data 的结果
+        price_col: 价格列名，默认为 close 列，没有时使用第一列
+
+        返回:
+        保存的行数
+        """
+        symbol_dir = self._symbol_dir(symbol)
+        timestamps, values, price_col, tz, extras = self._columns(
+            df, price_col)
+        meta = {'length': len(values), 'column': price_col, 'tz': tz,
+                'extra': list(extras)}
+
+        with self._locked(symbol):
+            old_version = None
+            if symbol in self:
+                data_dir, old_meta = self._current(symbol)
+                if old_meta == meta and self._same_arrays(
+                        data_dir, meta, timestamps, values, extras):
+                    return len(values)
+                old_version = os.path.basename(data_dir)
+
+            # 写入新的版本目录后替换 current，读取者不会看到不完整的序列
+            version = uuid.uuid4().hex
+            data_dir = os.path.join(symbol_dir, version)
+            os.makedirs(data_dir)
+            timestamps.tofile(os.path.join(data_dir, TIMESTAMP_FILE))
+            values.tofile(os.path.join(data_dir, VALUE_FILE))
+            for col, array in extras.items():
+                array.tofile(os.path.join(data_dir, col + EXTRA_SUFFIX))
+            self._write_meta(data_dir, meta)
+            build_pyramid(data_dir, values)
+
+            current_path = os.path.join(symbol_dir, CURRENT_FILE)
+            with open(f"{current_path}.{os.getpid()}.tmp", 'w',
+                      encoding='utf-8') as f:
+                f.write(version)
+            os.replace(f"{current_path}.{os.getpid()}.tmp", current_path)
+
+            # 保留上一个版本，替换前开始读取的进程仍可以打开它
+            for name in os.listdir(symbol_dir):
+                path = os.path.join(symbol_dir, name)
+                if name not in (version, old_version) and os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+        return len(values)
+
+    @staticmethod
+    def _same_arrays(data_dir, meta, timestamps, values, extras):
+        """版本目录中保存的数组是否与给定数组完全相同"""
+        if len(values) == 0:
+            return True
+        stored_timestamps, stored_values = SeriesStore._open(data_dir, meta)
+        stored_extras = SeriesStore._open_extras(data_dir, meta)
+        return (np.array_equal(stored_timestamps, timestamps) and
+                np.array_equal(stored_values, values, equal_nan=True) and
+                all(np.array_equal(stored_extras[col], array, equal_nan=True)
+                    for col, array in extras.items()))
+
+    def append(self, symbol, df, price_col=None):
+        """
+        在序列末尾追加新数据，序列不存在时新建
+
+        时间早于或等于已保存的最后时间的行会被忽略；修改历史数据请使用 write
+
+        返回:
+        实际追加的行数
+        """
+        if symbol not in self:
+            return self.write(symbol, df, price_col)
+
+        with self._locked(symbol):
+            return self._append_locked(symbol, df, price_col)
+
+    def _append_locked(self, symbol, df, price_col):
+        data_dir, meta = self._current(symbol)
+        if price_col is None:
+            price_col = meta['column'] if meta['column'] in df.columns else None
+        timestamps, values, _, tz, extras = self._columns(df, price_col)
+        if tz != meta['tz'] and len(values):
+            raise ValueError(
+                f"追加数据的时区 {tz} 与已保存的序列 {meta['tz']} 不一致")
+        stored_cols = meta.get('extra', [])
+        missing = [col for col in stored_cols if col not in extras]
+        if missing and len(values):
+            raise ValueError(f"追加数据缺少已保存的列: {missing}")
+
+        length = meta['length']
+        if length:
+            stored, _ = self._open(data_dir, meta)
+            keep = timestamps > stored[-1]
+            timestamps, values = timestamps[keep], values[keep]
+            extras = {col: extras[col][keep] for col in stored_cols}
+            del stored
+        if len(values) == 0:
+            return 0
+
+        files = [(TIMESTAMP_FILE, timestamps), (VALUE_FILE, values)]
+        files += [(col + EXTRA_SUFFIX, extras[col]) for col in stored_cols]
+        for name, array in files:
+            with open(os.path.join(data_dir, name), 'r+b') as f:
+                # 截掉上次写入中断时留下的多余字节
+                f.truncate(length * array.itemsize)
+                f.seek(0, os.SEEK_END)
+                array.tofile(f)
+
+        meta['length'] = length + len(values)
+        self._write_meta(data_dir, meta)
+        return len(values)
+
+    def arrays(self, symbol):
+        """
+        以只读内存映射打开序列
+
+        返回:
+        (int64纳秒时间戳数组, float64价格数组)
+        """
+        return self._current(symbol, open_arrays=True)[2:]
+
+    @staticmethod
+    def _open(data_dir, meta):
+        length = meta['length']
+        if length == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        timestamps = np.memmap(os.path.join(data_dir, TIMESTAMP_FILE),
+                               dtype=np.int64, mode='r', shape=(length,))
+        values = np.memmap(os.path.join(data_dir, VALUE_FILE),
+                           dtype=np.float64, mode='r', shape=(length,))
+        return timestamps, values
+
+    @staticmethod
+    def _open_extras(data_dir, meta):
+        """以内存映射打开额外保存的列，返回 {列名: 数组}"""
+        length = meta['length']
+        if length == 0:
+            return {col: np.empty(0, dtype=np.float64)
+                    for col in meta.get('extra', [])}
+        return {col: np.memmap(os.path.join(data_dir, col + EXTRA_SUFFIX),
+                               dtype=np.float64, mode='r', shape=(length,))
+                for col in meta.get('extra', [])}
+
+    def load(self, symbol):
+        """
+        读取序列为以日期为索引的数据框
+
+        包含价格列，保存时有 high/low 列的序列还包含这两列。
+        索引和各列都是内存映射数组的视图，不复制数据，
+        可以直接传给 TrendAnalyzer.analyze 或 SharedStages
+
+        返回:
+        DataFrame
+        """
+        for attempt in range(_READ_ATTEMPTS):
+            data_dir, meta, timestamps, values = self._current(
+                symbol, open_arrays=True)
+            try:
+                extras = self._open_extras(data_dir, meta)
+                break
+            except FileNotFoundError:
+                # 该版本在读取期间被删除，重新读取当前版本
+                if attempt == _READ_ATTEMPTS - 1:
+                    raise
+        index = pd.DatetimeIndex(
+            np.asarray(timestamps).view('datetime64[ns]'), copy=False)
+        if meta['tz'] is not None:
+            index = index.tz_localize('UTC').tz_convert(meta['tz'])
+        # 价格列在第一列，与 clean_data 之后按第一列确定价格列的规则一致
+        columns = {meta['column']: np.asarray(values)}
+        columns.update(
+            (col, np.asarray(array)) for col, array in extras.items())
+        return pd.DataFrame(columns, index=index, copy=False)
+
+    def pyramid(self, symbol):
+        """
+        序列的多分辨率金字塔，时间戳单位为纳秒
+
+        金字塔不存在或与序列长度不一致（追加之后）时先重新生成
+
+        返回:
+        PricePyramid
+        """
+        for attempt in range(_READ_ATTEMPTS):
+            data_dir, _, timestamps, values = self._current(
+                symbol, open_arrays=True)
+            try:
+                if pyramid_length(data_dir) != len(values):
+                    build_pyramid(data_dir, values)
+                return PricePyramid(data_dir, timestamps, values)
+            except FileNotFoundError:
+                # 该版本在读取期间被删除，重新读取当前版本
+                if attempt == _READ_ATTEMPTS - 1:
+                    raise
+
+    def delete(self, symbol):
+        """删除序列"""
+        symbol_dir = self._symbol_dir(symbol)
+        with self._locked(symbol):
+            shutil.rmtree(symbol_dir, ignore_errors=True)
+
+    def touch(self, symbol):
+        """把序列标记为刚刚使用（更新 current 的修改时间），见 prune"""
+        try:
+            os.utime(os.path.join(self._symbol_dir(symbol), CURRENT_FILE))
+        except FileNotFoundError:
+            pass
+
+    def prune(self, keep):
+        """
+        只保留最近使用的 keep 个序列，其余的删除
+
+        最近使用时间为 current 的修改时间，write 替换序列或调用 touch 时更新
+
+        返回:
+        删除的代码列表
+        """
+        used = []
+        for symbol in self.symbols():
+            try:
+                used.append((os.path.getmtime(os.path.join(
+                    self.store_dir, symbol, CURRENT_FILE)), symbol))
+            except FileNotFoundError:
+                continue
+        used.sort(reverse=True)
+        removed = [symbol for _, symbol in used[max(0, keep):]]
+        for symbol in removed:
+            self.delete(symbol)
+        return removed
+
+
+def ingest(store, symbol, input_path, append=False):
+    """
+    读取并清理数据文件后保存到序列存储
+
+    参数:
+    store: SeriesStore
+    symbol: 代码
+    input_path: CSV或Parquet/Feather/Arrow文件路径，第一列为日期
+    append: True时追加到已有序列，否则整体替换
+
+    返回:
+    保存或追加的行数，数据无效时返回 None
+    """
+    from columnar import analysis_columns, read_table
+    from main import clean_data
+
+    df = read_table(input_path, columns=analysis_columns)
+    if len(df.columns) < 2:
+        print("错误: 数据文件必须至少包含两列：日期列和数值列")
+        return None
+    df = clean_data(df.set_index(df.columns[0]))
+    if df is None:
+        return None
+    if append:
+        return store.append(symbol, df)
+    return store.write(symbol, df)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地价格序列存储")
+    parser.add_argument(
+        "--store-dir", default=DEFAULT_STORE_DIR, help="序列存储目录")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = subparsers.add_parser("ingest", help="导入数据文件")
+    ingest_parser.add_argument("symbol", help="代码")
+    ingest_parser.add_argument("input_path", help="CSV或Parquet/Feather/Arrow文件路径")
+    ingest_parser.add_argument(
+        "--append", action="store_true", help="追加到已有序列，而不是整体替换")
+
+    subparsers.add_parser("list", help="列出已保存的序列")
+
+    args = parser.parse_args()
+    series_store = SeriesStore(args.store_dir)
+
+    if args.command == "ingest":
+        count = ingest(series_store, args.symbol, args.input_path, args.append)
+        if count is None:
+            raise SystemExit(1)
+        print(f"{args.symbol}: 已保存 {count} 行，共 "
+              f"{series_store.length(args.symbol)} 行")
+    else:
+        for name in series_store.symbols():
+            print(f"{name}\t{series_store.length(name)}")
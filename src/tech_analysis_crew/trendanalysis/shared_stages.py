@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+趋势分析公共阶段缓存
+敏感版和不敏感版分析共享排序、频率检测、ATR、极值点检测和区间最值索引的结果，
+同一份数据上运行两种分析时这些阶段只计算一次
+"""
+
+import numpy as np
+
+from extrema import find_local_extrema
+from indicators import frame_atr
+from range_index import RangeExtremumIndex
+
+
+class SharedStages:
+    """
+    同一数据框上多个分析器共享的中间结果
+
+    使用方法:
+    shared = SharedStages(df)
+    sensitive.analyze(shared.df, shared=shared)
+    insensitive.analyze(shared.df, shared=shared)
+    """
+
+    def __init__(self, df):
+        """
+        参数:
+        df: 以日期为索引的数据框，会在这里统一排序
+        """
+        self.df = df.sort_index()
+        self._data_info = None
+        self._atr = {}
+        self._extrema = {}
+        self._range_index = {}
+        self._has_nan = {}
+
+    def data_info(self, detect):
+        """
+        获取数据特征，首次调用时使用detect计算
+
+        参数:
+        detect: 检测函数，通常为 analyzer._detect_data_frequency
+        """
+        if self._data_info is None:
+            self._data_info = detect(self.df)
+        return self._data_info
+
+    def atr(self, price_col, period, method='sma'):
+        """获取指定价格列、周期和平滑方式的ATR"""
+        key = (price_col, int(period), method)
+        if key not in self._atr:
+            self._atr[key] = frame_atr(self.df, price_col, period, method)
+        return self._atr[key]
+
+    def extrema(self, price_col, order, method='sliding', strict=True):
+        """获取指定价格列和窗口的局部极值点 (max_idx, min_idx)"""
+        key = (price_col, int(order), method, strict)
+        if key not in self._extrema:
+            self._extrema[key] = find_local_extrema(
+                self.df[price_col].values, order, method, strict)
+        return self._extrema[key]
+
+    def range_index(self, price_col, skipna=True):
+        """
+        获取指定价格列的区间最值索引
+
+        价格列没有NaN时 skipna 不影响结果，两种方式共用同一个索引；
+        索引的稀疏表在查询量较大时才建立，见 RangeExtremumIndex
+        """
+        values = self.df[price_col].to_numpy(dtype=float)
+        if price_col not in self._has_nan:
+            self._has_nan[price_col] = bool(np.isnan(values).any())
+        has_nan = self._has_nan[price_col]
+        key = (price_col, skipna if has_nan else None)
+        if key not in self._range_index:
+            self._range_index[key] = RangeExtremumIndex(
+                values, skipna, has_nan=has_nan)
+        return self._range_index[key]
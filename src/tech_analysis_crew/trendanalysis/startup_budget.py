@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+分析入口的冷启动预算检查
+Web服务每次上传都会启动新的 main.py 进程，导入耗时直接计入响应时间。
+在全新的解释器中多次导入 main，取最短耗时与预算比较，并检查
+matplotlib、scipy 等只在绘图或特定算法中使用的模块没有在导入时被加载。
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+# 导入 main 的耗时预算（秒），主要是pandas本身的导入时间
+STARTUP_BUDGET = 1.0
+
+# 导入 main 时不应加载的模块
+DEFERRED_MODULES = ('matplotlib', 'scipy')
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+loaded = sorted({name.split('.')[0] for name in sys.modules})
+print(json.dumps({'elapsed': elapsed, 'modules': loaded}))
+"""
+
+
+def measure_startup(module='main', runs=5):
+    """
+    在新的解释器进程中导入模块并计时
+
+    参数:
+    module: 要导入的模块名
+    runs: 重复次数，取最短耗时以减少系统负载的影响
+
+    返回:
+    (最短导入耗时秒数, 导入后已加载的顶层模块名集合)
+    """
+    probe = _PROBE.replace('import main', f'import {module}')
+    best, modules = None, set()
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-c', probe], cwd=current_dir,
+            capture_output=True, text=True, check=True)
+        data = json.loads(result.stdout.strip().splitlines()[-1])
+        if best is None or data['elapsed'] < best:
+            best = data['elapsed']
+        modules = set(data['modules'])
+    return best, modules
+
+
+def check_startup(budget=STARTUP_BUDGET, runs=5):
+    """
+    检查导入 main 是否在预算之内
+
+    返回:
+    (是否通过, 问题说明列表)
+    """
+    elapsed, modules = measure_startup('main', runs)
+    problems = []
+    print(f"导入 main 耗时: {elapsed:.3f}s（预算 {budget:.3f}s）")
+    if elapsed > budget:
+        problems.append(f"导入耗时 {elapsed:.3f}s 超出预算 {budget:.3f}s")
+    for name in DEFERRED_MODULES:
+        if name in modules:
+            problems.append(f"导入 main 时加载了 {name}")
+    return not problems, problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="检查分析入口的冷启动耗时")
+    parser.add_argument(
+        "--budget", type=float, default=STARTUP_BUDGET, help="导入耗时预算（秒）")
+    parser.add_argument(
+        "--runs", type=int, default=5, help="重复测量次数，取最短耗时")
+
+    args = parser.parse_args()
+
+    ok, problems = check_startup(args.budget, args.runs)
+    for problem in problems:
+        print(f"错误: {problem}")
+    if not ok:
+        raise SystemExit(1)
+    print("冷启动检查通过")
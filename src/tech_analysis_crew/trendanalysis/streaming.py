@@ -0,0 +1,469 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+增量/流式趋势分析
+在已有分析结果的基础上追加新K线，只重新计算可能发生变化的尾部数据
+"""
+
+import bisect
+
+import numpy as np
+import pandas as pd
+
+from extrema import find_local_extrema
+from indicators import smooth_atr, true_range
+from segments import Segment, segments_to_frame
+
+
+class _GrowableArray:
+    """按容量倍增的一维数组，追加操作的均摊复杂度为O(1)"""
+
+    def __init__(self, dtype=float, capacity=1024):
+        self._data = np.empty(capacity, dtype=dtype)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def values(self):
+        """当前有效数据的视图（不复制）"""
+        return self._data[:self._size]
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=self._data.dtype)
+        required = self._size + len(values)
+        if required > len(self._data):
+            capacity = max(required, len(self._data) * 2)
+            data = np.empty(capacity, dtype=self._data.dtype)
+            data[:self._size] = self._data[:self._size]
+            self._data = data
+        self._data[self._size:required] = values
+        self._size = required
+
+    def truncate(self, size):
+        self._size = min(self._size, size)
+
+    def drop_front(self, count):
+        """丢弃前 count 个元素，剩余数据移动到缓冲区开头"""
+        count = min(self._size, count)
+        remaining = self._size - count
+        self._data[:remaining] = self._data[count:self._size]
+        self._size = remaining
+
+
+class StreamingTrendAnalyzer:
+    """
+    流式趋势分析器，包装敏感版或不敏感版 TrendAnalyzer
+
+    首次调用 fit 时执行完整分析，参数（order、ATR周期）根据当时的数据特征确定后
+    保持不变。之后每次 update 只会：
+    1. 为新K线追加TR和ATR；
+    2. 重新检测最后 order 根K线附近的swing点（更早的swing点不会再变化）；
+    3. 从检查点继续执行震荡合并和区间优化，只重新计算检查点之后的区间。
+
+    不会再变化的原始区间依次并入检查点：检查点保存震荡合并中尚可能继续
+    合并的最后一个区间，以及区间优化的结果栈。结果栈顶部 refine_window 个
+    区间之前的区间视为已确定，不会再被修改。
+    """
+
+    def __init__(self, analyzer, price_col='close', refine_window=5):
+        """
+        参数:
+        analyzer: TrendAnalyzer实例（敏感版或不敏感版）
+        price_col: 价格列名
+        refine_window: 每次更新时重新优化的尾部结果区间数量
+        """
+        self.analyzer = analyzer
+        self.price_col = price_col
+        self.refine_window = max(1, int(refine_window))
+
+        self._dates = _GrowableArray(dtype='int64')
+        self._close = _GrowableArray()
+        self._high = _GrowableArray()
+        self._low = _GrowableArray()
+        self._tr = _GrowableArray()
+        self._atr = _GrowableArray()
+        self._tz = None
+        self._unit = 'ns'
+
+        self._swing_idx = []     # 当前swing点位置
+        self._raw = []           # 检查点之后的原始区间（未合并），不会被合并过程修改
+        self._raw_start = []     # 原始区间起点位置，与 _raw 一一对应
+        self._seed = None        # 检查点处震荡合并的最后一个区间
+        self._stack = []         # 检查点处区间优化的结果栈（仅不敏感版）
+        self._final = []         # 已确定、尚未取出的结果区间
+        self._tail = []          # 检查点之后重新计算的结果区间
+        self._fitted = False
+
+    # ------------------------------------------------------------------
+    # 公共接口
+    # ------------------------------------------------------------------
+    def fit(self, df, data_info=None):
+        """
+        使用历史数据执行完整分析并初始化流式状态
+
+        参数:
+        df: 以日期为索引的数据框
+        data_info: 可选，预先确定的数据特征（格式同 _detect_data_frequency），
+                   分块分析时用于按整个文件而不是第一块数据确定参数
+
+        返回:
+        趋势数据框，与 analyzer.analyze(df) 的结果一致
+        """
+        df = df.sort_index()
+        analyzer = self.analyzer
+
+        if data_info is None:
+            data_info = analyzer._detect_data_frequency(df)
+        analyzer.actual_order = analyzer._adjust_swing_order(data_info)
+        analyzer.actual_atr_period = analyzer._adjust_atr_period(data_info)
+        print(f"流式分析参数: order={analyzer.actual_order}, "
+              f"ATR周期={analyzer.actual_atr_period}")
+
+        self.price_col = self._resolve_price_col(df)
+        self._tz = getattr(df.index, 'tz', None)
+        self._unit = getattr(df.index, 'unit', 'ns')
+
+        for buf in (self._dates, self._close, self._high, self._low,
+                    self._tr, self._atr):
+            buf.truncate(0)
+        self._append_bars(df)
+
+        self._atr.extend(smooth_atr(
+            self._tr.values, analyzer.actual_atr_period, analyzer.atr_method))
+
+        self._swing_idx = list(analyzer._find_swing_points(
+            self._close.values, order=analyzer.actual_order))
+        self._raw, self._raw_start = self._build_segments(self._swing_idx)
+        self._seed = None
+        self._stack = []
+        self._final = []
+        self._advance()
+        self._update_tail()
+        self._fitted = True
+        return self.trends
+
+    def update(self, new_bars):
+        """
+        追加新K线并增量更新趋势区间
+
+        参数:
+        new_bars: 以日期为索引的新数据，列与 fit 时一致。
+                  如果第一根K线的时间与最后一根已有K线相同，视为对该K线的更新。
+
+        返回:
+        更新后的完整趋势数据框
+        """
+        if not self._fitted:
+            return self.fit(new_bars)
+
+        new_bars = new_bars.sort_index()
+        if len(new_bars) == 0:
+            return self.trends
+
+        new_first = pd.Timestamp(new_bars.index[0])
+        if self._tz is not None and new_first.tz is None:
+            new_first = new_first.tz_localize(self._tz)
+        new_first = new_first.value
+        last = int(self._dates.values[-1])
+        if new_first < last:
+            raise ValueError("新数据的时间早于已有数据的最后一根K线，无法增量更新")
+
+        old_n = len(self._dates)
+        if new_first == last:
+            # 正在形成中的K线被更新，回退最后一根K线
+            old_n -= 1
+            for buf in (self._dates, self._close, self._high, self._low,
+                        self._tr, self._atr):
+                buf.truncate(old_n)
+
+        self._append_bars(new_bars)
+        atr_rebuilt = self._extend_atr(old_n)
+        first_changed = self._update_swing_points(old_n)
+        if atr_rebuilt:
+            # 预热期ATR整体变化，所有区间的分类都需要重新判断
+            first_changed = 0
+        self._update_segments(first_changed)
+        self._advance()
+        self._update_tail()
+        return self.trends
+
+    @property
+    def trends(self):
+        """当前的趋势数据框（调用 pop_finalized 后只包含尚未取出的区间）"""
+        return segments_to_frame(self._final + self._tail, self._index())
+
+    def pop_finalized(self):
+        """
+        取出之后的 update 不会再修改的结果区间，并释放它们占用的K线数据
+
+        已确定的区间在检查点前进时产生（见 _advance）。取出这些区间后，只保留
+        检查点状态、重新检测后续swing点（左右各order根K线及平台判断需要的
+        前一根K线）和ATR所需的K线。ATR至少保留 ATR周期+1 根K线，这样替换正在
+        形成的K线后剩余K线仍不少于ATR周期，不会回到预热期的整体重算。
+
+        返回:
+        已确定的趋势数据框，按时间顺序，不会与之后的结果重复
+        """
+        if not self._fitted or not self._final:
+            return segments_to_frame([], self._index())
+
+        order = int(self.analyzer.actual_order)
+        period = int(self.analyzer.actual_atr_period)
+        n = len(self._dates)
+
+        finalized = segments_to_frame(self._final, self._index())
+        self._final = []
+        starts = [n - 3 - 2 * order, n - 1 - period]
+        for segments in ([self._seed] if self._seed else [], self._stack,
+                         self._raw, self._tail):
+            if segments:
+                starts.append(segments[0].start_idx)
+        self._compact(min(starts))
+        return finalized
+
+    # ------------------------------------------------------------------
+    # 内部实现
+    # ------------------------------------------------------------------
+    def _resolve_price_col(self, df):
+        """确定价格列，规则与 TrendAnalyzer.analyze 相同"""
+        if self.price_col in df.columns:
+            return self.price_col
+        for col in ['value', 'price', 'close', 'adj_close', 'Close']:
+            if col in df.columns:
+                return col
+        print(f"警告: 未找到价格列，使用 '{df.columns[0]}' 列作为价格数据")
+        return df.columns[0]
+
+    def _index(self):
+        """由纳秒时间缓冲区构造日期索引，还原原始索引的时区和精度"""
+        index = pd.DatetimeIndex(self._dates.values.view('datetime64[ns]'))
+        if self._tz is not None:
+            index = index.tz_localize('UTC').tz_convert(self._tz)
+        return index.as_unit(self._unit)
+
+    def _append_bars(self, df):
+        """追加K线及其TR"""
+        index = pd.DatetimeIndex(df.index)
+        if self._tz is not None and index.tz is None:
+            index = index.tz_localize(self._tz)
+        close = df[self.price_col].to_numpy(dtype=float)
+        if 'high' in df.columns and 'low' in df.columns:
+            high = df['high'].to_numpy(dtype=float)
+            low = df['low'].to_numpy(dtype=float)
+        else:
+            high = low = close
+
+        prev_n = len(self._close)
+        # 与上一根K线衔接，保证TR计算与整段计算一致
+        if prev_n > 0:
+            tr = true_range(
+                np.concatenate(([self._high.values[-1]], high)),
+                np.concatenate(([self._low.values[-1]], low)),
+                np.concatenate(([self._close.values[-1]], close)))[1:]
+        else:
+            tr = true_range(high, low, close)
+
+        self._dates.extend(index.as_unit('ns').asi8)
+        self._close.extend(close)
+        self._high.extend(high)
+        self._low.extend(low)
+        self._tr.extend(tr)
+
+    def _compact(self, cut):
+        """丢弃位置 cut 之前的K线，所有保存的位置相应前移"""
+        if cut <= 0:
+            return
+        for buf in (self._dates, self._close, self._high, self._low,
+                    self._tr, self._atr):
+            buf.drop_front(cut)
+
+        r = bisect.bisect_left(self._raw_start, cut)
+        self._raw = self._raw[r:]
+        self._raw_start = [i - cut for i in self._raw_start[r:]]
+        self._swing_idx = [i - cut for i in self._swing_idx if i >= cut]
+        held = self._raw + self._stack + self._tail
+        if self._seed is not None:
+            held.append(self._seed)
+        # 同一个区间对象可能被多个列表引用，只移动一次
+        for segment in {id(s): s for s in held}.values():
+            segment.start_idx -= cut
+            segment.end_idx -= cut
+
+    def _extend_atr(self, old_n):
+        """
+        为新K线追加ATR，只有预热期内才重新计算全部ATR
+
+        返回:
+        是否重新计算了全部ATR
+        """
+        period = int(self.analyzer.actual_atr_period)
+        method = self.analyzer.atr_method
+        tr = self._tr.values
+        n = len(tr)
+
+        if old_n < period:
+            # 预热期的ATR由向后填充得到，数据量很小，直接整体重算
+            self._atr.truncate(0)
+            self._atr.extend(smooth_atr(tr, period, method))
+            return True
+
+        if method == 'sma':
+            tail = tr[old_n - period + 1:]
+            atr = pd.Series(tail).rolling(period).mean().values[period - 1:]
+        else:
+            alpha = 1.0 / period if method == 'wilder' else 2.0 / (period + 1)
+            atr = np.empty(n - old_n)
+            prev = self._atr.values[old_n - 1]
+            for i in range(old_n, n):
+                prev = (1 - alpha) * prev + alpha * tr[i]
+                atr[i - old_n] = prev
+        self._atr.extend(atr)
+        return False
+
+    def _update_swing_points(self, old_n):
+        """
+        重新检测尾部swing点
+
+        严格极值点只依赖左右各order根K线，所以位置小于 old_n - 1 - order 的
+        swing点在追加数据后不会改变，只需重新检测之后的部分。非严格模式下
+        平台只保留最左侧的点，还要看前一个点的比较结果，检测区间需要在左侧
+        多包含一根K线。
+
+        返回:
+        第一个可能发生变化的位置
+        """
+        analyzer = self.analyzer
+        order = int(analyzer.actual_order)
+        prices = self._close.values
+        n = len(prices)
+
+        first_changed = max(0, old_n - 1 - order)
+        start = max(0, first_changed - order - 1)
+
+        kept = [i for i in self._swing_idx if i < first_changed]
+        if old_n < order * 2 + 1:
+            # 已有数据太少时swing点由完整检测的特殊处理得到，与完整分析保持一致
+            self._swing_idx = list(analyzer._find_swing_points(
+                prices, order=order))
+            return 0
+
+        max_idx, min_idx = find_local_extrema(
+            prices[start:], order, analyzer.swing_method,
+            analyzer.strict_swing)
+        tail = np.unique(np.concatenate((max_idx, min_idx))) + start
+        tail = [int(i) for i in tail if i >= first_changed]
+
+        swing_idx = kept + tail
+        if not swing_idx or swing_idx[0] > 0:
+            swing_idx.insert(0, 0)
+        if swing_idx[-1] < n - 1:
+            swing_idx.append(n - 1)
+        self._swing_idx = swing_idx
+        return first_changed
+
+    def _build_segments(self, swing_idx):
+        """根据swing点构建原始区间，逻辑与 TrendAnalyzer.analyze 相同"""
+        analyzer = self.analyzer
+        prices = self._close.values
+        atr = self._atr.values
+        times = self._dates.values
+        segments = []
+        starts = []
+        for start_idx, end_idx in zip(swing_idx[:-1], swing_idx[1:]):
+            trend_type = analyzer._classify_segment(
+                prices[start_idx], prices[end_idx], atr[start_idx])
+            segments.append(Segment.from_positions(
+                prices, times, start_idx, end_idx, trend_type))
+            starts.append(int(start_idx))
+        return segments, starts
+
+    def _merge(self, raw):
+        """从检查点继续震荡合并，不修改输入；最后一个区间之后还可能继续合并"""
+        segments = [s.copy() for s in raw]
+        if self._seed is not None:
+            segments.insert(0, self._seed.copy())
+        return self.analyzer._merge_consolidation(segments, self._dates.values)
+
+    def _refine(self, merged):
+        """从检查点的结果栈继续执行区间优化的第一步，返回新的结果栈"""
+        stack = [s.copy() for s in self._stack]
+        if not stack:
+            if not merged:
+                return []
+            stack, merged = [merged[0]], merged[1:]
+        return self.analyzer._refine_pass(merged, self._dates.values, stack)
+
+    def _merge_short(self, stack, limit):
+        """
+        对结果栈执行区间优化的最后一步，只处理能在前 limit 个区间内完成判断的位置
+
+        返回:
+        (结果区间列表, 已处理的区间数量)
+        """
+        analyzer = self.analyzer
+        times = self._dates.values
+        result = []
+        i = 0
+        while i + 2 < limit:
+            if analyzer._is_short_consolidation(
+                    stack[i], stack[i + 1], stack[i + 2], times):
+                result.append(analyzer._merge_three(
+                    stack[i], stack[i + 1], stack[i + 2], times))
+                i += 3
+            else:
+                result.append(stack[i])
+                i += 1
+        return result, i
+
+    def _advance(self):
+        """
+        把不会再变化的原始区间并入检查点，并把已确定的结果区间移入 _final
+
+        最后一根K线可能被替换，起点在 n-2-order 之后的swing点可能变化，
+        在此之前结束的原始区间不会再被重建。
+        """
+        order = int(self.analyzer.actual_order)
+        period = int(self.analyzer.actual_atr_period)
+        n = len(self._dates)
+        if n - 1 < max(period, 2 * order + 1):
+            # 预热期的ATR和数据过少时的swing点可能整体重算
+            return
+        k = max(0, bisect.bisect_left(self._raw_start, n - 2 - order) - 1)
+        if k == 0:
+            return
+
+        merged = self._merge(self._raw[:k])
+        seed = merged.pop()
+        if hasattr(self.analyzer, '_refine_pass'):
+            stack = self._refine(merged)
+            # 栈顶的区间还可能被之后的区间合并或移除
+            limit = max(0, len(stack) - self.refine_window - 1)
+            final, consumed = self._merge_short(stack, limit)
+            self._stack = stack[consumed:]
+        else:
+            final = merged
+        self._seed = seed
+        self._raw = self._raw[k:]
+        self._raw_start = self._raw_start[k:]
+        self._final.extend(final)
+
+    def _update_tail(self):
+        """从检查点重新计算之后的结果区间"""
+        merged = self._merge(self._raw)
+        if hasattr(self.analyzer, '_refine_pass'):
+            stack = self._refine(merged)
+            result, consumed = self._merge_short(stack, len(stack))
+            merged = result + stack[consumed:]
+        self._tail = merged
+
+    def _update_segments(self, first_changed):
+        """重建检查点之后受影响的原始区间"""
+        # 第一个受影响的原始区间：起点在 first_changed 之前的最后一个区间
+        k = max(0, bisect.bisect_left(self._raw_start, first_changed) - 1)
+        stable_start = self._raw_start[k] if self._raw else 0
+        tail_swing = [i for i in self._swing_idx if i >= stable_start]
+        new_raw, new_starts = self._build_segments(tail_swing)
+        self._raw = self._raw[:k] + new_raw
+        self._raw_start = self._raw_start[:k] + new_starts
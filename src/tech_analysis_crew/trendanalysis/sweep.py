@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+趋势分析参数扫描
+对 atr_period / order / swing_threshold 网格批量评估区间统计：
+每个ATR周期和每个order的极值点只计算一次，所有阈值组合一次性向量化计算
+"""
+
+import copy
+import itertools
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from segments import DAY_NS, Segment, to_ns
+from shared_stages import SharedStages
+
+
+def _swing_points(n, extrema):
+    """由极值点构造swing点，规则与 TrendAnalyzer._find_swing_points 相同"""
+    max_idx, min_idx = extrema
+    swing = np.unique(np.concatenate((max_idx, min_idx)))
+    if len(swing) == 0:
+        return np.array([0, n - 1])
+    if swing[0] > 0:
+        swing = np.insert(swing, 0, 0)
+    if swing[-1] < n - 1:
+        swing = np.append(swing, n - 1)
+    return swing
+
+
+def _vectorized_stats(prices, times, atr, swing, thresholds):
+    """
+    对一组阈值同时计算敏感版（只合并相邻震荡区间）的区间统计
+
+    参数:
+    prices: 价格数组
+    times: 纳秒时间戳数组
+    atr: ATR数组
+    swing: swing点位置
+    thresholds: 阈值数组，形状 (m,)
+
+    返回:
+    每个阈值一行的统计字典列表
+    """
+    start, end = swing[:-1], swing[1:]
+    change = prices[end] - prices[start]
+    limit = atr[start][None, :] * thresholds[:, None]
+    up = change[None, :] > limit
+    down = change[None, :] < -limit
+    cons = ~(up | down)
+
+    k = len(swing)
+    seg_ns = (times[end] - times[start]).astype(float)
+    total_ns = float(times[swing[-1]] - times[swing[0]])
+
+    # 两个相邻震荡区间之间的边界会被合并掉
+    kept = np.ones((len(thresholds), k), dtype=bool)
+    kept[:, 1:-1] = ~(cons[:, :-1] & cons[:, 1:])
+
+    # 每个边界之后的下一个保留边界
+    idx = np.where(kept, np.arange(k)[None, :], k - 1)
+    next_kept = np.minimum.accumulate(idx[:, ::-1], axis=1)[:, ::-1]
+    bound_times = times[swing]
+    seg_start = kept[:, :-1]
+    days = (bound_times[next_kept[:, 1:]] - bound_times[None, :-1]) // DAY_NS
+
+    segments = seg_start.sum(axis=1)
+    merged_pairs = (cons[:, :-1] & cons[:, 1:]).sum(axis=1)
+    trending_ns = np.where(cons, 0.0, seg_ns[None, :]).sum(axis=1)
+
+    rows = []
+    for r, threshold in enumerate(thresholds):
+        rows.append({
+            'swing_threshold': float(threshold),
+            'segments': int(segments[r]),
+            'up': int(up[r].sum()),
+            'down': int(down[r].sum()),
+            'consolidation': int(cons[r].sum() - merged_pairs[r]),
+            'avg_duration': float(days[r][seg_start[r]].mean()),
+            'coverage': trending_ns[r] / total_ns if total_ns > 0 else 0.0,
+        })
+    return rows
+
+
+def _refined_stats(analyzer, prices, times, atr, swing, threshold):
+    """使用分析器自身的合并和优化逻辑计算单个阈值的区间统计（较慢）"""
+    # 在副本上设置阈值，不修改调用者的分析器
+    analyzer = copy.copy(analyzer)
+    analyzer.swing_threshold = threshold
+    trends = [
+        Segment.from_positions(
+            prices, times, start_idx, end_idx,
+            analyzer._classify_segment(
+                prices[start_idx], prices[end_idx], atr[start_idx]))
+        for start_idx, end_idx in zip(swing[:-1], swing[1:])
+    ]
+    trends = analyzer._merge_consolidation(trends, times)
+    refine = getattr(analyzer, '_refine_trends', None)
+    if refine is not None:
+        trends = refine(trends, times)
+
+    total = float(times[swing[-1]] - times[swing[0]])
+    types = [t.trend_type for t in trends]
+    trending = sum(
+        float(times[t.end_idx] - times[t.start_idx])
+        for t in trends if t.trend_type != 'consolidation')
+    return {
+        'swing_threshold': float(threshold),
+        'segments': len(trends),
+        'up': types.count('up'),
+        'down': types.count('down'),
+        'consolidation': types.count('consolidation'),
+        'avg_duration': float(np.mean([t.duration for t in trends])),
+        'coverage': trending / total if total > 0 else 0.0,
+    }
+
+
+def sweep_parameters(df, atr_periods=(14,), orders=(5,), thresholds=(0.618,),
+                     price_col='close', atr_method='sma',
+                     swing_method='sliding', refine_analyzer=None):
+    """
+    扫描参数网格并返回每组参数的区间统计
+
+    参数直接作为实际值使用，不经过 _adjust_swing_order/_adjust_atr_period
+    的自适应调整。
+
+    参数:
+    df: 以日期为索引的数据框
+    atr_periods: ATR周期列表
+    orders: swing点检测窗口列表
+    thresholds: 趋势判定阈值（ATR倍数）列表
+    price_col: 价格列名
+    atr_method: ATR平滑方式
+    swing_method: swing点检测方式
+    refine_analyzer: 可选的分析器实例（如不敏感版 TrendAnalyzer），
+                     提供时逐个组合调用其合并和区间优化逻辑；
+                     不提供时按敏感版规则对所有阈值向量化计算
+
+    返回:
+    整洁格式的DataFrame，列为 atr_period, order, swing_threshold, segments,
+    up, down, consolidation, avg_duration, coverage
+    其中 coverage 为上涨/下跌区间覆盖的时间占比
+    """
+    shared = SharedStages(df)
+    prices = shared.df[price_col].to_numpy(dtype=float)
+    times = to_ns(shared.df.index)
+    thresholds = np.asarray(thresholds, dtype=float)
+    n = len(prices)
+
+    rows = []
+    for period, order in itertools.product(atr_periods, orders):
+        atr = shared.atr(price_col, period, atr_method)
+        swing = _swing_points(
+            n, shared.extrema(price_col, order, swing_method))
+
+        if refine_analyzer is None:
+            stats = _vectorized_stats(prices, times, atr, swing, thresholds)
+        else:
+            stats = [
+                _refined_stats(refine_analyzer, prices, times, atr, swing, t)
+                for t in thresholds
+            ]
+
+        for row in stats:
+            rows.append({'atr_period': period, 'order': order, **row})
+
+    return pd.DataFrame(rows, columns=[
+        'atr_period', 'order', 'swing_threshold', 'segments', 'up', 'down',
+        'consolidation', 'avg_duration', 'coverage'
+    ])
+
+
+if __name__ == "__main__":
+    import contextlib
+    import os
+
+    from main import InsensitiveTrendAnalyzer, clean_data
+
+    parser = argparse.ArgumentParser(description="趋势分析参数扫描")
+    parser.add_argument("input_path", help="输入CSV文件的路径")
+    parser.add_argument(
+        "--atr-periods", type=int, nargs='+', default=[14], help="ATR周期列表")
+    parser.add_argument(
+        "--orders", type=int, nargs='+', default=[5], help="swing点窗口列表")
+    parser.add_argument(
+        "--thresholds", type=float, nargs='+', default=[0.618],
+        help="趋势判定阈值列表")
+    parser.add_argument(
+        "--insensitive", action='store_true',
+        help="使用不敏感版的区间优化逻辑（逐个组合计算，较慢）")
+    parser.add_argument("--output", help="结果CSV路径，默认打印到屏幕")
+
+    args = parser.parse_args()
+
+    data = pd.read_csv(args.input_path)
+    data = clean_data(data.set_index(data.columns[0]))
+    if data is None:
+        raise SystemExit(1)
+    col = 'close' if 'close' in data.columns else data.columns[0]
+
+    analyzer = InsensitiveTrendAnalyzer() if args.insensitive else None
+    with open(os.devnull, 'w') as devnull, \
+            contextlib.redirect_stdout(devnull):
+        result = sweep_parameters(
+            data, args.atr_periods, args.orders, args.thresholds,
+            price_col=col, refine_analyzer=analyzer)
+
+    if args.output:
+        result.to_csv(args.output, index=False, float_format='%.4f')
+        print(f"参数扫描结果已保存: {args.output}")
+    else:
+        print(result.to_string(index=False))
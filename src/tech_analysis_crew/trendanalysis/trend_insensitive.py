@@ -0,0 +1,723 @@
+import pandas as pd
+import numpy as np
+import os
+import datetime
+import pathlib
+from datetime import timedelta
+
+from extrema import find_local_extrema
+from plotting import pyplot, render_trends
+from indicators import frame_atr
+from segments import (
+    Segment, days_between, pct_change, segments_to_frame, to_ns
+)
+
+class TrendAnalyzer:
+    def __init__(self, atr_period=14, swing_threshold=0.618, order=5,
+                 atr_method='sma', swing_method='sliding', strict_swing=True):
+        """
+        参数:
+        atr_period: 基础ATR周期（会根据数据特征自动调整）
+        swing_threshold: 趋势判定阈值（ATR倍数）
+        order: 基础swing点检测窗口（会根据数据特征自动调整）
+        atr_method: ATR平滑方式，'sma'（默认）、'wilder' 或 'ema'
+        swing_method: swing点检测方式，'sliding'（O(n)滑动窗口，默认）
+                      或 'argrelextrema'，两者结果一致
+        strict_swing: 是否要求严格极值，False时可识别价格平台上的转折点
+        """
+        self.base_atr_period = atr_period
+        self.atr_method = atr_method
+        self.swing_method = swing_method
+        self.strict_swing = strict_swing
+        self.swing_threshold = swing_threshold
+        self.base_order = order
+        self.actual_atr_period = atr_period  # 实际使用的ATR周期
+        self.actual_order = order  # 实际使用的swing点窗口
+        
+    def _detect_data_frequency(self, df):
+        """自动检测数据频率和时间跨度"""
+        # 计算时间间隔中位数
+        time_diff = np.diff(df.index).astype('timedelta64[m]')
+        median_interval = np.median(time_diff)
+        
+        # 判断数据频率
+        if median_interval < 60:  # 分钟级数据
+            freq_type = 'minute'
+        elif 60 <= median_interval < 1440:  # 小时数据
+            freq_type = 'hourly'
+        else:  # 日级及以上数据
+            freq_type = 'daily'
+        
+        # 计算时间跨度（年）
+        timespan_years = (df.index[-1] - df.index[0]).days / 365
+        
+        return {
+            'freq_type': freq_type,
+            'timespan_years': timespan_years,
+            'data_points': len(df)
+        }
+    
+    def _calculate_atr(self, df, price_col='close'):
+        # 没有high/low列时使用价格列代替，TR与ATR均为向量化计算
+        return frame_atr(
+            df, price_col, self.actual_atr_period, self.atr_method)
+    
+    def _find_swing_points(self, prices, order=5, extrema=None):
+        """
+        找出价格序列中的swing点（局部最高点和最低点）
+        
+        注意：这个函数总是会包含第一个和最后一个数据点，
+        确保整个价格序列都被包含在分析中
+        
+        extrema: 可选，预先计算好的 (max_idx, min_idx)
+        """
+        # 安全检查：确保数据长度足够进行分析
+        if len(prices) < order * 2 + 1:
+            # 如果数据点太少，直接返回首尾点
+            return np.array([0, len(prices) - 1])
+            
+        try:
+            if extrema is None:
+                extrema = find_local_extrema(
+                    prices, order, self.swing_method, self.strict_swing)
+            max_idx, min_idx = extrema
+            
+            # 合并极值点并排序（非严格模式下同一点可能同时是极大和极小值）
+            swing_points = np.unique(np.concatenate((max_idx, min_idx)))
+            
+            # 确保包含第一个和最后一个点
+            if len(swing_points) == 0:
+                # 如果没有找到任何极值点，直接返回首尾点
+                return np.array([0, len(prices) - 1])
+                
+            if 0 not in swing_points:
+                swing_points = np.append([0], swing_points)
+            
+            if len(prices) - 1 not in swing_points:
+                swing_points = np.append(swing_points, [len(prices) - 1])
+            
+            return np.sort(swing_points)
+        except Exception as e:
+            print(f"警告: 寻找swing点时出错: {e}, 使用简化方法")
+            # 在出错的情况下，使用简化的方法
+            # 简单地取首、尾和中间的几个点
+            step = max(1, len(prices) // 10)
+            indices = list(range(0, len(prices), step))
+            if len(prices) - 1 not in indices:
+                indices.append(len(prices) - 1)
+            return np.array(indices)
+    
+    def _classify_segment(self, prev, curr, atr):
+        price_change = curr - prev
+        threshold = atr * self.swing_threshold
+        
+        if price_change > threshold:
+            return 'up'
+        elif price_change < -threshold:
+            return 'down'
+        else:
+            return 'consolidation'
+    
+    def analyze(self, df, price_col='close', shared=None):
+        """
+        参数:
+        df: 以日期为索引的数据框
+        price_col: 价格列名
+        shared: 可选的 SharedStages，与其他分析器共享排序、频率检测、
+                ATR和极值点检测的结果，此时df必须是 shared.df
+        """
+        if shared is None:
+            df = df.sort_index()
+        elif df is not shared.df:
+            # 共享的结果都基于 shared.df 计算，不能用于其他数据框
+            raise ValueError("指定 shared 时 df 必须是 shared.df")
+        
+        # 自动检测数据特征
+        if shared is None:
+            data_info = self._detect_data_frequency(df)
+        else:
+            data_info = shared.data_info(self._detect_data_frequency)
+        print(f"检测到数据特征: {data_info}")
+        
+        # 动态调整参数
+        adjusted_order = self._adjust_swing_order(data_info)
+        adjusted_atr = self._adjust_atr_period(data_info)
+        
+        print(f"自适应参数: order={adjusted_order}, ATR周期={adjusted_atr}")
+        
+        # 使用调整后的参数
+        self.actual_atr_period = adjusted_atr
+        self.actual_order = adjusted_order
+        
+        # 确保价格列存在
+        if price_col not in df.columns:
+            # 尝试其他可能的列名
+            possible_cols = ['value', 'price', 'close', 'adj_close', 'Close']
+            for col in possible_cols:
+                if col in df.columns:
+                    price_col = col
+                    break
+            else:
+                # 如果没有找到合适的列，使用第一列
+                price_col = df.columns[0]
+                print(f"警告: 未找到价格列，使用 '{price_col}' 列作为价格数据")
+        
+        prices = df[price_col].values
+        dates = df.index
+        
+        # 寻找关键转折点时使用调整后的order
+        extrema = None
+        if shared is not None:
+            extrema = shared.extrema(
+                price_col, self.actual_order, self.swing_method,
+                self.strict_swing)
+        swing_idx = self._find_swing_points(
+            prices, order=self.actual_order, extrema=extrema)
+        print(f"识别到的swing点数量: {len(swing_idx)}")
+        if len(swing_idx) > 0:
+            print(f"第一个swing点: {dates[swing_idx[0]]}，"
+                  f"最后一个swing点: {dates[swing_idx[-1]]}")
+        
+        # 使用调整后的ATR周期重新计算ATR
+        if shared is None:
+            atr = self._calculate_atr(df, price_col)
+        else:
+            atr = shared.atr(
+                price_col, self.actual_atr_period, self.atr_method)
+        
+        # 有共享的区间最值索引时，一次性查询所有区间的最低/最高价
+        lows = highs = None
+        if shared is not None and len(swing_idx) > 1:
+            range_index = shared.range_index(price_col, skipna=False)
+            lows = range_index.min(swing_idx[:-1], swing_idx[1:])
+            highs = range_index.max(swing_idx[:-1], swing_idx[1:])
+        
+        # 趋势分类，区间使用整数位置表示，最后再统一转换为DataFrame
+        times = to_ns(dates)
+        trends = []
+        for i in range(1, len(swing_idx)):
+            start_idx = swing_idx[i-1]
+            end_idx = swing_idx[i]
+            
+            trend_type = self._classify_segment(
+                prices[start_idx], prices[end_idx], 
+                atr[start_idx]
+            )
+            trends.append(Segment.from_positions(
+                prices, times, start_idx, end_idx, trend_type,
+                None if lows is None else lows[i-1],
+                None if highs is None else highs[i-1]))
+        
+        if not trends:
+            print("警告: 未识别到任何趋势区间")
+            # 如果没有识别到任何区间，创建一个覆盖整个数据集的基本区间
+            if len(prices) > 0:
+                start_price = prices[0]
+                end_price = prices[-1]
+                change = pct_change(start_price, end_price) if start_price != 0 else 0
+                
+                trend_type = 'consolidation'
+                if change > 0.1:
+                    trend_type = 'up'
+                elif change < -0.1:
+                    trend_type = 'down'
+
+                # 计算持续时间(天数)
+                if len(dates) > 1:
+                    duration = days_between(times, 0, len(dates) - 1)
+                else:
+                    duration = 0
+                
+                trends.append(Segment(
+                    0, len(prices) - 1, start_price, end_price,
+                    np.min(prices), np.max(prices), change, duration,
+                    trend_type
+                ))
+        
+        # 合并震荡区间
+        merged_trends = self._merge_consolidation(trends, times)
+        
+        # 减少碎片化并处理反弹/回调行情
+        refined_trends = self._refine_trends(merged_trends, times)
+        
+        # 检查是否包含所有数据
+        data_coverage = self._check_data_coverage(times, refined_trends)
+        if not data_coverage['complete']:
+            print(f"警告: 有{data_coverage['missing']}个数据点未被包含在趋势分析中")
+            if data_coverage['last_missing'] and refined_trends:
+                print("最近的数据没有被包含在趋势分析中，添加额外区间")
+                # 添加额外的区间来覆盖最近的数据
+                additional_trend = self._create_additional_segment(
+                    prices, times, refined_trends[-1], data_coverage
+                )
+                if additional_trend:
+                    refined_trends.append(additional_trend)
+        
+        return segments_to_frame(refined_trends, dates)
+    
+    def _check_data_coverage(self, times, trends):
+        """检查趋势是否覆盖了所有数据点"""
+        if not trends:
+            return {
+                'complete': False,
+                'first_missing': True,
+                'last_missing': True,
+                'missing': len(times)
+            }
+        
+        last_idx = len(times) - 1
+        
+        # 检查第一个趋势的开始位置
+        first_covered = trends[0].start_idx <= 0
+        
+        # 检查最后一个趋势的结束位置
+        last_covered = trends[-1].end_idx >= last_idx
+        
+        # 计算差距（天数）
+        missing_days = 0
+        if not last_covered:
+            missing_days = days_between(times, trends[-1].end_idx, last_idx)
+        
+        return {
+            'complete': first_covered and last_covered,
+            'first_missing': not first_covered,
+            'last_missing': not last_covered,
+            'missing': missing_days
+        }
+    
+    def _create_additional_segment(self, prices, times, last_trend, 
+                                  coverage_info):
+        """为未覆盖的最近数据创建额外区间"""
+        last_idx = last_trend.end_idx
+        end_idx = len(prices) - 1
+        # 最近数据段（包含上一区间的终点）
+        recent = prices[last_idx:end_idx + 1]
+        
+        # 如果差距很小，直接扩展最后一个区间
+        if days_between(times, last_idx, end_idx) <= 30:
+            extended_trend = last_trend.copy()
+            extended_trend.end_idx = end_idx
+            extended_trend.end_price = prices[end_idx]
+            
+            # 更新高点和低点
+            extended_trend.high_price = max(
+                extended_trend.high_price, recent.max())
+            extended_trend.low_price = min(
+                extended_trend.low_price, recent.min())
+            
+            # 更新百分比变化
+            extended_trend.pct_change = pct_change(
+                extended_trend.start_price, extended_trend.end_price)
+            
+            # 持续时间(天数)
+            extended_trend.duration = days_between(times, last_idx, end_idx)
+            
+            return extended_trend
+        else:
+            # 创建新区间，确定趋势类型
+            start_price = prices[last_idx]
+            end_price = prices[end_idx]
+            price_change = end_price - start_price
+            
+            # 简单趋势判断
+            if price_change > 0 and price_change / start_price > 0.03:
+                trend_type = 'up'
+            elif price_change < 0 and abs(price_change) / start_price > 0.03:
+                trend_type = 'down'
+            else:
+                trend_type = 'consolidation'
+            
+            return Segment(
+                last_idx, end_idx, start_price, end_price,
+                recent.min(), recent.max(),
+                pct_change(start_price, end_price),
+                days_between(times, last_idx, end_idx),
+                trend_type
+            )
+    
+    def _merge_consolidation(self, trends, times, max_gap=5):
+        """
+        合并相邻的震荡区间
+        
+        trends: Segment列表
+        times: 与区间位置对应的int64纳秒时间数组
+        """
+        if not trends:
+            return []
+            
+        merged = []
+        temp = None
+        
+        for t in trends:
+            if t.trend_type == 'consolidation':
+                if temp is None:
+                    temp = t
+                else:
+                    gap = days_between(times, temp.end_idx, t.start_idx)
+                    if gap <= max_gap:
+                        temp.end_idx = t.end_idx
+                        temp.low_price = min(temp.low_price, t.low_price)
+                        temp.high_price = max(temp.high_price, t.high_price)
+                        # 计算百分比变化并保留4位小数
+                        temp.pct_change = pct_change(
+                            temp.start_price, t.end_price)
+                        # 计算持续时间
+                        temp.duration = days_between(
+                            times, temp.start_idx, t.end_idx)
+                    else:
+                        merged.append(temp)
+                        temp = t
+            else:
+                if temp is not None:
+                    merged.append(temp)
+                    temp = None
+                merged.append(t)
+        
+        if temp is not None:
+            merged.append(temp)
+            
+        return merged
+    
+    def _refine_trends(self, trends, times):
+        """
+        减少区间碎片化并处理无效反弹/回调:
+        1. 如果区间没有突破前一区间的高点/低点，且价格变动幅度不超过20%，归类为震荡
+        2. 如果连续的上涨/下跌区间之间有反向的小区间，但整体突破，则合并为一个大区间
+        
+        trends: Segment列表
+        times: 与区间位置对应的int64纳秒时间数组
+        """
+        if len(trends) <= 1:
+            return trends
+            
+        refined = [trends[0]]  # 初始化结果列表，保留第一个区间
+        self._refine_pass(trends[1:], times, refined)
+        refined = self._merge_short_consolidation(refined, times)
+        
+        print(f"区间优化: 原始区间数量 {len(trends)}, 优化后区间数量 {len(refined)}")
+        return refined
+    
+    def _refine_pass(self, trends, times, refined):
+        """
+        区间优化的第一步（规则1和2），把 trends 逐个并入结果列表 refined
+        
+        refined 被原地修改，流式分析可以保存它并在之后继续处理新的区间
+        """
+        for current in trends:
+            previous = refined[-1]
+            
+            # 计算当前区间的价格变动百分比（绝对值）
+            price_change_pct = abs(current.pct_change) * 100
+            significant_move = price_change_pct >= 15  # 判断是否是显著变动（超过20%）
+            
+            # 如果当前区间是上涨
+            if current.trend_type == 'up':
+                # 检查是否突破前一区间的高点，如果没有突破且变动幅度不大，改为震荡
+                if current.high_price <= previous.high_price and not significant_move:
+                    # 未突破且幅度不大，改为震荡
+                    current.trend_type = 'consolidation'
+                # 检查是否是大趋势中的回调 - 安全检查列表长度   
+                elif (len(refined) >= 2 and 
+                      refined[-2].trend_type == 'up' and 
+                      previous.trend_type != 'up'):
+                    # 检查是否是大趋势中的回调
+                    if current.high_price > refined[-2].high_price:
+                        # 当前区间突破了前面上涨区间的高点，说明回调结束，继续上涨
+                        # 合并前面的回调区间到当前上涨区间
+                        current.start_idx = previous.start_idx
+                        current.start_price = previous.start_price
+                        current.low_price = min(
+                            current.low_price, previous.low_price)
+                        current.pct_change = pct_change(
+                            current.start_price, current.end_price)
+                        # 移除前一个区间（回调区间）
+                        refined.pop()
+            
+            # 如果当前区间是下跌
+            elif current.trend_type == 'down':
+                # 检查是否突破前一区间的低点，如果没有突破且变动幅度不大，改为震荡
+                if current.low_price >= previous.low_price and not significant_move:
+                    # 未突破且幅度不大，改为震荡
+                    current.trend_type = 'consolidation'
+                # 检查是否是大趋势中的反弹 - 安全检查列表长度    
+                elif (len(refined) >= 2 and 
+                      refined[-2].trend_type == 'down' and 
+                      previous.trend_type != 'down'):
+                    # 检查是否是大趋势中的反弹
+                    if current.low_price < refined[-2].low_price:
+                        # 当前区间突破了前面下跌区间的低点，说明反弹结束，继续下跌
+                        # 合并前面的反弹区间到当前下跌区间
+                        current.start_idx = previous.start_idx
+                        current.start_price = previous.start_price
+                        current.high_price = max(
+                            current.high_price, previous.high_price)
+                        current.pct_change = pct_change(
+                            current.start_price, current.end_price)
+                        # 移除前一个区间（反弹区间）
+                        refined.pop()
+            
+            # 合并相邻的相同类型区间
+            if refined and refined[-1].trend_type == current.trend_type:
+                previous = refined[-1]
+                previous.end_idx = current.end_idx
+                previous.end_price = current.end_price
+                previous.high_price = max(
+                    previous.high_price, current.high_price)
+                previous.low_price = min(
+                    previous.low_price, current.low_price)
+                # 计算持续时间
+                previous.duration = days_between(
+                    times, previous.start_idx, current.end_idx)
+                # 更新百分比变化
+                previous.pct_change = pct_change(
+                    previous.start_price, previous.end_price)
+            else:
+                refined.append(current)
+        
+        return refined
+    
+    def _is_short_consolidation(self, before, middle, after, times):
+        """middle 是否为夹在两个同类型区间之间、短于30天的震荡区间"""
+        return (before.trend_type == after.trend_type and
+                middle.trend_type == 'consolidation' and
+                days_between(times, middle.start_idx, middle.end_idx) < 30)
+    
+    def _merge_three(self, first, middle, last, times):
+        """将三个相邻区间合并为一个新区间，不修改输入"""
+        merged = first.copy()
+        merged.end_idx = last.end_idx
+        merged.end_price = last.end_price
+        merged.high_price = max(
+            first.high_price, middle.high_price, last.high_price)
+        merged.low_price = min(
+            first.low_price, middle.low_price, last.low_price)
+        merged.duration = days_between(
+            times, merged.start_idx, merged.end_idx)
+        merged.pct_change = pct_change(
+            merged.start_price, merged.end_price)
+        return merged
+    
+    def _merge_short_consolidation(self, refined, times):
+        """区间优化的最后一次检查：合并两个同类型区间之间的小震荡区间"""
+        result = []
+        i = 0
+        while i + 2 < len(refined):
+            if self._is_short_consolidation(
+                    refined[i], refined[i+1], refined[i+2], times):
+                # 将三个区间合并为一个
+                result.append(self._merge_three(
+                    refined[i], refined[i+1], refined[i+2], times))
+                i += 3
+            else:
+                result.append(refined[i])
+                i += 1
+        
+        # 确保所有剩余区间都被添加
+        result.extend(refined[i:])
+        return result
+    
+    def _adjust_swing_order(self, data_info):
+        """根据数据特征调整swing点检测窗口"""
+        base_order = self.base_order
+        
+        # 时间跨度调整
+        if data_info['timespan_years'] > 10:
+            base_order *= 3
+        elif data_info['timespan_years'] > 5:
+            base_order *= 2
+        elif data_info['timespan_years'] < 1:
+            base_order = max(3, base_order // 2)
+            
+        # 数据频率调整
+        if data_info['freq_type'] == 'minute':
+            return max(3, base_order // 2)
+        elif data_info['freq_type'] == 'hourly':
+            return base_order
+        else:  # daily
+            if data_info['timespan_years'] > 3:
+                return min(30, base_order * 2)
+            return base_order
+    
+    def _adjust_atr_period(self, data_info):
+        """根据数据特征调整ATR周期"""
+        base_atr = self.base_atr_period
+        
+        # 高频数据使用较短周期
+        if data_info['freq_type'] == 'minute':
+            return max(5, base_atr // 2)
+        elif data_info['freq_type'] == 'hourly':
+            return base_atr
+        else:  # daily
+            if data_info['timespan_years'] > 5:
+                return min(21, int(base_atr * 1.5))
+            return base_atr
+
+def plot_trends(df, trends, output_path, price_col='close', dpi=800,
+                preset=None):
+    """
+    绘制趋势分析图表
+    
+    参数:
+    df: 数据框
+    trends: 趋势数据框
+    output_path: 输出路径
+    price_col: 价格列名
+    dpi: 图像分辨率
+    preset: 可选，图表预设（'thumbnail'/'screen'/'print'）。指定时使用
+            plotting.render_trends 快速绘制，dpi参数不再使用
+    """
+    if preset is not None:
+        render_trends(df, trends, output_path, price_col, preset=preset)
+        return
+    
+    plt = pyplot()
+    from matplotlib.patches import Patch
+
+    plt.figure(figsize=(16, 10))
+    
+    # 绘制价格曲线
+    plt.plot(df.index, df[price_col], color='black', linewidth=1.5, 
+             label='Price')
+    
+    # 绘制趋势区域
+    color_map = {'up': 'red', 'down': 'green', 'consolidation': 'lightgrey'}
+    
+    for _, row in trends.iterrows():
+        start = row['start_date']
+        end = row['end_date']
+        trend_type = row['trend_type']
+        
+        plt.fill_betweenx(
+            y=[row['low_price'], row['high_price']],
+            x1=start, x2=end,
+            color=color_map[trend_type],
+            alpha=0.3
+        )
+    
+    # 添加图例
+    legend_elements = [
+        Patch(facecolor='red', alpha=0.3, label='Uptrend'),
+        Patch(facecolor='green', alpha=0.3, label='Downtrend'),
+        Patch(facecolor='lightgrey', alpha=0.3, label='Consolidation')
+    ]
+    plt.legend(handles=legend_elements, fontsize=12)
+    
+    plt.title('Price Trend Analysis', fontsize=16)
+    plt.xlabel('Date', fontsize=14)
+    plt.ylabel('Price', fontsize=14)
+    plt.grid(True, linestyle='--', alpha=0.7)
+    plt.tight_layout()
+    
+    # 保存高分辨率图片
+    plt.savefig(output_path, dpi=dpi)
+    plt.close()
+
+def main(input_path, output_dir='crewai-agent/src/tech_analysis_crew/trendanalysis/results'):
+    # 读取数据
+    df = pd.read_csv(input_path, parse_dates=['date'], index_col='date')
+    df = df.sort_index()
+    
+    # 打印列名，帮助调试
+    print(f"CSV文件中的列: {df.columns.tolist()}")
+    print(f"数据时间范围: {df.index[0]} 到 {df.index[-1]}")
+    
+    # 生成时间戳
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    
+    # 获取输入文件名（不含扩展名）
+    input_filename = pathlib.Path(input_path).stem
+    
+    # 创建固定的results输出目录
+    os.makedirs(output_dir, exist_ok=True)
+    
+    try:
+        # 运行分析
+        analyzer = TrendAnalyzer(atr_period=14, swing_threshold=0.618)
+        trends = analyzer.analyze(df)
+        
+        # 检查是否有结果
+        if trends.empty:
+            print("警告: 趋势分析未产生任何结果")
+            return output_dir
+        
+        # 保存CSV，使用时间戳+文件名格式
+        csv_filename = f"{timestamp}_{input_filename}-trend_analysis.csv"
+        csv_path = os.path.join(output_dir, csv_filename)
+        trends.to_csv(csv_path, index=False, float_format='%.4f')
+        
+        # 生成图表，使用时间戳+文件名格式
+        png_filename = f"{timestamp}_{input_filename}-trend_visualization.png"
+        plot_path = os.path.join(output_dir, png_filename)
+        
+        # 使用与analyze相同的价格列
+        price_col = 'close'
+        if price_col not in df.columns and len(df.columns) > 0:
+            price_col = df.columns[0]
+        plot_trends(df, trends, plot_path, price_col, dpi=800)
+        
+        print(f"分析完成! 结果保存到 {output_dir} 文件夹")
+        print(f"CSV文件: {csv_filename}")
+        print(f"图表文件: {png_filename}")
+    
+    except Exception as e:
+        print(f"分析过程中发生错误: {e}")
+        import traceback
+        traceback.print_exc()
+    
+    return output_dir
+
+def test_duration_calculation():
+    """
+    测试持续时间计算是否正确
+    """
+    # 创建测试数据
+    test_data = {
+        'date': pd.date_range(start='2018-01-01', end='2020-12-31', freq='D'),
+        'close': np.random.rand(731) * 1000 + 3000  # 随机价格数据
+    }
+    df = pd.DataFrame(test_data)
+    df.set_index('date', inplace=True)
+    
+    # 运行分析
+    analyzer = TrendAnalyzer()
+    trends = analyzer.analyze(df)
+    
+    # 验证每个区间的duration是否正确
+    for i, row in trends.iterrows():
+        start_date = pd.to_datetime(row['start_date'])
+        end_date = pd.to_datetime(row['end_date'])
+        expected_duration = (end_date - start_date).days
+        actual_duration = row['duration']
+        
+        # 打印比较结果
+        print(f"区间 {i+1}: {start_date} 到 {end_date}")
+        print(f"  预期持续时间: {expected_duration} 天")
+        print(f"  实际持续时间: {actual_duration} 天")
+        print(f"  差异: {abs(expected_duration - actual_duration)} 天")
+        print(f"  是否正确: {'是' if expected_duration == actual_duration else '否'}")
+        print()
+    
+    return trends
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--input', type=str, required=True, 
+        help='输入CSV文件路径'
+    )
+    parser.add_argument(
+        '--output', type=str, default='crewai-agent/src/tech_analysis_crew/trendanalysis/results', 
+        help='输出目录路径，默认为results'
+    )
+    parser.add_argument(
+        '--test', action='store_true',
+        help='运行测试以验证duration计算'
+    )
+    args = parser.parse_args()
+    
+    if args.test:
+        test_duration_calculation()
+    else:
+        main(args.input, args.output)
\ No newline at end of file
@@ -1,27 +1,34 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.signal import argrelextrema
-from matplotlib.patches import Patch
 import os
 import datetime
 import pathlib
 from datetime import timedelta
 
-# 设置matplotlib字体
-plt.rcParams['font.family'] = 'sans-serif'
-plt.rcParams['font.sans-serif'] = ['Arial', 'DejaVu Sans', 'Helvetica', 'Lucida Grande', 'Verdana']
-plt.rcParams['axes.unicode_minus'] = False
+from extrema import find_local_extrema
+from plotting import pyplot, render_trends
+from indicators import frame_atr
+from segments import (
+    Segment, days_between, pct_change, segments_to_frame, to_ns
+)
 
 class TrendAnalyzer:
-    def __init__(self, atr_period=14, swing_threshold=0.618, order=5):
+    def __init__(self, atr_period=14, swing_threshold=0.618, order=5,
+                 atr_method='sma', swing_method='sliding', strict_swing=True):
         """
         参数:
         atr_period: 基础ATR周期（会根据数据特征自动调整）
         swing_threshold: 趋势判定阈值（ATR倍数）
         order: 基础swing点检测窗口（会根据数据特征自动调整）
+        atr_method: ATR平滑方式，'sma'（默认）、'wilder' 或 'ema'
+        swing_method: swing点检测方式，'sliding'（O(n)滑动窗口，默认）
+                      或 'argrelextrema'，两者结果一致
+        strict_swing: 是否要求严格极值，False时可识别价格平台上的转折点
         """
         self.base_atr_period = atr_period
+        self.atr_method = atr_method
+        self.swing_method = swing_method
+        self.strict_swing = strict_swing
         self.swing_threshold = swing_threshold
         self.base_order = order
         self.actual_atr_period = atr_period  # 实际使用的ATR周期
@@ -51,35 +58,24 @@ class TrendAnalyzer:
         }
     
     def _calculate_atr(self, df, price_col='close'):
-        # 检查列是否存在，如果不存在则尝试其他可能的列名
-        if 'high' in df.columns and 'low' in df.columns:
-            high = df['high'].values
-            low = df['low'].values
-        else:
-            high = df[price_col].values
-            low = df[price_col].values
-        
-        close = df[price_col].values
-        
-        tr = np.zeros(len(df))
-        tr[0] = high[0] - low[0]
-        for i in range(1, len(df)):
-            hl = high[i] - low[i]
-            hc = abs(high[i] - close[i-1])
-            lc = abs(low[i] - close[i-1])
-            tr[i] = max(hl, hc, lc)
-            
-        atr = pd.Series(tr).rolling(self.actual_atr_period).mean().bfill().values
-        return atr
+        # 没有high/low列时使用价格列代替，TR与ATR均为向量化计算
+        return frame_atr(
+            df, price_col, self.actual_atr_period, self.atr_method)
     
-    def _find_swing_points(self, prices, order=5):
-        """寻找价格序列中的关键转折点"""
+    def _find_swing_points(self, prices, order=5, extrema=None):
+        """
+        寻找价格序列中的关键转折点
+        
+        extrema: 可选，预先计算好的 (max_idx, min_idx)
+        """
         # 寻找局部极大值和极小值点
-        max_idx = argrelextrema(prices, np.greater, order=order)[0]
-        min_idx = argrelextrema(prices, np.less, order=order)[0]
+        if extrema is None:
+            extrema = find_local_extrema(
+                prices, order, self.swing_method, self.strict_swing)
+        max_idx, min_idx = extrema
         
-        # 合并所有极值点
-        swing_points = np.sort(np.concatenate((max_idx, min_idx)))
+        # 合并所有极值点（非严格模式下同一点可能同时是极大和极小值）
+        swing_points = np.unique(np.concatenate((max_idx, min_idx)))
         
         # 如果没有找到任何极值点，至少使用起点和终点
         if len(swing_points) == 0:
@@ -106,11 +102,25 @@ class TrendAnalyzer:
         else:
             return 'consolidation'
     
-    def analyze(self, df, price_col='close'):
-        df = df.sort_index()
+    def analyze(self, df, price_col='close', shared=None):
+        """
+        参数:
+        df: 以日期为索引的数据框
+        price_col: 价格列名
+        shared: 可选的 SharedStages，与其他分析器共享排序、频率检测、
+                ATR和极值点检测的结果，此时df必须是 shared.df
+        """
+        if shared is None:
+            df = df.sort_index()
+        elif df is not shared.df:
+            # 共享的结果都基于 shared.df 计算，不能用于其他数据框
+            raise ValueError("指定 shared 时 df 必须是 shared.df")
         
         # 自动检测数据特征
-        data_info = self._detect_data_frequency(df)
+        if shared is None:
+            data_info = self._detect_data_frequency(df)
+        else:
+            data_info = shared.data_info(self._detect_data_frequency)
         print(f"检测到数据特征: {data_info}")
         
         # 动态调整参数
@@ -140,62 +150,50 @@ class TrendAnalyzer:
         dates = df.index
         
         # 寻找关键转折点时使用调整后的order
-        swing_idx = self._find_swing_points(prices, order=self.actual_order)
+        extrema = None
+        if shared is not None:
+            extrema = shared.extrema(
+                price_col, self.actual_order, self.swing_method,
+                self.strict_swing)
+        swing_idx = self._find_swing_points(
+            prices, order=self.actual_order, extrema=extrema)
         
         # 使用调整后的ATR周期重新计算ATR
-        atr = self._calculate_atr(df, price_col)
+        if shared is None:
+            atr = self._calculate_atr(df, price_col)
+        else:
+            atr = shared.atr(
+                price_col, self.actual_atr_period, self.atr_method)
         
-        # 趋势分类
+        # 有共享的区间最值索引时，一次性查询所有区间的最低/最高价
+        lows = highs = None
+        if shared is not None and len(swing_idx) > 1:
+            range_index = shared.range_index(price_col, skipna=False)
+            lows = range_index.min(swing_idx[:-1], swing_idx[1:])
+            highs = range_index.max(swing_idx[:-1], swing_idx[1:])
+        
+        # 趋势分类，区间使用整数位置表示，最后再统一转换为DataFrame
+        times = to_ns(dates)
         trends = []
         for i in range(1, len(swing_idx)):
             start_idx = swing_idx[i-1]
             end_idx = swing_idx[i]
             
-            segment = prices[start_idx:end_idx+1]
             trend_type = self._classify_segment(
                 prices[start_idx], prices[end_idx], 
                 atr[start_idx]
             )
-            
-            # 计算百分比变化并保留4位小数
-            price_change = prices[end_idx] - prices[start_idx]
-            pct_change = round(
-                price_change / max(abs(prices[start_idx]), 1e-10), 
-                4
-            )
-            
-            # 计算持续时间(天数)
-            if isinstance(dates[start_idx], (datetime.datetime, datetime.date)):
-                duration = (dates[end_idx] - dates[start_idx]).days
-            else:
-                # 如果dates不是日期类型，尝试转换
-                try:
-                    start_date = pd.to_datetime(dates[start_idx])
-                    end_date = pd.to_datetime(dates[end_idx])
-                    duration = (end_date - start_date).days
-                except:
-                    # 如果无法转换为日期，则使用索引差作为持续时间
-                    duration = end_idx - start_idx
-            
-            trends.append({
-                'start_date': dates[start_idx],
-                'end_date': dates[end_idx],
-                'start_price': prices[start_idx],
-                'end_price': prices[end_idx],
-                'low_price': np.min(segment),
-                'high_price': np.max(segment),
-                'pct_change': pct_change,
-                'duration': duration,
-                'trend_type': trend_type
-            })
+            trends.append(Segment.from_positions(
+                prices, times, start_idx, end_idx, trend_type,
+                None if lows is None else lows[i-1],
+                None if highs is None else highs[i-1]))
         
         # 合并震荡区间
-        merged_trends = self._merge_consolidation(trends)
+        merged_trends = self._merge_consolidation(trends, times)
         
         # 确保最后一段时间被处理，检查最后一个趋势的结束时间
         if len(merged_trends) > 0:
-            last_trend = merged_trends[-1]
-            last_date_idx = np.where(dates == last_trend['end_date'])[0][0]
+            last_date_idx = merged_trends[-1].end_idx
             
             # 如果最后一个趋势没有覆盖到最后的数据点，添加一个新的趋势
             if last_date_idx < len(dates) - 1:
@@ -203,84 +201,40 @@ class TrendAnalyzer:
                 start_idx = last_date_idx + 1
                 end_idx = len(dates) - 1
                 
-                segment = prices[start_idx:end_idx+1]
                 trend_type = self._classify_segment(
                     prices[start_idx], prices[end_idx], 
                     atr[start_idx] if start_idx < len(atr) else atr[-1]
                 )
-                
-                # 使用价格变动与起始价格绝对值的比值来计算百分比变化
-                price_change = prices[end_idx] - prices[start_idx]
-                pct_change = round(
-                    price_change / max(abs(prices[start_idx]), 1e-10), 
-                    4
-                )
-                
-                # 计算持续时间(天数)
-                if isinstance(dates[start_idx], (datetime.datetime, datetime.date)):
-                    duration = (dates[end_idx] - dates[start_idx]).days
-                else:
-                    # 如果dates不是日期类型，尝试转换
-                    try:
-                        start_date = pd.to_datetime(dates[start_idx])
-                        end_date = pd.to_datetime(dates[end_idx])
-                        duration = (end_date - start_date).days
-                    except:
-                        # 如果无法转换为日期，则使用索引差作为持续时间
-                        duration = end_idx - start_idx
-                
-                merged_trends.append({
-                    'start_date': dates[start_idx],
-                    'end_date': dates[end_idx],
-                    'start_price': prices[start_idx],
-                    'end_price': prices[end_idx],
-                    'low_price': np.min(segment),
-                    'high_price': np.max(segment),
-                    'pct_change': pct_change,
-                    'duration': duration,
-                    'trend_type': trend_type
-                })
+                merged_trends.append(Segment.from_positions(
+                    prices, times, start_idx, end_idx, trend_type))
         
-        return pd.DataFrame(merged_trends)
+        return segments_to_frame(merged_trends, dates)
     
-    def _merge_consolidation(self, trends, max_gap=5):
+    def _merge_consolidation(self, trends, times, max_gap=5):
+        """
+        合并相邻的震荡区间
+        
+        trends: Segment列表
+        times: 与区间位置对应的int64纳秒时间数组
+        """
         merged = []
         temp = None
         
         for t in trends:
-            if t['trend_type'] == 'consolidation':
+            if t.trend_type == 'consolidation':
                 if temp is None:
                     temp = t
                 else:
-                    gap = (t['start_date'] - temp['end_date']).days
+                    gap = days_between(times, temp.end_idx, t.start_idx)
                     if gap <= max_gap:
-                        temp['end_date'] = t['end_date']
-                        temp['low_price'] = min(
-                            temp['low_price'], t['low_price']
-                        )
-                        temp['high_price'] = max(
-                            temp['high_price'], t['high_price']
-                        )
+                        temp.end_idx = t.end_idx
+                        temp.low_price = min(temp.low_price, t.low_price)
+                        temp.high_price = max(temp.high_price, t.high_price)
                         # 使用价格变动与起始价格绝对值的比值来计算百分比变化
-                        price_change = t['end_price'] - temp['start_price']
-                        # 计算持续时间(天数)
-                        if isinstance(temp['start_date'], (datetime.datetime, datetime.date)) and isinstance(t['end_date'], (datetime.datetime, datetime.date)):
-                            duration = (t['end_date'] - temp['start_date']).days
-                        else:
-                            # 尝试转换为日期
-                            try:
-                                start_date = pd.to_datetime(temp['start_date'])
-                                end_date = pd.to_datetime(t['end_date'])
-                                duration = (end_date - start_date).days
-                            except:
-                                # 如果无法转换，则保留原有duration或设为None
-                                duration = t.get('duration', None)
-
-                        temp['pct_change'] = round(
-                            price_change / max(abs(temp['start_price']), 1e-10),
-                            4
-                        )
-                        temp['duration'] = duration
+                        temp.pct_change = pct_change(
+                            temp.start_price, t.end_price)
+                        temp.duration = days_between(
+                            times, temp.start_idx, t.end_idx)
                     else:
                         merged.append(temp)
                         temp = t
@@ -331,7 +285,8 @@ class TrendAnalyzer:
                 return min(21, base_atr * 1.5)
             return base_atr
 
-def plot_trends(df, trends, output_path, price_col='close', dpi=800):
+def plot_trends(df, trends, output_path, price_col='close', dpi=800,
+                preset=None):
     """
     绘制趋势分析图表
     
@@ -341,7 +296,16 @@ def plot_trends(df, trends, output_path, price_col='close', dpi=800):
     output_path: 输出路径
     price_col: 价格列名
     dpi: 图像分辨率
+    preset: 可选，图表预设（'thumbnail'/'screen'/'print'）。指定时使用
+            plotting.render_trends 快速绘制，dpi参数不再使用
     """
+    if preset is not None:
+        render_trends(df, trends, output_path, price_col, preset=preset)
+        return
+    
+    plt = pyplot()
+    from matplotlib.patches import Patch
+
     plt.figure(figsize=(16, 10))
     
     # 绘制价格曲线
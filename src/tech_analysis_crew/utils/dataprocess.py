@@ -3,6 +3,7 @@
 """
 
 import os
+import sys
 import json
 import pandas as pd
 import uuid
@@ -13,6 +14,14 @@ from typing import Dict, List, Any, Optional
 from datetime import datetime
 
 
+# 列式文件的识别和读取与趋势分析共用 trendanalysis/columnar.py
+trend_analysis_dir = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'trendanalysis')
+if trend_analysis_dir not in sys.path:
+    sys.path.append(trend_analysis_dir)
+from columnar import columnar_format, read_columnar  # noqa: E402
+
+
 class DataProcessingTool:
     """数据处理工具类，包装DataProcessor的方法为CrewAI工具"""
     
@@ -41,12 +50,30 @@ class DataProcessor:
         return str(uuid.uuid4())[:8]
     
     @staticmethod
-    def csv_to_json(file_path: str) -> List[Dict[str, Any]]:
+    def read_table(file_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
         """
-        将CSV文件转换为JSON格式
+        读取CSV或列式文件（Parquet/Feather/Arrow IPC）
+        
+        Args:
+            file_path: 文件路径，按扩展名识别格式
+            columns: 只读取这些列，None 表示全部列
+            
+        Returns:
+            DataFrame
+        """
+        if columnar_format(file_path) is None:
+            return pd.read_csv(file_path, usecols=columns)
+        # Arrow文件同时支持IPC文件格式和流格式，以索引保存的日期列恢复为普通列
+        return read_columnar(file_path, columns)
+    
+    @staticmethod
+    def csv_to_json(file_path: str, columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        将CSV文件转换为JSON格式，也支持Parquet/Feather/Arrow文件
         
         Args:
             file_path: CSV文件路径
+            columns: 只转换这些列（如日期列和价格列），None 表示全部列
             
         Returns:
             包含字典的列表，每个字典对应CSV的一行
@@ -55,8 +82,12 @@ class DataProcessor:
             raise FileNotFoundError(f"文件不存在: {file_path}")
             
         try:
-            # 读取CSV文件
-            df = pd.read_csv(file_path)
+            # 读取数据文件
+            df = DataProcessor.read_table(file_path, columns)
+            
+            # 列式文件中的日期列转换为字符串，便于JSON序列化
+            for col in df.select_dtypes(include=['datetime', 'datetimetz']).columns:
+                df[col] = df[col].astype(str).where(df[col].notna(), None)
             
             # 处理缺失值
             df = df.fillna("")
@@ -7,6 +7,7 @@ let activeTab = 'sensitive'; // 活动结果标签页
 let dataReadyForAnalysis = false;  // 跟踪数据是否已准备好进行分析
 let savedProcessedFilePath = ''; // 添加一个全局变量存储已保存的文件路径
 let checkOutputInterval = null; // 定时检查输出的定时器
+let trendCharts = [];           // 当前结果中的交互趋势图
 
 // DOM加载完成后初始化
 document.addEventListener('DOMContentLoaded', function() {
@@ -798,7 +799,8 @@ function displayAnalysisResults(results) {
             <div class="col-md-12">
                 <h4>趋势可视化</h4>
                 <div class="image-container">
-                    ${sensImgPath ? `<img src="${sensImgPath}" class="img-fluid result-image" alt="敏感版趋势图">` : 
+                    ${results.chart_data ? trendChartHtml('sensitive') :
+                    sensImgPath ? `<img src="${sensImgPath}" class="img-fluid result-image" alt="敏感版趋势图">` : 
                     '<div class="alert alert-warning">图片未能生成</div>'}
                 </div>
                 <div class="row mt-2">
@@ -835,7 +837,8 @@ function displayAnalysisResults(results) {
             <div class="col-md-12">
                 <h4>趋势可视化</h4>
                 <div class="image-container">
-                    ${insensImgPath ? `<img src="${insensImgPath}" class="img-fluid result-image" alt="不敏感版趋势图">` : 
+                    ${results.chart_data ? trendChartHtml('insensitive') :
+                    insensImgPath ? `<img src="${insensImgPath}" class="img-fluid result-image" alt="不敏感版趋势图">` : 
                     '<div class="alert alert-warning">图片未能生成</div>'}
                 </div>
                 <div class="row mt-2">
@@ -908,10 +911,270 @@ function displayAnalysisResults(results) {
         });
     });
 
+    // 加载交互趋势图的数据
+    trendCharts = [];
+    if (results.chart_data) {
+        initTrendCharts(results.chart_data, results.series);
+    }
+
     // 监听标签页切换
     document.getElementById('resultTabs').addEventListener('shown.bs.tab', function (event) {
         activeTab = event.target.id.split('-')[0];
+        // 隐藏标签页中的画布没有尺寸，显示后重新绘制
+        trendCharts.forEach(chart => chart.draw());
+    });
+}
+
+// 交互趋势图 - 价格曲线和趋势区间在浏览器中绘制，缩放和平移时按可见范围请求降采样数据；
+// 序列已保存到序列存储时从价格金字塔请求每个像素的最高最低价
+const TREND_CHART_COLORS = ['rgba(255, 0, 0, 0.3)', 'rgba(0, 128, 0, 0.3)', 'rgba(211, 211, 211, 0.3)'];
+const TREND_CHART_LABELS = ['Uptrend', 'Downtrend', 'Consolidation'];
+const TREND_CHART_PADDING = { left: 70, right: 20, top: 20, bottom: 35 };
+
+window.addEventListener('resize', () => trendCharts.forEach(chart => chart.draw()));
+
+function trendChartHtml(version) {
+    return `<div class="trend-chart-wrapper">
+        <canvas class="trend-chart" data-version="${version}"></canvas>
+        <div class="trend-chart-hint">滚轮缩放，拖动平移，双击还原</div>
+    </div>`;
+}
+
+function chartDataUrl(chartDataName, params = '') {
+    return `/api/chart-data/${encodeURIComponent(chartDataName)}${params}`;
+}
+
+function initTrendCharts(chartDataName, seriesSymbol) {
+    fetch(chartDataUrl(chartDataName))
+    .then(response => {
+        if (!response.ok) {
+            throw new Error(`服务器响应错误: ${response.status}`);
+        }
+        return response.json();
+    })
+    .then(overview => {
+        document.querySelectorAll('#analysisResults canvas.trend-chart').forEach(canvas => {
+            const chart = createTrendChart(canvas, chartDataName, overview, canvas.dataset.version, seriesSymbol);
+            trendCharts.push(chart);
+            chart.draw();
+        });
+    })
+    .catch(error => {
+        console.error('加载图表数据错误:', error);
+        document.querySelectorAll('#analysisResults .trend-chart-wrapper').forEach(wrapper => {
+            wrapper.innerHTML = '<div class="alert alert-warning">图表数据加载失败</div>';
+        });
+    });
+}
+
+function formatChartTime(time, span) {
+    const text = new Date(time).toISOString();
+    // 可见范围小于3天时显示到分钟
+    return span < 3 * 86400000 ? text.slice(0, 16).replace('T', ' ') : text.slice(0, 10);
+}
+
+function createTrendChart(canvas, chartDataName, overview, version, seriesSymbol) {
+    const bands = overview.bands[version];
+    const fullStart = overview.start;
+    const fullEnd = overview.end;
+    // 最多放大到可见范围内约20个原始数据点
+    const minSpan = Math.max((fullEnd - fullStart) / Math.max(overview.length, 1) * 20, 1);
+    const state = { start: fullStart, end: fullEnd, series: overview.series, requestId: 0, timer: null, drag: null };
+    const pad = TREND_CHART_PADDING;
+
+    function plotWidth() {
+        return canvas.clientWidth - pad.left - pad.right;
+    }
+
+    function draw() {
+        const width = canvas.clientWidth;
+        const height = canvas.clientHeight;
+        if (!width || !height || fullStart === null) {
+            return;
+        }
+        const ratio = window.devicePixelRatio || 1;
+        canvas.width = width * ratio;
+        canvas.height = height * ratio;
+        const ctx = canvas.getContext('2d');
+        ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+        ctx.clearRect(0, 0, width, height);
+
+        const plotW = width - pad.left - pad.right;
+        const plotH = height - pad.top - pad.bottom;
+        const span = Math.max(state.end - state.start, 1);
+        const times = state.series.t;
+        // 金字塔数据每个桶有最高最低价，降采样数据只有一个价格
+        const lows = state.series.min || state.series.v;
+        const highs = state.series.max || state.series.v;
+
+        // 纵轴范围取可见的价格和趋势区间
+        let low = Infinity;
+        let high = -Infinity;
+        for (let i = 0; i < times.length; i++) {
+            if (times[i] >= state.start && times[i] <= state.end && lows[i] !== null) {
+                low = Math.min(low, lows[i]);
+                high = Math.max(high, highs[i]);
+            }
+        }
+        for (let i = 0; i < bands.start.length; i++) {
+            if (bands.end[i] >= state.start && bands.start[i] <= state.end) {
+                low = Math.min(low, bands.low[i]);
+                high = Math.max(high, bands.high[i]);
+            }
+        }
+        if (!isFinite(low)) {
+            low = 0;
+            high = 1;
+        }
+        const margin = (high - low) * 0.05 || 1;
+        low -= margin;
+        high += margin;
+
+        const x = time => pad.left + (time - state.start) / span * plotW;
+        const y = value => pad.top + (high - value) / (high - low) * plotH;
+
+        ctx.save();
+        ctx.beginPath();
+        ctx.rect(pad.left, pad.top, plotW, plotH);
+        ctx.clip();
+
+        // 趋势区间
+        for (let i = 0; i < bands.start.length; i++) {
+            if (bands.end[i] < state.start || bands.start[i] > state.end) {
+                continue;
+            }
+            ctx.fillStyle = TREND_CHART_COLORS[bands.type[i]];
+            ctx.fillRect(x(bands.start[i]), y(bands.high[i]),
+                x(bands.end[i]) - x(bands.start[i]), y(bands.low[i]) - y(bands.high[i]));
+        }
+
+        // 价格曲线
+        ctx.strokeStyle = 'black';
+        ctx.lineWidth = 1.5;
+        ctx.beginPath();
+        for (let i = 0; i < times.length; i++) {
+            if (lows[i] === null) {
+                continue;
+            }
+            const px = x(times[i]);
+            if (state.series.min) {
+                // 每个桶画一条从首价经最低、最高价到末价的竖线，相邻桶首尾相连
+                ctx.lineTo(px, y(state.series.first[i]));
+                ctx.lineTo(px, y(lows[i]));
+                ctx.lineTo(px, y(highs[i]));
+                ctx.lineTo(px, y(state.series.last[i]));
+            } else {
+                ctx.lineTo(px, y(lows[i]));
+            }
+        }
+        ctx.stroke();
+        ctx.restore();
+
+        // 坐标轴和刻度
+        ctx.strokeStyle = '#999';
+        ctx.lineWidth = 1;
+        ctx.strokeRect(pad.left, pad.top, plotW, plotH);
+        ctx.fillStyle = '#333';
+        ctx.font = '12px sans-serif';
+        ctx.textAlign = 'right';
+        ctx.textBaseline = 'middle';
+        for (let i = 0; i <= 5; i++) {
+            const value = low + (high - low) * i / 5;
+            ctx.fillText(value.toFixed(2), pad.left - 6, y(value));
+        }
+        ctx.textAlign = 'center';
+        ctx.textBaseline = 'top';
+        for (let i = 0; i <= 5; i++) {
+            const time = state.start + span * i / 5;
+            ctx.fillText(formatChartTime(time, span), x(time), pad.top + plotH + 8);
+        }
+
+        // 图例
+        ctx.textAlign = 'left';
+        ctx.textBaseline = 'middle';
+        TREND_CHART_LABELS.forEach((label, i) => {
+            const top = pad.top + 10 + i * 18;
+            ctx.fillStyle = TREND_CHART_COLORS[i];
+            ctx.fillRect(pad.left + 10, top - 6, 24, 12);
+            ctx.fillStyle = '#333';
+            ctx.fillText(label, pad.left + 40, top);
+        });
+    }
+
+    // 可见范围变化后稍作等待再请求数据，只使用最后一次请求的结果
+    function requestWindow() {
+        clearTimeout(state.timer);
+        state.timer = setTimeout(() => {
+            const requestId = ++state.requestId;
+            const points = Math.max(Math.round(plotWidth()), 100);
+            const range = `start=${Math.floor(state.start)}&end=${Math.ceil(state.end)}`;
+            const url = seriesSymbol ?
+                `/api/series/${encodeURIComponent(seriesSymbol)}/window?${range}&width=${points}` :
+                chartDataUrl(chartDataName, `?${range}&points=${points}`);
+            fetch(url)
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`服务器响应错误: ${response.status}`);
+                }
+                return response.json();
+            })
+            .then(data => {
+                if (requestId === state.requestId) {
+                    state.series = seriesSymbol ?
+                        { t: data.start, first: data.first, last: data.last, min: data.min, max: data.max } :
+                        data.series;
+                    draw();
+                }
+            })
+            .catch(error => console.error('加载图表区间错误:', error));
+        }, 150);
+    }
+
+    function setRange(start, end) {
+        const span = Math.min(Math.max(end - start, minSpan), fullEnd - fullStart);
+        state.start = Math.min(Math.max(start, fullStart), fullEnd - span);
+        state.end = state.start + span;
+        draw();
+        requestWindow();
+    }
+
+    canvas.addEventListener('wheel', function(e) {
+        e.preventDefault();
+        const rect = canvas.getBoundingClientRect();
+        const fraction = Math.min(Math.max((e.clientX - rect.left - pad.left) / plotWidth(), 0), 1);
+        const anchor = state.start + (state.end - state.start) * fraction;
+        const scale = e.deltaY < 0 ? 0.8 : 1.25;
+        setRange(anchor - (anchor - state.start) * scale, anchor + (state.end - anchor) * scale);
+    }, { passive: false });
+
+    canvas.addEventListener('mousedown', function(e) {
+        state.drag = { x: e.clientX, start: state.start, end: state.end };
+        canvas.classList.add('dragging');
     });
+
+    window.addEventListener('mousemove', function(e) {
+        if (!state.drag) {
+            return;
+        }
+        const shift = (state.drag.x - e.clientX) / plotWidth() * (state.drag.end - state.drag.start);
+        setRange(state.drag.start + shift, state.drag.end + shift);
+    });
+
+    window.addEventListener('mouseup', function() {
+        state.drag = null;
+        canvas.classList.remove('dragging');
+    });
+
+    canvas.addEventListener('dblclick', function() {
+        clearTimeout(state.timer);
+        state.requestId++;
+        state.start = fullStart;
+        state.end = fullEnd;
+        state.series = overview.series;
+        draw();
+    });
+
+    return { draw };
 }
 
 // 保存已处理的CSV到后台
@@ -16,8 +16,9 @@ import os
 import sys
 import json
 import uuid
+import hashlib
 import logging
-import subprocess
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, Optional, Any
@@ -28,6 +29,7 @@ from fastapi.responses import JSONResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
+import numpy as np
 from pydantic import BaseModel
 
 # 第一时间加载环境变量
@@ -90,6 +92,36 @@ STATIC_DIR = os.path.join(trend_analysis_dir, 'static')
 IMAGES_DIR = os.path.join(STATIC_DIR, 'images')
 FILES_DIR = os.path.join(STATIC_DIR, 'files')
 
+# 结果缓存模块位于趋势分析目录中
+if trend_analysis_dir not in sys.path:
+    sys.path.append(trend_analysis_dir)
+from result_cache import (  # noqa: E402
+    DEFAULT_CACHE_DIR, ResultCache, file_key, output_params)
+from analysis_pool import AnalysisError, AnalysisPool  # noqa: E402
+from chart_data import ChartData, DEFAULT_WINDOW_POINTS, NS_PER_MS  # noqa: E402
+from price_pyramid import DEFAULT_WIDTH  # noqa: E402
+from plotting import DEFAULT_PRESET  # noqa: E402
+from series_store import SeriesStore  # noqa: E402
+
+RESULT_CACHE = ResultCache(DEFAULT_CACHE_DIR)
+# 上传的序列按内容保存到单独的序列存储，Web界面通过价格金字塔缩放浏览；
+# 只保留最近使用的 MAX_UPLOAD_SERIES 个，不影响命令行导入的序列
+UPLOAD_STORE_DIR = os.path.join(CACHE_DIR, 'upload_series')
+MAX_UPLOAD_SERIES = int(os.environ.get('MAX_UPLOAD_SERIES', 200))
+SERIES_STORE = SeriesStore(UPLOAD_STORE_DIR)
+# 与 main.run_analysis 使用的分析参数一致
+ANALYSIS_PARAMS = {'atr_period': 14, 'swing_threshold': 0.618}
+
+# 趋势分析工作进程池，进程数可通过 ANALYSIS_WORKERS 环境变量设置；
+# 前端使用图表数据交互绘图，ANALYSIS_CHARTS=0 时不再生成PNG图表
+ANALYSIS_POOL = AnalysisPool(
+    workers=int(os.environ.get('ANALYSIS_WORKERS', 0)) or None,
+    charts=os.environ.get('ANALYSIS_CHARTS', '1') != '0',
+    cache_dir=DEFAULT_CACHE_DIR, store_dir=UPLOAD_STORE_DIR)
+
+# 区间请求最多返回的点数
+MAX_WINDOW_POINTS = 10000
+
 # 确保目录存在
 dirs_to_create = [
     INPUT_DIR, OUTPUT_DIR, RESULTS_DIR, CACHE_DIR, 
@@ -119,6 +151,19 @@ app.add_middleware(
 )
 
 
+@app.on_event("startup")
+async def start_analysis_pool():
+    """启动趋势分析工作进程，在处理请求之前完成分析代码的导入"""
+    pids = ANALYSIS_POOL.start()
+    logger.info(f"趋势分析工作进程已启动: {pids}")
+
+
+@app.on_event("shutdown")
+async def stop_analysis_pool():
+    """停止趋势分析工作进程"""
+    ANALYSIS_POOL.shutdown()
+
+
 # 数据模型
 class AnalysisRequest(BaseModel):
     """分析请求模型"""
@@ -270,6 +315,72 @@ async def check_output_files():
         }
 
 
+@lru_cache(maxsize=16)
+def _load_chart_data(path, mtime):
+    """读取图表数据，按路径和修改时间缓存"""
+    return ChartData(path)
+
+
+# 须在 serve_static 之前注册，否则请求会被通配路由处理
+@app.get("/api/chart-data/{name}")
+def get_chart_data(name: str, start: Optional[int] = None,
+                   end: Optional[int] = None,
+                   points: int = DEFAULT_WINDOW_POINTS):
+    """
+    交互图表数据
+
+    不指定 start/end 时返回概览（最粗级别的价格序列和全部趋势区间）；
+    指定时返回该时间范围（毫秒时间戳）内降采样到 points 点的价格序列
+    """
+    if Path(name).name != name or not name.endswith('-chart_data.npz'):
+        raise HTTPException(status_code=400, detail="无效的图表数据文件名")
+    path = os.path.join(FILES_DIR, name)
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="图表数据不存在")
+
+    chart = _load_chart_data(path, os.path.getmtime(path))
+    if start is None and end is None:
+        return chart.overview()
+    return chart.window(start, end, min(max(points, 3), MAX_WINDOW_POINTS))
+
+
+def _json_prices(values):
+    """价格数组转换为列表，保留4位小数，NaN转换为null"""
+    values = np.round(values, 4)
+    return np.where(np.isnan(values), None, values).tolist()
+
+
+# 须在 serve_static 之前注册，否则请求会被通配路由处理
+@app.get("/api/series/{symbol}/window")
+def get_series_window(symbol: str, start: Optional[int] = None,
+                      end: Optional[int] = None, width: int = DEFAULT_WIDTH):
+    """
+    价格金字塔中适合时间范围（毫秒时间戳）和像素宽度的级别
+
+    返回范围内每个桶的首末时间、首末价格和最高最低价，桶数为 width 到
+    2*width 个；范围内的原始点数不超过 width 时返回原始数据
+    """
+    try:
+        pyramid = SERIES_STORE.pyramid(symbol)
+    except (KeyError, ValueError):
+        raise HTTPException(status_code=404, detail="序列不存在")
+
+    buckets = pyramid.query(
+        None if start is None else start * NS_PER_MS,
+        None if end is None else end * NS_PER_MS,
+        min(max(width, 1), MAX_WINDOW_POINTS))
+    return {
+        'level': buckets['level'],
+        'bucket_size': buckets['bucket_size'],
+        'start': (buckets['start'] // NS_PER_MS).tolist(),
+        'end': (buckets['end'] // NS_PER_MS).tolist(),
+        'first': _json_prices(buckets['first']),
+        'last': _json_prices(buckets['last']),
+        'min': _json_prices(buckets['min']),
+        'max': _json_prices(buckets['max']),
+    }
+
+
 @app.get("/{filename:path}")
 async def serve_static(filename: str):
     """提供静态文件服务"""
@@ -315,56 +426,51 @@ async def process_csv(file: UploadFile = File(...)):
         
         logger.info(f"保存上传文件: {cache_path}")
         
-        # 调用趋势分析脚本
-        main_script = os.path.join(trend_analysis_dir, 'main.py')
         output_path = RESULTS_DIR
         
-        logger.info(
-            f"运行趋势分析: {main_script} {cache_path} --output-dir {output_path}"
-        )
-        
-        # 使用数组方式传递参数，这更安全
-        cmd = [
-            sys.executable,
-            main_script,
-            cache_path,
-            '--output-dir',
-            output_path
-        ]
-        
-        logger.info(f"执行命令: {cmd}")
-        
-        try:
-            # 调用主分析脚本，执行趋势分析
-            result = subprocess.run(
-                cmd,
-                shell=False,  # 不使用shell执行命令
-                capture_output=True,
-                text=True,
-                check=False  # 改为False，手动检查返回值
+        # 相同文件内容已有缓存结果时直接复制，无需启动分析进程
+        restored = None
+        # 与工作进程中 run_analysis 登记的原始文件键使用相同的参数和图表设置
+        upload_key = file_key(content, output_params(
+            ANALYSIS_PARAMS, ANALYSIS_POOL.charts, DEFAULT_PRESET))
+        cache_key = RESULT_CACHE.resolve(upload_key)
+        # 相同内容的上传共用序列存储中的同一序列，代码只取决于文件内容，
+        # 代码或参数变化后不会重复保存
+        series_symbol = hashlib.sha256(content).hexdigest()[:16]
+        if cache_key is not None:
+            restored = RESULT_CACHE.restore(
+                cache_key, output_path, Path(cache_path).stem)
+        
+        if restored is not None:
+            logger.info(f"命中结果缓存: {cache_key[:12]}，跳过趋势分析")
+        else:
+            # 在常驻工作进程中运行趋势分析，等待期间不阻塞其他请求
+            logger.info(
+                f"运行趋势分析: {cache_path} --output-dir {output_path}"
             )
-            
-            logger.info(f"趋势分析输出: {result.stdout}")
-            
-            # 手动检查返回值
-            if result.returncode != 0:
-                logger.error(f"趋势分析错误: {result.stderr}")
+        
+            try:
+                _, analysis_output = await ANALYSIS_POOL.run(
+                    cache_path, output_path, symbol=series_symbol)
+                logger.info(f"趋势分析输出: {analysis_output}")
+            except AnalysisError as e:
+                logger.error(f"趋势分析错误: {e}")
                 return JSONResponse(
                     status_code=500,
                     content={
                         "status": "error",
-                        "error": f"分析失败: {result.stderr}"
+                        "error": f"分析失败: {e}"
+                    }
+                )
+            except Exception as e:
+                logger.error(f"趋势分析执行错误: {e}")
+                return JSONResponse(
+                    status_code=500,
+                    content={
+                        "status": "error",
+                        "error": f"分析执行错误: {str(e)}"
                     }
                 )
-        except Exception as e:
-            logger.error(f"趋势分析执行错误: {e}")
-            return JSONResponse(
-                status_code=500,
-                content={
-                    "status": "error",
-                    "error": f"分析执行错误: {str(e)}"
-                }
-            )
             
         # 确保静态目录存在并有正确权限
         for directory in [STATIC_DIR, IMAGES_DIR, FILES_DIR]:
@@ -403,7 +509,7 @@ async def process_csv(file: UploadFile = File(...)):
                 f"找不到与时间戳{timestamp}或用户ID{user_id}或"
                 f"文件名{file_stem}匹配的文件，使用最近的文件"
             )
-            matching_files = recent_files[:8]  # 最多取8个文件
+            matching_files = recent_files[:9]  # 最多取9个文件
         
         if not matching_files:
             return JSONResponse(
@@ -424,6 +530,10 @@ async def process_csv(file: UploadFile = File(...)):
             "sensitive": {},
             "insensitive": {},
         }
+        if series_symbol in SERIES_STORE:
+            results_dict['series'] = series_symbol
+            SERIES_STORE.touch(series_symbol)
+        SERIES_STORE.prune(MAX_UPLOAD_SERIES)
         
         # 处理文件
         for i, file_path in enumerate(matching_files):
@@ -487,6 +597,9 @@ async def process_csv(file: UploadFile = File(...)):
                         elif 'detailed_report' in file_name:
                             results_dict['detailed_report'] = file_name
                             logger.info(f"添加详细报告: {file_name}")
+                        elif 'chart_data' in file_name:
+                            results_dict['chart_data'] = file_name
+                            logger.info(f"添加图表数据: {file_name}")
                 else:
                     logger.error(f"复制失败: {dest_path} 不存在")
             except Exception as e:
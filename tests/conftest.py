@@ -0,0 +1,9 @@
+import os
+import sys
+
+# 趋势分析模块按文件名互相导入，与直接运行脚本时一致
+TRENDANALYSIS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'src', 'tech_analysis_crew', 'trendanalysis')
+if TRENDANALYSIS_DIR not in sys.path:
+    sys.path.insert(0, TRENDANALYSIS_DIR)
@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from batch import analyze_series, symbol_filename
+from series_store import SeriesStore
+
+
+def test_symbol_filename():
+    assert symbol_filename('AAPL') == 'AAPL'
+    assert symbol_filename('BRK.B') == 'BRK.B'
+    for symbol in ('EUR/USD', '^GSPC', '..', '../x', 'a b'):
+        name = symbol_filename(symbol)
+        assert os.path.basename(name) == name
+        assert not name.startswith('.')
+    # 替换后相同的代码使用不同的文件名
+    assert symbol_filename('EUR/USD') != symbol_filename('EUR_USD')
+    assert symbol_filename('EUR/USD') != symbol_filename('EUR:USD')
+
+
+def test_analyze_series_writes_inside_output_dir(tmp_path):
+    rng = np.random.default_rng(2)
+    n = 400
+    df = pd.DataFrame({
+        'date': pd.date_range('2021-01-01', periods=n, freq='D'),
+        'close': 1.1 + np.cumsum(rng.normal(0, 0.005, n)),
+    })
+    output_dir = tmp_path / 'out'
+    output_dir.mkdir()
+
+    rows = analyze_series(('EUR/USD', df), str(output_dir))
+    assert [row['status'] for row in rows] == ['ok', 'ok']
+    assert sorted(os.listdir(output_dir)) == [
+        f"{symbol_filename('EUR/USD')}-{version}-trend_analysis.csv"
+        for version in ('insensitive', 'sensitive')]
+    assert os.listdir(tmp_path) == ['out']
+
+
+def test_analyze_series_from_store(tmp_path):
+    rng = np.random.default_rng(3)
+    n = 500
+    close = 50 + np.cumsum(rng.normal(0, 0.5, n))
+    df = pd.DataFrame({
+        'date': pd.date_range('2020-01-01', periods=n, freq='D'),
+        'high': close + rng.uniform(0, 1, n),
+        'low': close - rng.uniform(0, 1, n),
+        'close': close,
+    })
+    store = SeriesStore(str(tmp_path / 'store'))
+    store.write('XAU', df.set_index('date'))
+
+    for name, data in (('from_csv', df), ('from_store', store)):
+        (tmp_path / name).mkdir()
+        rows = analyze_series(('XAU', data), str(tmp_path / name))
+        assert [row['status'] for row in rows] == ['ok', 'ok']
+
+    # 从存储读取的序列跳过清理，结果与清理原始数据后完全一致
+    for version in ('sensitive', 'insensitive'):
+        filename = f"XAU-{version}-trend_analysis.csv"
+        assert ((tmp_path / 'from_csv' / filename).read_bytes() ==
+                (tmp_path / 'from_store' / filename).read_bytes())
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from chart_data import NS_PER_MS, TREND_TYPES, ChartData, write_chart_data
+from trend_sensitive import TrendAnalyzer
+
+
+def _frame(n, seed=0, nan_fraction=0.0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    close[rng.random(n) < nan_fraction] = np.nan
+    return pd.DataFrame(
+        {'close': close},
+        index=pd.date_range('2010-01-01', periods=n, freq='h'))
+
+
+def _empty_trends():
+    return pd.DataFrame({
+        'start_date': pd.to_datetime([]), 'end_date': pd.to_datetime([]),
+        'low_price': [], 'high_price': [], 'trend_type': []})
+
+
+@pytest.fixture(scope='module')
+def chart(tmp_path_factory):
+    df = _frame(100000, nan_fraction=0.01)
+    trends = TrendAnalyzer().analyze(df.dropna())
+    path = tmp_path_factory.mktemp('chart') / 'chart_data.npz'
+    write_chart_data(path, df, {'sensitive': trends, 'empty': _empty_trends()})
+    return ChartData(path), df, trends
+
+
+def test_overview_round_trip(chart):
+    chart, df, trends = chart
+    valid = df['close'].dropna()
+    times = valid.index.as_unit('ns').asi8 // NS_PER_MS
+
+    overview = chart.overview()
+    assert overview['length'] == len(valid)
+    assert (overview['start'], overview['end']) == (times[0], times[-1])
+    assert overview['trend_types'] == list(TREND_TYPES)
+    # 概览为最粗级别，最后一级为去掉NaN后的原始数据
+    assert len(overview['series']['t']) == len(chart.levels[0][0])
+    np.testing.assert_array_equal(chart.levels[-1][0], times)
+    np.testing.assert_array_equal(chart.levels[-1][1], valid.to_numpy())
+
+    band = overview['bands']['sensitive']
+    assert band['start'] == list(
+        trends['start_date'].to_numpy().astype('datetime64[ms]').astype(int))
+    assert band['low'] == list(np.round(trends['low_price'], 4))
+    assert [TREND_TYPES[t] for t in band['type']] == list(trends['trend_type'])
+    assert overview['bands']['empty'] == {
+        'start': [], 'end': [], 'low': [], 'high': [], 'type': []}
+
+
+def test_window_level_selection(chart):
+    chart, df, _ = chart
+    full_times = chart.levels[-1][0]
+    rng = np.random.default_rng(1)
+    for _ in range(60):
+        start, end = np.sort(rng.choice(full_times, 2))
+        points = int(rng.integers(3, 3000))
+        window = chart.window(start, end, points)
+        level = window['level']
+
+        # 选择范围内（两侧各多一个点）点数不少于 points 的最粗级别
+        counts = []
+        for times, _ in chart.levels:
+            lo = max(np.searchsorted(times, start, 'left') - 1, 0)
+            hi = min(np.searchsorted(times, end, 'right') + 1, len(times))
+            counts.append(hi - lo)
+        assert all(count < points for count in counts[:level])
+        assert counts[level] >= points or level == len(chart.levels) - 1
+
+        t = np.array(window['series']['t'])
+        assert len(t) == min(points, counts[level])
+        assert (np.diff(t) > 0).all()
+        times = chart.levels[level][0]
+        assert np.isin(t, times).all()
+        # 只会多取范围两侧各一个点
+        assert (t >= start).sum() >= len(t) - 1
+        assert (t <= end).sum() >= len(t) - 1
+
+
+@pytest.mark.parametrize('n', [0, 1, 2])
+def test_tiny_series(tmp_path, n):
+    path = tmp_path / 'chart_data.npz'
+    write_chart_data(path, _frame(n), {'sensitive': _empty_trends()})
+    chart = ChartData(path)
+
+    overview = chart.overview()
+    assert overview['length'] == n
+    assert len(overview['series']['t']) == n
+    if n == 0:
+        assert overview['start'] is None and overview['end'] is None
+    assert len(chart.window()['series']['t']) == n
+    assert len(chart.window(0, 1, 3)['series']['t']) == min(n, 1)
@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataprocess import (
+    _parse_date_string, clean_value, clean_values, common_date_formats,
+    process_dates_row_by_row)
+
+
+def _baseline_dates(series):
+    """原来的逐行处理：每行依次尝试各种格式，无法识别时保留原值"""
+    result = series.copy()
+    for i, value in enumerate(series):
+        if pd.isna(value) or str(value).strip() == '':
+            continue
+        parsed = _parse_date_string(str(value).strip(), common_date_formats())
+        if parsed is not None:
+            result.iloc[i] = parsed
+    return result
+
+
+def _dates(fmt, n=400, start='1998-12-25'):
+    # 超过推断格式的样本数，样本之后的值走向量化解析
+    return list(pd.date_range(start, periods=n, freq='D').strftime(fmt))
+
+
+def _check(values, dtype=object):
+    series = pd.Series(values, dtype=dtype)
+    expected = _baseline_dates(series)
+    got = process_dates_row_by_row(series)
+    pd.testing.assert_series_equal(got, expected)
+    return got
+
+
+@pytest.mark.parametrize('fmt', [
+    '%Y-%m-%d', '%Y/%m/%d', '%Y.%m.%d', '%Y-%m-%d %H:%M:%S',
+    '%d/%m/%Y', '%m/%d/%Y', '%d.%m.%Y', '%d-%m-%Y',
+    '%Y年%m月%d日', '%Y%m%d', '%y%m%d', '%d %b %Y', '%B %d, %Y',
+])
+def test_dates_match_row_by_row(fmt):
+    _check(_dates(fmt))
+
+
+def test_dates_repeated_and_string_dtype():
+    values = _dates('%d/%m/%Y', 100) * 5
+    _check(values)
+    _check(values, dtype='str')
+
+
+@pytest.mark.parametrize('fmt', ['%d/%m/%Y', '%m/%d/%Y', '%d.%m.%Y'])
+def test_day_first_ambiguity(fmt):
+    # 样本中只有日大于12的日期，推断出的格式没有歧义；之后日、月都不超过12
+    # 的值与逐行解析一致，按月在前理解，日大于12的值按推断的格式解析
+    dates = pd.date_range('1990-01-01', periods=2000, freq='D')
+    values = list(dates[dates.day > 12].strftime(fmt))
+    day_first = fmt.index('%d') < fmt.index('%m')
+    sep = fmt[2]
+    ambiguous = f"05{sep}03{sep}2020"
+    unambiguous = f"13{sep}03{sep}2020" if day_first else f"03{sep}13{sep}2020"
+    got = _check(values + [ambiguous, unambiguous])
+    assert got.iloc[-2] == '2020-05-03'
+    assert got.iloc[-1] == '2020-03-13'
+
+
+def test_chinese_and_compact_dates():
+    got = _check(['2020年1月5日', '2020年12月31日', '2021年02月03日'] +
+                 _dates('%Y年%m月%d日'))
+    assert list(got.iloc[:3]) == ['2020-01-05', '2020-12-31', '2021-02-03']
+
+    got = _check(_dates('%Y%m%d') + ['20200105'])
+    assert got.iloc[-1] == '2020-01-05'
+
+    # 6位日期先由 pd.to_datetime 解析，'200105' 被理解为 2005-01-20，
+    # 与逐行处理相同；pd.to_datetime 无法解析的值才按 %y%m%d 解析
+    got = _check(['991231', '200105'] + _dates('%y%m%d'))
+    assert list(got.iloc[:2]) == ['1999-12-31', '2005-01-20']
+
+
+def test_mixed_and_invalid_dates():
+    values = _dates('%Y-%m-%d') + [
+        ' 2020-01-05 ', '2020/01/06', '06.01.2020', 'abc', '', '   ',
+        None, np.nan, '2020-02-30', '2020-13-01', '12345', '1/2/3',
+        '0099-01-01', '2020-01-05T10:30:00+08:00', '2020-01-05 23:59',
+    ]
+    got = _check(values)
+    # 无法识别的值保留原值，空值不变
+    assert got.iloc[-12] == 'abc'
+    assert got.iloc[-9] is None
+    assert got.iloc[-7] == '2020-02-30'
+
+
+def test_datetime_column():
+    dates = pd.Series(pd.date_range('2020-01-01', periods=5, freq='12h'))
+    got = process_dates_row_by_row(dates)
+    assert list(got) == ['2020-01-01', '2020-01-01', '2020-01-02',
+                         '2020-01-02', '2020-01-03']
+
+
+_VALUES = [
+    '1', '-2.5', ' 3 ', '1e3', '$1,234.50', '¥12', '€-3', '£0.5', '₽7', '₹8',
+    '12.5%', '-1,234%', '1,234', '1,2,3', '12,34.5', ',', '-', 'n/a', 'N/A',
+    ' NULL ', 'None', 'nan', '', 'abc', '5 %', '$', 'inf', '-inf', '1_000',
+    '１２', '0x10',
+]
+
+
+@pytest.mark.parametrize('dtype', [object, 'str'])
+def test_clean_values_matches_clean_value(dtype):
+    series = pd.Series(_VALUES * 3, dtype=dtype, name='value')
+    expected = series.map(clean_value).astype(float)
+    pd.testing.assert_series_equal(clean_values(series), expected)
+
+
+def test_clean_values_examples():
+    # 千位分隔符只按格式去掉逗号，不检查分组位置，'1,2,3' 得到 123
+    got = clean_values(pd.Series(
+        ['$1,234.50', '12.5%', '1,234', 'n/a', '€-3', '1,2,3', '-', 'abc'],
+        dtype=object))
+    np.testing.assert_array_equal(
+        got.to_numpy(),
+        [1234.5, 0.125, 1234.0, np.nan, -3.0, 123.0, np.nan, np.nan])
+
+
+def test_clean_values_mixed_types():
+    # 非字符串的值保持原值
+    series = pd.Series(['1,000', 2, 3.5, None, np.nan, '$4'], dtype=object)
+    pd.testing.assert_series_equal(
+        clean_values(series).astype(float),
+        series.map(clean_value).astype(float))
+
+    numeric = pd.Series([1.0, np.nan, 3.0])
+    pd.testing.assert_series_equal(clean_values(numeric), numeric)
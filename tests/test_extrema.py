@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from scipy.signal import argrelextrema
+
+from extrema import find_local_extrema, sliding_max, sliding_min
+
+
+def _prices(n, seed, decimals=None, nan_fraction=0.0):
+    rng = np.random.default_rng(seed)
+    prices = np.cumsum(rng.normal(size=n))
+    if decimals is not None:
+        # 取整后出现大量相等的邻居和价格平台
+        prices = np.round(prices, decimals)
+    prices[rng.random(n) < nan_fraction] = np.nan
+    return prices
+
+
+def _loose_extrema(prices, order, compare):
+    """
+    非严格极值的逐点实现：不劣于两侧order个邻居（边界外的忽略），平台只取
+    最左侧的点；首尾点不是极值点，从首点开始的平台也不算
+    """
+    n = len(prices)
+    candidate = np.zeros(n, dtype=bool)
+    for i in range(n):
+        neighbours = np.r_[prices[max(0, i - order):i],
+                           prices[i + 1:i + order + 1]]
+        candidate[i] = np.all(compare(prices[i], neighbours))
+    return np.array([i for i in range(1, n - 1) if candidate[i] and not (
+        candidate[i - 1] and prices[i] == prices[i - 1])], dtype=np.int64)
+
+
+@pytest.mark.parametrize('window', [1, 2, 7, 64])
+def test_sliding_window_matches_brute_force(window):
+    values = _prices(300, window)
+    expected_max = [values[j:j + window].max()
+                    for j in range(len(values) - window + 1)]
+    expected_min = [values[j:j + window].min()
+                    for j in range(len(values) - window + 1)]
+    np.testing.assert_array_equal(sliding_max(values, window), expected_max)
+    np.testing.assert_array_equal(sliding_min(values, window), expected_min)
+
+
+@pytest.mark.parametrize('order', [1, 3, 5, 20])
+@pytest.mark.parametrize('decimals,nan_fraction', [(None, 0.0), (0, 0.0),
+                                                   (1, 0.02)])
+def test_strict_matches_argrelextrema(order, decimals, nan_fraction):
+    prices = _prices(2000, order, decimals, nan_fraction)
+    max_idx, min_idx = find_local_extrema(prices, order)
+    np.testing.assert_array_equal(
+        max_idx, argrelextrema(prices, np.greater, order=order)[0])
+    np.testing.assert_array_equal(
+        min_idx, argrelextrema(prices, np.less, order=order)[0])
+
+
+@pytest.mark.parametrize('order', [1, 4, 10])
+def test_non_strict_matches_loop(order):
+    prices = _prices(1500, order, decimals=0)
+    max_idx, min_idx = find_local_extrema(prices, order, strict=False)
+    np.testing.assert_array_equal(
+        max_idx, _loose_extrema(prices, order, np.greater_equal))
+    np.testing.assert_array_equal(
+        min_idx, _loose_extrema(prices, order, np.less_equal))
+
+
+def test_short_and_invalid_input():
+    for prices in ([], [1.0], [1.0, 2.0]):
+        max_idx, min_idx = find_local_extrema(np.array(prices), 3)
+        assert len(max_idx) == 0 and len(min_idx) == 0
+    with pytest.raises(ValueError):
+        find_local_extrema(np.arange(10.0), 0)
+    with pytest.raises(ValueError):
+        find_local_extrema(np.arange(10.0), 2, method='argrelextrema',
+                           strict=False)
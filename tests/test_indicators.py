@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import frame_atr, smooth_atr, true_range
+
+
+def _ohlc(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(size=n))
+    high = close + rng.random(n)
+    low = close - rng.random(n)
+    return high, low, close
+
+
+def _loop_true_range(high, low, close):
+    """原实现中逐根K线计算TR的循环"""
+    tr = np.zeros(len(high))
+    tr[0] = high[0] - low[0]
+    for i in range(1, len(high)):
+        tr[i] = max(high[i] - low[i], abs(high[i] - close[i - 1]),
+                    abs(low[i] - close[i - 1]))
+    return tr
+
+
+def _loop_smoothing(tr, period, alpha):
+    """以首个周期的平均值为种子逐点递推，预热期向后填充"""
+    atr = np.full(len(tr), np.nan)
+    if len(tr) >= period:
+        atr[period - 1] = tr[:period].mean()
+        for i in range(period, len(tr)):
+            atr[i] = (1 - alpha) * atr[i - 1] + alpha * tr[i]
+        atr[:period - 1] = atr[period - 1]
+    return atr
+
+
+def test_true_range_matches_loop():
+    high, low, close = _ohlc(500)
+    np.testing.assert_allclose(true_range(high, low, close),
+                               _loop_true_range(high, low, close))
+    assert len(true_range([], [], [])) == 0
+
+
+@pytest.mark.parametrize('period', [1, 14, 50])
+def test_sma_matches_original(period):
+    high, low, close = _ohlc(300, seed=period)
+    df = pd.DataFrame({'close': close, 'high': high, 'low': low})
+    expected = (pd.Series(_loop_true_range(high, low, close))
+                .rolling(period).mean().bfill().values)
+    np.testing.assert_allclose(frame_atr(df, period=period), expected)
+
+
+@pytest.mark.parametrize('method,alpha', [('wilder', lambda p: 1.0 / p),
+                                          ('ema', lambda p: 2.0 / (p + 1))])
+@pytest.mark.parametrize('period', [5, 14])
+def test_recursive_smoothing_matches_loop(method, alpha, period):
+    tr = true_range(*_ohlc(200, seed=3))
+    np.testing.assert_allclose(smooth_atr(tr, period, method),
+                               _loop_smoothing(tr, period, alpha(period)))
+
+
+def test_frame_atr_without_high_low_uses_price():
+    _, _, close = _ohlc(100)
+    df = pd.DataFrame({'close': close})
+    expected = (pd.Series(np.r_[0.0, np.abs(np.diff(close))])
+                .rolling(14).mean().bfill().values)
+    np.testing.assert_allclose(frame_atr(df), expected)
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        smooth_atr(np.ones(10), 3, 'median')
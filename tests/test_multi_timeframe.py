@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from multi_timeframe import (
+    MIN_BARS, Timeframe, analyze_timeframes, resample_timeframes)
+
+
+def _ohlcv(n, freq='15min', seed=0, tz=None, drop=0.3):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2021-03-01', periods=n, freq=freq, tz=tz)
+    # 随机去掉部分K线，模拟休市和缺失数据
+    index = index[rng.random(n) >= drop]
+    m = len(index)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, m)))
+    open_ = close * (1 + rng.normal(0, 0.001, m))
+    df = pd.DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close) * (1 + rng.uniform(0, 0.002, m)),
+        'low': np.minimum(open_, close) * (1 - rng.uniform(0, 0.002, m)),
+        'close': close,
+        'volume': rng.integers(1, 1000, m).astype(float),
+    }, index=index)
+    df.loc[df.index[5], 'high'] = np.nan
+    return df
+
+
+# 周线从周一开始，标签为周期起点
+_RULES = {'1h': '1h', '4h': '4h', '1d': '1D', '1w': 'W-MON'}
+
+
+def _pandas_resample(df, name):
+    expected = df.resample(
+        _RULES[name], closed='left', label='left').agg(
+        {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last',
+         'volume': 'sum'})
+    # resample 会生成没有数据的空周期
+    expected = expected[df['close'].resample(
+        _RULES[name], closed='left', label='left').count() > 0]
+    expected.index = expected.index.as_unit('ns').rename('date')
+    expected.index.freq = None
+    return expected
+
+
+@pytest.mark.parametrize('tz', [None, 'Asia/Shanghai'])
+def test_resample_matches_pandas(tz):
+    df = _ohlcv(6000, tz=tz)
+    names = ['1w', '1h', '1d', '4h']
+    result = resample_timeframes(df, names)
+    # 结果按周期从短到长排列
+    assert list(result) == ['1h', '4h', '1d', '1w']
+    for name in names:
+        pd.testing.assert_frame_equal(
+            result[name], _pandas_resample(df, name), check_freq=False)
+
+
+def test_weeks_start_on_monday():
+    df = _ohlcv(3000, freq='h', drop=0.0)
+    weekly = resample_timeframes(df, ['1w'])['1w']
+    assert (weekly.index.dayofweek == 0).all()
+    assert (weekly.index == weekly.index.normalize()).all()
+    assert Timeframe('1w').contains(Timeframe('1d'))
+    assert not Timeframe('1w').contains(Timeframe('3d'))
+
+
+def test_skipped_and_short_timeframes(capsys):
+    # 日线数据：1h 短于数据间隔被跳过，1w 的K线少于 MIN_BARS 只返回K线
+    df = _ohlcv(150, freq='D', drop=0.0)
+    results = analyze_timeframes(df, ['1h', '1d', '1w'])
+    assert '跳过' in capsys.readouterr().out
+
+    assert list(results) == ['1d', '1w']
+    assert set(results['1d']) == {'bars', 'sensitive', 'insensitive'}
+    assert len(results['1w']['bars']) < MIN_BARS
+    assert set(results['1w']) == {'bars'}
+    pd.testing.assert_frame_equal(
+        results['1w']['bars'], _pandas_resample(df, '1w'), check_freq=False)
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from price_pyramid import PricePyramid, build_pyramid, pyramid_length
+
+
+def _pyramid(directory, values):
+    values = np.asarray(values, dtype=float)
+    timestamps = np.arange(len(values), dtype=np.int64) * 1000
+    build_pyramid(str(directory), values)
+    return PricePyramid(str(directory), timestamps, values)
+
+
+def _values(n, seed=0):
+    rng = np.random.default_rng(seed)
+    values = np.cumsum(rng.normal(size=n))
+    values[rng.random(n) < 0.05] = np.nan
+    # 长段NaN，部分桶全部为NaN
+    values[n // 3:n // 3 + 700] = np.nan
+    return values
+
+
+def _brute_force(values, level, first_pos):
+    size = 1 << level
+    mins, maxs = [], []
+    for pos in first_pos:
+        bucket = values[pos:pos + size]
+        valid = bucket[~np.isnan(bucket)]
+        mins.append(valid.min() if len(valid) else np.nan)
+        maxs.append(valid.max() if len(valid) else np.nan)
+    return np.array(mins), np.array(maxs)
+
+
+@pytest.mark.parametrize('n', [2, 3, 1000, 50001])
+def test_query_matches_brute_force(tmp_path, n):
+    values = _values(n)
+    pyramid = _pyramid(tmp_path, values)
+    assert pyramid_length(str(tmp_path)) == n
+    timestamps = pyramid.timestamps
+    rng = np.random.default_rng(n)
+
+    for _ in range(300):
+        start, end = np.sort(rng.integers(-5000, n * 1000 + 5000, 2))
+        width = int(rng.integers(1, 2000))
+        buckets = pyramid.query(start, end, width)
+        level, size = buckets['level'], buckets['bucket_size']
+        assert size == 1 << level
+
+        # 覆盖范围两侧各多取一个点
+        lo = max(np.searchsorted(timestamps, start, 'left') - 1, 0)
+        hi = min(np.searchsorted(timestamps, end, 'right') + 1, n)
+        count = len(buckets['min'])
+        if hi - lo <= width:
+            assert level == 0 and count == hi - lo
+        else:
+            assert width <= count < 2 * width
+
+        first_pos = buckets['start'] // 1000
+        last_pos = buckets['end'] // 1000
+        if count:
+            assert first_pos[0] <= lo and last_pos[-1] >= hi - 1
+        np.testing.assert_array_equal(
+            first_pos, np.arange(lo >> level, (lo >> level) + count) * size)
+        np.testing.assert_array_equal(
+            last_pos, np.minimum(first_pos + size - 1, n - 1))
+        np.testing.assert_array_equal(buckets['first'], values[first_pos])
+        np.testing.assert_array_equal(buckets['last'], values[last_pos])
+
+        mins, maxs = _brute_force(values, level, first_pos)
+        np.testing.assert_array_equal(buckets['min'], mins)
+        np.testing.assert_array_equal(buckets['max'], maxs)
+
+
+def test_whole_series_levels(tmp_path):
+    n = 10000
+    pyramid = _pyramid(tmp_path, _values(n))
+    assert pyramid.levels == int(np.ceil(np.log2(n))) + 1
+    for width in (1, 2, 3, 100, 1200, 5000, 10000, 20000):
+        count = len(pyramid.query(None, None, width)['min'])
+        if width >= n:
+            assert count == n
+        else:
+            assert width <= count < 2 * width
+
+
+@pytest.mark.parametrize('n', [0, 1])
+def test_tiny_series(tmp_path, n):
+    pyramid = _pyramid(tmp_path, np.arange(n, dtype=float))
+    assert pyramid.levels == 1
+    for start, end in ((None, None), (0, 0), (-10, 10), (5000, 6000)):
+        buckets = pyramid.query(start, end, 10)
+        assert buckets['level'] == 0
+        assert len(buckets['min']) == n
+        np.testing.assert_array_equal(buckets['first'], np.arange(n))
+
+
+def test_length_mismatch(tmp_path):
+    build_pyramid(str(tmp_path), np.arange(10.0))
+    with pytest.raises(ValueError):
+        PricePyramid(str(tmp_path), np.arange(11), np.arange(11.0))
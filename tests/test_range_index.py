@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import range_index
+from range_index import RangeExtremumIndex
+
+
+def _values(n, nan_fraction, seed=0):
+    rng = np.random.default_rng(seed)
+    # 取整后有大量相同取值，检查取最左边位置的规则
+    values = np.round(np.cumsum(rng.normal(size=n)))
+    values[rng.random(n) < nan_fraction] = np.nan
+    return values
+
+
+def _baseline(values, starts, ends, skipna):
+    """逐个区间用 pandas/numpy 计算最值位置"""
+    series = pd.Series(values)
+    argmax, argmin = [], []
+    for start, end in zip(starts, ends):
+        window = series.iloc[start:end + 1]
+        if window.isna().all() or not skipna and window.isna().any():
+            first_nan = start + int(np.flatnonzero(window.isna())[0])
+            argmax.append(first_nan)
+            argmin.append(first_nan)
+        else:
+            argmax.append(int(window.idxmax()))
+            argmin.append(int(window.idxmin()))
+    return np.array(argmax), np.array(argmin)
+
+
+@pytest.mark.parametrize('nan_fraction', [0.0, 0.1, 0.9])
+@pytest.mark.parametrize('skipna', [True, False])
+@pytest.mark.parametrize('build', [False, True])
+def test_matches_baseline(nan_fraction, skipna, build, monkeypatch):
+    if build:
+        # 第一次查询就建立稀疏表
+        monkeypatch.setattr(range_index, 'BUILD_FACTOR', 0)
+    values = _values(500, nan_fraction)
+    rng = np.random.default_rng(1)
+    starts = rng.integers(0, 500, 300)
+    ends = np.minimum(starts + rng.integers(0, 80, 300), 499)
+
+    index = RangeExtremumIndex(values, skipna)
+    expected_max, expected_min = _baseline(values, starts, ends, skipna)
+    np.testing.assert_array_equal(index.argmax(starts, ends), expected_max)
+    np.testing.assert_array_equal(index.argmin(starts, ends), expected_min)
+    for start, end, pos in zip(starts[:20], ends[:20], expected_max[:20]):
+        assert index.argmax(start, end) == pos
+
+
+@pytest.mark.parametrize('skipna', [True, False])
+def test_scan_in_blocks(skipna, monkeypatch):
+    # 批长度小于部分区间长度，检查分批边界和单独成批的长区间
+    monkeypatch.setattr(range_index, 'SCAN_BLOCK', 50)
+    values = _values(500, 0.1)
+    rng = np.random.default_rng(2)
+    starts = rng.integers(0, 500, 60)
+    ends = np.minimum(starts + rng.integers(0, 120, 60), 499)
+
+    index = RangeExtremumIndex(values, skipna)
+    expected_max, expected_min = _baseline(values, starts, ends, skipna)
+    np.testing.assert_array_equal(index.argmax(starts, ends), expected_max)
+    np.testing.assert_array_equal(index.argmin(starts, ends), expected_min)
+    assert index._tables is None
+
+
+def test_table_built_only_after_heavy_use():
+    values = _values(1000, 0.0)
+    swing = np.arange(0, 1000, 10)
+    index = RangeExtremumIndex(values, skipna=False)
+
+    # 相邻区间的查询按段扫描，不建立稀疏表
+    scanned_max = index.max(swing[:-1], swing[1:])
+    scanned_min = index.min(swing[:-1], swing[1:])
+    assert index._tables is None
+    assert not index.has_nan
+
+    for _ in range(range_index.BUILD_FACTOR):
+        index.argmax(0, len(values) - 1)
+    assert index._tables is not None
+    np.testing.assert_array_equal(index.max(swing[:-1], swing[1:]),
+                                  scanned_max)
+    np.testing.assert_array_equal(index.min(swing[:-1], swing[1:]),
+                                  scanned_min)
+
+
+def test_invalid_range():
+    index = RangeExtremumIndex(np.arange(10.0))
+    with pytest.raises(ValueError):
+        index.argmax(5, 4)
+    with pytest.raises(ValueError):
+        index.argmin([0, 3], [2, 10])
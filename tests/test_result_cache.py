@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from main import run_analysis
+from result_cache import (
+    ResultCache, code_files, file_key, output_params, series_key)
+
+
+PARAMS = {'atr_period': 14, 'swing_threshold': 0.618}
+
+
+@pytest.fixture(scope='module')
+def price_csv(tmp_path_factory):
+    rng = np.random.default_rng(7)
+    n = 800
+    df = pd.DataFrame({
+        'date': pd.date_range('2015-01-01', periods=n, freq='D'),
+        'close': 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n))),
+    })
+    path = tmp_path_factory.mktemp('data') / 'prices.csv'
+    df.to_csv(path, index=False)
+    return path
+
+
+def test_series_key_depends_on_values_and_params():
+    index = pd.date_range('2020-01-01', periods=5, freq='D')
+    df = pd.DataFrame({'close': [1.0, 2.0, 3.0, 4.0, 5.0]}, index=index)
+    key = series_key(df, PARAMS)
+
+    assert series_key(df.copy(), dict(PARAMS)) == key
+    assert series_key(df, dict(PARAMS, atr_period=20)) != key
+    changed = df.copy()
+    changed.iloc[2, 0] = 3.5
+    assert series_key(changed, PARAMS) != key
+
+
+def test_code_files_follow_analysis_imports():
+    files = code_files()
+    # 直接导入和经 shared_stages 间接导入的模块
+    for name in ('main.py', 'trend_insensitive.py', 'columnar.py',
+                 'shared_stages.py', 'range_index.py'):
+        assert name in files
+    # 分析路径之外的模块不影响结果
+    assert 'streaming.py' not in files
+
+
+def test_file_key_same_for_path_and_content(price_csv):
+    content = price_csv.read_bytes()
+    assert file_key(price_csv, PARAMS) == file_key(content, PARAMS)
+    assert file_key(content, PARAMS) != file_key(content + b'\n', PARAMS)
+
+
+def test_output_params_separate_chart_settings():
+    keys = {
+        file_key(b'data', output_params(PARAMS, charts=False)),
+        file_key(b'data', output_params(PARAMS, True, 'screen')),
+        file_key(b'data', output_params(PARAMS, True, 'thumbnail')),
+    }
+    assert len(keys) == 3
+
+
+def test_alias_follows_chart_settings(price_csv, tmp_path):
+    cache_dir = tmp_path / 'cache'
+    cache = ResultCache(str(cache_dir))
+    with_charts = file_key(price_csv, output_params(PARAMS, True, 'screen'))
+    without_charts = file_key(price_csv, output_params(PARAMS, charts=False))
+
+    assert run_analysis(str(price_csv), str(tmp_path / 'a'),
+                        cache_dir=str(cache_dir), charts=False)
+    assert cache.resolve(with_charts) is None
+    key = cache.resolve(without_charts)
+    assert key is not None
+
+    # 命中缓存时重新登记的别名也不能指向其他图表设置的结果
+    assert run_analysis(str(price_csv), str(tmp_path / 'b'),
+                        cache_dir=str(cache_dir), charts=False)
+    assert cache.resolve(with_charts) is None
+    assert cache.resolve(without_charts) == key
+    assert not list((tmp_path / 'b').glob('*.png'))
@@ -0,0 +1,128 @@
+import os
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from series_store import CURRENT_FILE, SeriesStore
+from trend_sensitive import TrendAnalyzer
+
+
+def _frame(n, seed=0, start='2020-01-01'):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {'close': 100 + np.cumsum(rng.normal(size=n))},
+        index=pd.date_range(start, periods=n, freq='h'))
+
+
+def _current_version(store, symbol):
+    with open(f"{store.store_dir}/{symbol}/{CURRENT_FILE}",
+              encoding='utf-8') as f:
+        return f.read()
+
+
+def test_write_load_append(tmp_path):
+    store = SeriesStore(str(tmp_path))
+    df = _frame(500)
+    assert store.write('EURUSD', df.iloc[:300]) == 300
+    assert store.append('EURUSD', df.iloc[250:]) == 200
+
+    loaded = store.load('EURUSD')
+    np.testing.assert_array_equal(loaded['close'].to_numpy(),
+                                  df['close'].to_numpy())
+    assert (loaded.index == df.index).all()
+    assert store.symbols() == ['EURUSD']
+    assert store.pyramid('EURUSD').levels > 1
+
+
+def _ohlc_frame(n, seed=0):
+    df = _frame(n, seed)
+    rng = np.random.default_rng(seed + 100)
+    df['high'] = df['close'] + rng.uniform(0, 1, n)
+    df['low'] = df['close'] - rng.uniform(0, 1, n)
+    # 存储的时间戳精度为纳秒
+    df.index = df.index.as_unit('ns')
+    return df
+
+
+def test_high_low_round_trip(tmp_path):
+    store = SeriesStore(str(tmp_path))
+    df = _ohlc_frame(600)
+    store.write('XAU', df.iloc[:400])
+    store.append('XAU', df.iloc[350:])
+
+    loaded = store.load('XAU')
+    assert list(loaded.columns) == ['close', 'high', 'low']
+    pd.testing.assert_frame_equal(loaded, df[['close', 'high', 'low']],
+                                  check_freq=False)
+    # ATR使用high/low计算，与原始数据的分析结果一致
+    pd.testing.assert_frame_equal(TrendAnalyzer().analyze(loaded),
+                                  TrendAnalyzer().analyze(df))
+
+    with pytest.raises(ValueError):
+        store.append('XAU', _frame(700).iloc[600:])
+
+
+def test_write_skips_unchanged_series(tmp_path):
+    store = SeriesStore(str(tmp_path))
+    df = _frame(300)
+    store.write('AAPL', df)
+    version = _current_version(store, 'AAPL')
+
+    store.write('AAPL', df.copy())
+    assert _current_version(store, 'AAPL') == version
+
+    store.write('AAPL', _frame(300, seed=1))
+    assert _current_version(store, 'AAPL') != version
+    np.testing.assert_array_equal(store.load('AAPL')['close'].to_numpy(),
+                                  _frame(300, seed=1)['close'].to_numpy())
+
+
+def test_invalid_symbol(tmp_path):
+    store = SeriesStore(str(tmp_path))
+    for symbol in ('EUR/USD', '..', '.locks'):
+        with pytest.raises(ValueError):
+            store.write(symbol, _frame(10))
+        assert symbol not in store
+
+
+def test_prune_keeps_recently_used(tmp_path):
+    store = SeriesStore(str(tmp_path))
+    for i, symbol in enumerate(('A', 'B', 'C')):
+        store.write(symbol, _frame(50, seed=i))
+        os.utime(f"{store.store_dir}/{symbol}/{CURRENT_FILE}",
+                 (1000 * (i + 1), 1000 * (i + 1)))
+    store.touch('A')
+
+    assert store.prune(2) == ['B']
+    assert store.symbols() == ['A', 'C']
+    assert store.prune(0) == ['A', 'C']
+    assert store.symbols() == []
+
+
+def _write_repeatedly(store_dir, seed):
+    store = SeriesStore(store_dir)
+    for i in range(5):
+        store.write('SHARED', _frame(2000, seed=(seed + i) % 2))
+
+
+def test_concurrent_writes(tmp_path):
+    store_dir = str(tmp_path)
+    SeriesStore(store_dir).write('SHARED', _frame(2000))
+    context = multiprocessing.get_context('spawn')
+    processes = [context.Process(target=_write_repeatedly,
+                                 args=(store_dir, seed))
+                 for seed in range(4)]
+    for process in processes:
+        process.start()
+
+    # 写入期间读取者总能看到完整的序列
+    store = SeriesStore(store_dir)
+    while any(process.is_alive() for process in processes):
+        assert 'SHARED' in store
+        assert len(store.load('SHARED')) == 2000
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+    assert len(store.load('SHARED')) == 2000
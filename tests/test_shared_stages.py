@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from main import analyze_dual
+from shared_stages import SharedStages
+from trend_insensitive import TrendAnalyzer as InsensitiveTrendAnalyzer
+from trend_sensitive import TrendAnalyzer as SensitiveTrendAnalyzer
+
+
+def _frame(n, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        {'close': 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))},
+        index=pd.date_range('2015-01-01', periods=n, freq='D'))
+    # 打乱顺序，检查共享阶段统一排序
+    return df.iloc[rng.permutation(n)]
+
+
+@pytest.mark.parametrize('analyzer_class',
+                         [SensitiveTrendAnalyzer, InsensitiveTrendAnalyzer])
+def test_shared_matches_standalone(analyzer_class):
+    df = _frame(800)
+    shared = SharedStages(df)
+    pd.testing.assert_frame_equal(
+        analyzer_class().analyze(shared.df, shared=shared),
+        analyzer_class().analyze(df))
+
+
+@pytest.mark.parametrize('analyzer_class',
+                         [SensitiveTrendAnalyzer, InsensitiveTrendAnalyzer])
+def test_shared_rejects_other_frame(analyzer_class):
+    df = _frame(300)
+    shared = SharedStages(df)
+    # 共享的结果基于 shared.df，传入其他数据框（包括排序前的原数据框）时报错
+    for other in (df, _frame(300, seed=1)):
+        with pytest.raises(ValueError):
+            analyzer_class().analyze(other, shared=shared)
+        with pytest.raises(ValueError):
+            analyze_dual(other, shared=shared)
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from chunked import _clean_chunk, iter_chunked_trends
+from streaming import StreamingTrendAnalyzer
+from trend_insensitive import TrendAnalyzer as InsensitiveTrendAnalyzer
+from trend_sensitive import TrendAnalyzer as SensitiveTrendAnalyzer
+
+
+def _random_walk(seed, n, freq='D'):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, n)))
+    return pd.DataFrame(
+        {'date': pd.date_range('2000-01-01', periods=n, freq=freq),
+         'close': close})
+
+
+@pytest.fixture(scope='module')
+def daily_csv(tmp_path_factory):
+    # 约30年日线，order 和 ATR周期都会被放大，分块边界经常落在区间内部
+    path = tmp_path_factory.mktemp('chunked') / 'daily.csv'
+    _random_walk(3, 7625).to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture(scope='module')
+def whole_file(daily_csv):
+    df = _clean_chunk(pd.read_csv(daily_csv))
+    return [SensitiveTrendAnalyzer().analyze(df),
+            InsensitiveTrendAnalyzer().analyze(df)]
+
+
+@pytest.mark.parametrize('chunksize', [50, 236, 500, 3000])
+def test_chunked_matches_whole_file(daily_csv, whole_file, chunksize):
+    parts = [[], []]
+    for frames in iter_chunked_trends(
+            daily_csv, [SensitiveTrendAnalyzer(), InsensitiveTrendAnalyzer()],
+            chunksize):
+        for version, frame in enumerate(frames):
+            parts[version].append(frame)
+
+    for version, expected in enumerate(whole_file):
+        got = pd.concat(parts[version], ignore_index=True)
+        pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+
+
+@pytest.mark.parametrize('analyzer_class',
+                         [SensitiveTrendAnalyzer, InsensitiveTrendAnalyzer])
+def test_update_matches_full_analysis(analyzer_class):
+    df = _random_walk(5, 4000).set_index('date')
+    stream = StreamingTrendAnalyzer(analyzer_class())
+    stream.fit(df.iloc[:3000])
+    finalized = []
+    for start in range(3000, len(df), 7):
+        # 每次都重新发送上一根K线，模拟正在形成中的K线被更新
+        stream.update(df.iloc[start - 1:start + 7])
+        finalized.append(stream.pop_finalized())
+    finalized.append(stream.trends)
+
+    # 参数按首次 fit 的数据确定，完整分析使用相同参数
+    full = analyzer_class()
+    full._adjust_swing_order = lambda data_info: stream.analyzer.actual_order
+    full._adjust_atr_period = (
+        lambda data_info: stream.analyzer.actual_atr_period)
+    expected = full.analyze(df)
+
+    got = pd.concat(finalized, ignore_index=True)
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+
+
+@pytest.mark.parametrize('atr_method', ['sma', 'wilder', 'ema'])
+@pytest.mark.parametrize('analyzer_class',
+                         [SensitiveTrendAnalyzer, InsensitiveTrendAnalyzer])
+def test_replace_forming_bar_after_pop(analyzer_class, atr_method):
+    df = _random_walk(11, 1500).set_index('date')
+    stream = StreamingTrendAnalyzer(analyzer_class(atr_method=atr_method))
+    stream.fit(df.iloc[:1000])
+    finalized = []
+    for start in range(1000, len(df), 5):
+        # 先发送一根尚未收盘的K线，取出已确定区间后再用真实K线替换它
+        forming = df.iloc[start:start + 1].copy()
+        forming['close'] *= 1.05
+        stream.update(forming)
+        finalized.append(stream.pop_finalized())
+        stream.update(df.iloc[start:start + 5])
+    finalized.append(stream.pop_finalized())
+    finalized.append(stream.trends)
+
+    full = analyzer_class(atr_method=atr_method)
+    full._adjust_swing_order = lambda data_info: stream.analyzer.actual_order
+    full._adjust_atr_period = (
+        lambda data_info: stream.analyzer.actual_atr_period)
+    expected = full.analyze(df)
+
+    got = pd.concat(finalized, ignore_index=True)
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+
+
+@pytest.mark.parametrize('seed', range(4))
+@pytest.mark.parametrize('analyzer_class',
+                         [SensitiveTrendAnalyzer, InsensitiveTrendAnalyzer])
+def test_non_strict_update_matches_full_analysis(analyzer_class, seed):
+    # 价格取整后会出现大量平台，非严格swing点需要处理平台起点
+    df = _random_walk(seed, 1200).set_index('date')
+    df['close'] = df['close'].round(0)
+    stream = StreamingTrendAnalyzer(analyzer_class(strict_swing=False))
+    stream.fit(df.iloc[:600])
+    finalized = []
+    for start in range(600, len(df), 5):
+        stream.update(df.iloc[start - 1:start + 5])
+        finalized.append(stream.pop_finalized())
+    finalized.append(stream.trends)
+
+    full = analyzer_class(strict_swing=False)
+    full._adjust_swing_order = lambda data_info: stream.analyzer.actual_order
+    full._adjust_atr_period = (
+        lambda data_info: stream.analyzer.actual_atr_period)
+    expected = full.analyze(df)
+
+    got = pd.concat(finalized, ignore_index=True)
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sweep import sweep_parameters
+from trend_insensitive import TrendAnalyzer as InsensitiveTrendAnalyzer
+from trend_sensitive import TrendAnalyzer as SensitiveTrendAnalyzer
+
+
+ATR_PERIODS = (10, 21)
+ORDERS = (3, 8)
+THRESHOLDS = (0.3, 0.618, 1.5)
+
+
+@pytest.fixture(scope='module')
+def prices():
+    rng = np.random.default_rng(11)
+    n = 1500
+    return pd.DataFrame(
+        {'close': 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))},
+        index=pd.date_range('2018-01-01', periods=n, freq='D'))
+
+
+def _fixed_run(analyzer_class, df, period, order, threshold):
+    """关闭参数自适应，按给定参数运行完整分析"""
+    analyzer = analyzer_class(atr_period=period, order=order,
+                              swing_threshold=threshold)
+    analyzer._adjust_swing_order = lambda data_info: order
+    analyzer._adjust_atr_period = lambda data_info: period
+    trends = analyzer.analyze(df)
+    counts = trends['trend_type'].value_counts()
+    return {
+        'segments': len(trends),
+        'up': int(counts.get('up', 0)),
+        'down': int(counts.get('down', 0)),
+        'consolidation': int(counts.get('consolidation', 0)),
+    }
+
+
+@pytest.mark.parametrize('analyzer_class',
+                         [SensitiveTrendAnalyzer, InsensitiveTrendAnalyzer])
+def test_sweep_matches_fixed_parameter_runs(prices, analyzer_class):
+    refine_analyzer = (analyzer_class()
+                       if analyzer_class is InsensitiveTrendAnalyzer else None)
+    result = sweep_parameters(prices, ATR_PERIODS, ORDERS, THRESHOLDS,
+                              refine_analyzer=refine_analyzer)
+    assert len(result) == len(ATR_PERIODS) * len(ORDERS) * len(THRESHOLDS)
+
+    for row in result.itertuples(index=False):
+        expected = _fixed_run(analyzer_class, prices, row.atr_period,
+                              row.order, row.swing_threshold)
+        got = {name: getattr(row, name) for name in expected}
+        assert got == expected, (row.atr_period, row.order,
+                                 row.swing_threshold)
+
+
+def test_sweep_does_not_modify_refine_analyzer(prices):
+    analyzer = InsensitiveTrendAnalyzer(swing_threshold=0.618)
+    sweep_parameters(prices, (14,), (5,), (0.3, 1.5),
+                     refine_analyzer=analyzer)
+    assert analyzer.swing_threshold == 0.618